@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from PIL import Image
+
+
+def _grayscale(img, width, height):
+    return np.asarray(img.convert("L").resize((width, height), Image.BILINEAR), dtype=np.float32)
+
+
+def average_hash(img, hash_size=8):
+    """64-bit aHash: which cells of a hash_size x hash_size thumbnail are brighter than the mean"""
+    pixels = _grayscale(img, hash_size, hash_size)
+    return _pack(pixels > pixels.mean())
+
+
+def difference_hash(img, hash_size=8):
+    """64-bit dHash: whether each thumbnail pixel is brighter than its right neighbour"""
+    pixels = _grayscale(img, hash_size + 1, hash_size)
+    return _pack(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _pack(bits):
+    value = 0
+    for bit in bits.reshape(-1):
+        value = (value << 1) | int(bit)
+    return value
+
+
+def page_key(img, page=None):
+    """page if the caller knows which page img shows, else a SHA-256 of its pixels"""
+    return page if page is not None else hashlib.sha256(img.tobytes()).hexdigest()
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class AnalysisCache:
+    """Screenshot analyses keyed on perceptual hashes rather than exact bytes
+
+    A lookup hits when both the aHash and dHash of the new screenshot are
+    within max_distance bits of a stored entry for the same prompt version,
+    so captures that differ only in small details (a rotating banner, a
+    clock) reuse the earlier analysis. The hashes only see an 8x8 thumbnail,
+    so an entry must also come from the same page and have the same pixel
+    dimensions. The page is its URL, or without one a SHA-256 of the
+    screenshot's pixels. Entries expire after ttl seconds and the oldest are
+    evicted beyond max_entries. If path is given the cache is persisted
+    there as JSON.
+    """
+
+    def __init__(self, path=None, max_entries=256, ttl=7 * 24 * 3600, max_distance=6):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.entries = []
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable analysis cache {self.path}: {e}")
+            self.entries = []
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.path)
+
+    def _expire(self, now):
+        self.entries = [e for e in self.entries if now - e["created"] <= self.ttl]
+
+    def get(self, img, prompt_version, page=None):
+        """Return the cached analysis for a perceptually similar screenshot of page, or None"""
+        ahash, dhash = average_hash(img), difference_hash(img)
+        page = page_key(img, page)
+        with self.lock:
+            self._expire(time.time())
+            best = None
+            for entry in self.entries:
+                if (entry["prompt_version"] != prompt_version or entry.get("page") != page
+                        or entry.get("size") != list(img.size)):
+                    continue
+                distance = max(hamming(ahash, entry["ahash"]), hamming(dhash, entry["dhash"]))
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, entry)
+            if best is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return best[1]["analysis"]
+
+    def put(self, img, prompt_version, analysis, page=None):
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            self.entries.append({
+                "ahash": average_hash(img),
+                "dhash": difference_hash(img),
+                "prompt_version": prompt_version,
+                "page": page_key(img, page),
+                "size": list(img.size),
+                "created": now,
+                "analysis": analysis,
+            })
+            self.entries = self.entries[-self.max_entries:]
+            self._save()
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
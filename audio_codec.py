@@ -0,0 +1,42 @@
+import io
+import numpy as np
+import soundfile as sf
+
+# Whisper resamples everything to 16 kHz mono, so uploading more is wasted bandwidth
+TRANSCRIPTION_RATE = 16000
+
+FORMAT_EXTENSIONS = {"FLAC": "flac", "WAV": "wav", "OGG": "ogg"}
+
+
+def lowpass_taps(cutoff, taps=127, beta=8.6):
+    """Kaiser-windowed sinc FIR with unity DC gain; cutoff is a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(taps, beta)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples, src_rate, dst_rate):
+    """Resample mono audio with a windowed-sinc low-pass followed by linear interpolation
+
+    When downsampling, everything above 90% of the new Nyquist frequency is
+    removed first (better than 60 dB above it), so it cannot fold back into
+    the speech band.
+    """
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    if dst_rate < src_rate:
+        # The Kaiser transition band is about 4% of src_rate wide, centred on the cutoff
+        cutoff = 0.45 * dst_rate / src_rate - 0.02
+        samples = np.convolve(samples, lowpass_taps(cutoff), mode="same")
+    n_out = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def encode_audio(samples, sample_rate, target_rate=TRANSCRIPTION_RATE, audio_format="FLAC"):
+    """Downsample and encode a recording in memory, returning (filename, bytes) for upload"""
+    samples = resample(samples, sample_rate, target_rate)
+    buffer = io.BytesIO()
+    sf.write(buffer, np.clip(samples, -1.0, 1.0), target_rate, format=audio_format, subtype="PCM_16")
+    return f"speech.{FORMAT_EXTENSIONS[audio_format]}", buffer.getvalue()
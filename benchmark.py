@@ -0,0 +1,430 @@
+import argparse
+import asyncio
+import io
+import json
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+import numpy as np
+
+
+def synthetic_speech(seconds, sample_rate=44100, seed=0):
+    """Speech-like test signal: a few harmonics with syllable-rate amplitude modulation plus noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 540, 900)))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+    return (0.2 * voice * envelope + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def bench_audio_encoding(seconds=5.0, sample_rate=44100, repeats=5):
+    """Compare upload size and encode time of the old temp WAV path against in-memory encodings"""
+    import soundfile as sf
+    from audio_codec import encode_audio
+
+    recording = synthetic_speech(seconds, sample_rate)
+
+    def float_wav():
+        buffer = io.BytesIO()
+        sf.write(buffer, recording, sample_rate, format="WAV", subtype="FLOAT")
+        return "speech.wav", buffer.getvalue()
+
+    variants = {
+        "wav float32 44.1k (old)": float_wav,
+        "wav pcm16 16k": lambda: encode_audio(recording, sample_rate, audio_format="WAV"),
+        "flac pcm16 16k": lambda: encode_audio(recording, sample_rate, audio_format="FLAC"),
+    }
+
+    print(f"Audio encoding, {seconds:.1f}s of audio at {sample_rate} Hz")
+    print(f"{'variant':<26}{'bytes':>10}{'bytes/s':>10}{'encode ms/s':>13}")
+    for name, encode in variants.items():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            _, data = encode()
+        elapsed = (time.perf_counter() - started) / repeats
+        print(f"{name:<26}{len(data):>10}{len(data) / seconds:>10.0f}{1000 * elapsed / seconds:>13.2f}")
+
+
+def synthetic_screenshot(width=2560, height=1600):
+    """Screenshot-like PNG: header, a photographic hero band, and cards with text-like stripes"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (width, height), (248, 249, 250))
+    hero = Image.merge("RGB", [Image.effect_noise((width, 400), sigma) for sigma in (40, 50, 60)])
+    img.paste(hero, (0, 120))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, width, 120], fill=(33, 37, 41))
+    for col in range(4):
+        for row in range(3):
+            x, y = 80 + col * 610, 560 + row * 340
+            draw.rectangle([x, y, x + 560, y + 300], fill=(255, 255, 255), outline=(222, 226, 230))
+            for line in range(6):
+                draw.rectangle([x + 30, y + 40 + line * 40, x + 30 + (line * 97) % 480, y + 55 + line * 40],
+                               fill=(108, 117, 125))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def bench_screenshot_upload(uplink_mbps=10.0, repeats=3):
+    """Compare bytes sent to Gemini for the full PNG against downscaled recompressed variants
+
+    Upload time is estimated from uplink_mbps, since that is the part of
+    analysis latency the payload size controls.
+    """
+    from image_prep import prepare_for_upload
+
+    png = synthetic_screenshot()
+    variants = {
+        "png original (old)": None,
+        "webp 1280 q80": {"max_dimension": 1280, "quality": 80, "image_format": "WEBP"},
+        "jpeg 1280 q80": {"max_dimension": 1280, "quality": 80, "image_format": "JPEG"},
+        "webp 1024 q70": {"max_dimension": 1024, "quality": 70, "image_format": "WEBP"},
+    }
+
+    print(f"Screenshot upload, 2560x1600 source, {uplink_mbps:.0f} Mbps uplink")
+    print(f"{'variant':<22}{'bytes':>10}{'prep ms':>10}{'upload ms':>11}")
+    for name, settings in variants.items():
+        started = time.perf_counter()
+        for _ in range(repeats):
+            data = png if settings is None else prepare_for_upload(png, **settings)[0]
+        prep = (time.perf_counter() - started) / repeats
+        upload = len(data) * 8 / (uplink_mbps * 1e6)
+        print(f"{name:<22}{len(data):>10}{1000 * prep:>10.1f}{1000 * upload:>11.1f}")
+
+
+SESSION_SCRIPT = [
+    "a recipe sharing app",
+    "change the title to fresh recipes",
+    "add a favorites counter",
+    "looks good",
+    "yes",
+    "update the header color",
+    "undo",
+    "go back to turn 2",
+    "looks good",
+    "yes",
+    "exit",
+]
+
+
+def _seed_project(project_dir):
+    """A minimal create-react-app layout, so the session never shells out to npx"""
+    (project_dir / "src").mkdir(parents=True)
+    (project_dir / "package.json").write_text(json.dumps({
+        "name": "devis-ui", "version": "0.1.0", "private": True,
+        "dependencies": {"react": "^18.2.0", "react-dom": "^18.2.0", "react-scripts": "5.0.1"},
+        "scripts": {"start": "react-scripts start", "build": "react-scripts build"},
+    }, indent=2))
+    (project_dir / "src" / "index.js").write_text(
+        "import React from 'react';\nimport ReactDOM from 'react-dom/client';\nimport App from './App';\n\n"
+        "ReactDOM.createRoot(document.getElementById('root')).render(<App />);\n")
+    (project_dir / "src" / "App.js").write_text("export default function App() { return null; }\n")
+    (project_dir / "src" / "App.css").write_text("")
+
+
+def bench_session(script=SESSION_SCRIPT, llm_cache=False, first_token_latency=0.3, tokens_per_second=400.0):
+    """Drive DEVIS.run through a scripted voice session against offline fakes
+
+    OpenAI, ElevenLabs and the microphone are replaced by the fakes in
+    fakes.py and deployments go to a local GitHub/Vercel stand-in, so the
+    numbers move only when DEVIS itself changes. Speech playback and capture
+    run 20x faster than real time. Reports latency and payload per turn from
+    the trace, plus call and byte counts per backend.
+    """
+    from cache import DiskCache, TieredCache
+    from deployment_agent import DeploymentAgent
+    from fakes import (CallStats, FakeElevenLabs, FakeOpenAI, FakePlayer, LocalAPIServer,
+                       ScriptedMicrophone)
+    from frontend_agent import FrontendAgent
+    from main import DEVIS
+    from tracing import tracer
+    from voice_agent import VoiceAgent
+
+    stats = CallStats()
+    with tempfile.TemporaryDirectory(prefix="devis-bench-") as workdir, LocalAPIServer(stats) as server:
+        workdir = Path(workdir)
+        _seed_project(workdir / "devis-ui")
+        microphone = ScriptedMicrophone(script)
+        openai_client = FakeOpenAI(stats, transcripts=microphone.take, first_token_latency=first_token_latency,
+                                   tokens_per_second=tokens_per_second)
+
+        voice_agent = VoiceAgent(client=openai_client, voice_client=FakeElevenLabs(stats),
+                                 player=FakePlayer(), audio_backend=microphone)
+        voice_agent.tts_cache = DiskCache(workdir / "tts")
+        frontend_agent = FrontendAgent(use_cache=llm_cache, client=openai_client)
+        if llm_cache:
+            frontend_agent.cache = TieredCache(workdir / "llm")
+        deployment_agent = DeploymentAgent(github_api=server.url, vercel_api=server.url)
+
+        trace_path, tracer.path = tracer.path, str(workdir / "traces.jsonl")
+        started = time.perf_counter()
+        try:
+            devis = DEVIS(project_dir=workdir / "devis-ui", voice_agent=voice_agent,
+                          frontend_agent=frontend_agent, deployment_agent=deployment_agent,
+                          dev_server=False)
+            devis.run()
+            elapsed = time.perf_counter() - started
+        finally:
+            tracer.path = trace_path
+
+        with open(workdir / "traces.jsonl") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    counters = defaultdict(lambda: defaultdict(float))
+    for record in records:
+        for key, value in record["counters"].items():
+            counters[record["trace"]][key] += value
+
+    print(f"Scripted session, {len(script)} utterances, {elapsed:.2f}s wall clock")
+    print(f"{'turn':<10}{'ms':>9}{'prompt tok':>12}{'output tok':>12}{'bytes sent':>12}{'bytes recv':>12}")
+    for record in records:
+        if record["parent"] is None and record["attrs"].get("turn"):
+            turn = counters[record["trace"]]
+            print(f"{record['name']:<10}{record['duration_ms']:>9.0f}{turn['prompt_tokens']:>12.0f}"
+                  f"{turn['completion_tokens']:>12.0f}{turn['bytes_sent']:>12.0f}{turn['bytes_received']:>12.0f}")
+    print()
+    print(f"{'backend':<26}{'calls':>7}{'bytes sent':>12}{'bytes recv':>12}")
+    for service, service_stats in sorted(stats.snapshot().items()):
+        print(f"{service:<26}{service_stats['calls']:>7}{service_stats.get('bytes_sent', 0):>12}"
+              f"{service_stats.get('bytes_received', 0):>12}")
+
+
+LOAD_SCRIPT = [
+    "a recipe sharing app",
+    "change the title to fresh recipes",
+    "add a favorites counter",
+    None,  # spoken: uploaded as audio and transcribed
+    "looks good",
+    "yes",
+]
+
+
+async def _load_session(client, script, speech, latencies, rejections):
+    """Run one scripted session against the server, retrying turns refused for backpressure"""
+    while True:
+        response = await client.post("/sessions")
+        if response.status_code == 201:
+            break
+        rejections.append(response.status_code)
+        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+    session_id = response.json()["session_id"]
+
+    for text in script:
+        while True:
+            started = time.perf_counter()
+            if text is None:
+                response = await client.post(f"/sessions/{session_id}/audio", content=speech,
+                                             params={"filename": "speech.flac", "wait": True})
+            else:
+                response = await client.post(f"/sessions/{session_id}/turns", json={"text": text, "wait": True})
+            if response.status_code not in (429, 503):
+                break
+            rejections.append(response.status_code)
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        if response.status_code == 202 and response.json()["status"] == "done":
+            latencies.append(time.perf_counter() - started)
+        else:
+            rejections.append(response.status_code)
+
+    # Keep the session open until its deployment settles, so deploy work counts as load
+    seen, deadline = 0, time.monotonic() + 120
+    while time.monotonic() < deadline:
+        events = (await client.get(f"/sessions/{session_id}/events", params={"after": seen})).json()
+        seen = events[-1]["seq"] if events else seen
+        if any(event["type"] == "deploy" and event["status"] in ("ready", "failed") for event in events):
+            break
+        await asyncio.sleep(0.5)
+    await client.delete(f"/sessions/{session_id}")
+
+
+def bench_server(concurrency=(1, 4, 16, 32), generation_workers=8, deploy_workers=4, latency_budget=3.0):
+    """Load-test the multi-session server against offline fakes
+
+    Each level starts that many concurrent scripted sessions (text turns,
+    one uploaded audio turn and a deploy, waited on until it is live)
+    through the ASGI app in-process.
+    Reports throughput and client-observed turn latency, and how many
+    concurrent sessions fit while p95 turn latency stays within
+    latency_budget seconds.
+    """
+    import contextlib
+    import httpx
+    from audio_codec import encode_audio
+    from deployment_agent import DeploymentAgent
+    from fakes import CallStats, FakeElevenLabs, FakeOpenAI, FakePlayer, LocalAPIServer
+    from server import SessionManager, create_app
+    from template_cache import TemplateCache
+    from tracing import percentile, tracer
+    from voice_agent import VoiceAgent
+
+    speech = encode_audio(synthetic_speech(2.0), 44100)[1]
+    print(f"Server load test, {len(LOAD_SCRIPT)} turns per session, {generation_workers} generation workers")
+    print(f"{'sessions':>8}{'turns':>7}{'wall s':>8}{'turns/s':>9}{'p50 s':>8}{'p95 s':>8}{'max s':>8}{'refused':>9}")
+    supported = 0
+    with tempfile.TemporaryDirectory(prefix="devis-load-") as workdir, LocalAPIServer(build_polls=2) as api:
+        workdir = Path(workdir)
+        template = TemplateCache(root=workdir / "templates")
+        _seed_project(template.path)
+        template._write_manifest(template.path)
+        trace_path, tracer.path, tracer.print_turns = tracer.path, str(workdir / "traces.jsonl"), False
+
+        try:
+            for sessions in concurrency:
+                stats = CallStats()
+                openai_client = FakeOpenAI(stats, transcripts=lambda: "add a favorites counter")
+                voice_agent = VoiceAgent(client=openai_client, voice_client=FakeElevenLabs(stats), player=FakePlayer())
+                manager = SessionManager(root=workdir / f"sessions-{sessions}", openai_client=openai_client,
+                                         voice_agent=voice_agent, template_cache=template, use_llm_cache=False,
+                                         deployment_agent=DeploymentAgent(github_api=api.url, vercel_api=api.url),
+                                         max_sessions=max(concurrency), generation_workers=generation_workers,
+                                         deploy_workers=deploy_workers)
+                latencies, rejections = [], []
+
+                async def load():
+                    transport = httpx.ASGITransport(app=create_app(manager))
+                    async with httpx.AsyncClient(transport=transport, base_url="http://devis", timeout=300) as client:
+                        await asyncio.gather(*(_load_session(client, LOAD_SCRIPT, speech, latencies, rejections)
+                                               for _ in range(sessions)))
+                    await manager.close()
+
+                started = time.perf_counter()
+                # Session output (changed files, stream metrics) would drown the table
+                with contextlib.redirect_stdout(io.StringIO()):
+                    asyncio.run(load())
+                elapsed = time.perf_counter() - started
+                p95 = percentile(latencies, 0.95)
+                if p95 <= latency_budget:
+                    supported = sessions
+                print(f"{sessions:>8}{len(latencies):>7}{elapsed:>8.1f}{len(latencies) / elapsed:>9.2f}"
+                      f"{percentile(latencies, 0.5):>8.2f}{p95:>8.2f}{max(latencies):>8.2f}{len(rejections):>9}")
+        finally:
+            tracer.path, tracer.print_turns = trace_path, True
+    print(f"Concurrent sessions within a {latency_budget:.1f}s p95 turn budget: {supported}")
+
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from types import SimpleNamespace
+from clients import clients
+# Instant stand-in TTS, so the timing is DEVIS's own startup cost
+clients.register("elevenlabs", SimpleNamespace(text_to_speech=SimpleNamespace(convert=lambda **kwargs: [bytes(16000)])))
+devis = main.DEVIS(project_dir=sys.argv[1])
+built = time.perf_counter()
+first_prompt = {}
+def player(audio):
+    first_prompt.setdefault("time", time.perf_counter())
+    first_prompt.setdefault("modules", sorted(name for name in sys.modules if "." not in name))
+devis.voice_agent.player = player
+devis.voice_agent.speak(main.WELCOME_MSG)
+print(json.dumps({"import": imported - started, "init": built - imported,
+                  "first_prompt": first_prompt["time"] - started, "modules": first_prompt["modules"]}))
+"""
+
+HEAVY_MODULES = ["openai", "elevenlabs", "httpx", "requests", "numpy", "soundfile", "sounddevice",
+                 "scrapybara", "google", "PIL"]
+
+
+def bench_startup(top=10):
+    """Profile time-to-first-prompt: importing main, building DEVIS and speaking the welcome
+
+    Runs in a fresh interpreter with -X importtime and an empty cache
+    directory, with TTS replaced by an instant stand-in. Lists which heavy
+    dependencies were already loaded when the first prompt started and the
+    slowest imports behind it.
+    """
+    import os
+    import subprocess
+    import sys
+
+    with tempfile.TemporaryDirectory(prefix="devis-startup-") as workdir:
+        env = {**os.environ, "DEVIS_CACHE_DIR": workdir, "DEVIS_TRACE": "0"}
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT,
+                                 str(Path(workdir) / "project")],
+                                cwd=Path(__file__).resolve().parent, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        return
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            imports.append((int(cumulative_us) / 1000, int(self_us) / 1000, name.strip()))
+
+    print("Startup profile (fresh interpreter, empty caches)")
+    print(f"  import main     {1000 * timings['import']:>8.1f} ms")
+    print(f"  DEVIS()         {1000 * timings['init']:>8.1f} ms")
+    print(f"  first prompt    {1000 * timings['first_prompt']:>8.1f} ms after start")
+    loaded = [name for name in HEAVY_MODULES if name in timings["modules"]]
+    print(f"  loaded by then: {', '.join(loaded) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+    print(f"\n{'slowest imports':<40}{'cumulative ms':>14}{'self ms':>9}")
+    for cumulative, own, name in sorted(imports, reverse=True)[:top]:
+        print(f"{name:<40}{cumulative:>14.1f}{own:>9.1f}")
+
+
+def bench_context(sizes=(5, 10, 20, 40, 60), request="change the header title to fresh recipes"):
+    """Compare prompt tokens per edit for a single-file app against a component-split one
+
+    The same generated app, grown to each size, is edited once through
+    edit_app with everything in App.js/App.css and once through
+    edit_components with one file per component. Token counts come from the
+    fake completion's usage, at roughly four characters per token.
+    """
+    from component_index import ComponentIndex
+    from fakes import CallStats, FakeOpenAI, fake_component_files, flatten_components
+    from file_writer import ProjectWriter
+    from frontend_agent import FrontendAgent
+
+    print(f"Prompt tokens for one edit: {request!r}")
+    print(f"{'components':>10}{'single-file':>13}{'split':>8}{'files sent':>12}{'files changed':>15}")
+    with tempfile.TemporaryDirectory(prefix="devis-context-") as workdir:
+        for size in sizes:
+            files = fake_component_files("a recipe sharing app", size)
+            code, styles = flatten_components(files)
+            single, split = Path(workdir) / f"single-{size}", Path(workdir) / f"split-{size}"
+            for project_dir, project_files in ((single, {"src/App.js": code, "src/App.css": styles}),
+                                               (split, files)):
+                with ProjectWriter(project_dir).batch() as writer:
+                    for relative_path, content in project_files.items():
+                        writer.write(relative_path, content)
+
+            tokens = {}
+            for layout, project_dir in (("single", single), ("split", split)):
+                stats = CallStats()
+                agent = FrontendAgent(use_cache=False, client=FakeOpenAI(stats, first_token_latency=0,
+                                                                         tokens_per_second=1e9))
+                if layout == "single":
+                    agent.edit_app(request, project_dir)
+                else:
+                    changed = agent.edit_components(request, project_dir)
+                agent.cleanup()
+                tokens[layout] = stats.snapshot()["openai.chat"]["prompt_tokens"]
+
+            index = ComponentIndex(split)
+            sent = 2 + len(index.files_for(index.select(request)))
+            print(f"{size:>10}{tokens['single']:>13}{tokens['split']:>8}{sent:>12}{len(changed):>15}")
+
+
+BENCHMARKS = {
+    "audio": bench_audio_encoding,
+    "context": bench_context,
+    "screenshot": bench_screenshot_upload,
+    "server": bench_server,
+    "session": bench_session,
+    "startup": bench_startup,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DEVIS performance benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS), nargs="?", help="benchmark to run (default: all)")
+    args = parser.parse_args()
+
+    for name in [args.benchmark] if args.benchmark else sorted(BENCHMARKS):
+        BENCHMARKS[name]()
+        print()
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_CACHE_ROOT = Path(os.getenv("DEVIS_CACHE_DIR", os.path.expanduser("~/.cache/devis")))
+
+
+def content_hash(*parts):
+    """Hash an ordered sequence of strings/bytes into a hex digest usable as a cache key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache bounded by entry count"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class DiskCache:
+    """Byte-valued cache stored as one file per key, evicting least recently used past max_bytes"""
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        # Touch the file so eviction order follows access, not creation
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        temp_path = path.with_name(f".{key}.{threading.get_ident()}.tmp")
+        with self.lock:
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used files until the directory fits in max_bytes"""
+        files = []
+        total = 0
+        for path in self.directory.iterdir():
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        files.sort()
+        while total > self.max_bytes and files:
+            _, size, path = files.pop(0)
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def delete(self, key):
+        with self.lock:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def size(self):
+        """Total bytes currently stored"""
+        return sum(p.stat().st_size for p in self.directory.iterdir() if not p.name.startswith("."))
+
+    def clear(self):
+        with self.lock:
+            for path in self.directory.iterdir():
+                path.unlink()
+
+
+class TieredCache:
+    """In-memory LRU in front of a DiskCache, with hit/miss counters"""
+
+    def __init__(self, directory, max_entries=128, max_bytes=50 * 1024 * 1024):
+        self.memory = LRUCache(max_entries)
+        self.disk = DiskCache(directory, max_bytes)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        # generate_app reads the cache from two threads at once
+        self.stats_lock = threading.Lock()
+
+    def _count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self._count("disk_hits")
+            self.memory.put(key, value)
+            return value
+        self._count("misses")
+        return None
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        self.disk.put(key, value)
+
+    def delete(self, key):
+        self.memory.delete(key)
+        self.disk.delete(key)
+
+    def hit_rate(self):
+        with self.stats_lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
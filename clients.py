@@ -0,0 +1,140 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def create_session(pool_size=16, retries=4):
+    """Keep-alive session that retries transient failures with exponential backoff
+
+    Idempotent requests are retried on connection errors and 429/5xx
+    responses. POST and PATCH, which create repositories, blobs and commits,
+    are retried only when the request never arrived (connection errors) or
+    was refused unprocessed (429); a retried 5xx could repeat its effect.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    class RateLimitRetry(Retry):
+        def is_retry(self, method, status_code, has_retry_after=False):
+            if status_code == 429 and self.total:
+                return True
+            return super().is_retry(method, status_code, has_retry_after)
+
+    retry = RateLimitRetry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class ClientRegistry:
+    """API clients created on first use and shared by every agent in the process
+
+    Nothing is imported or constructed until an agent asks for it, so a
+    session that never deploys never loads requests, and one that never
+    captures never touches Scrapybara. The OpenAI and ElevenLabs SDKs get
+    pooled keep-alive httpx clients; GitHub and Vercel share one requests
+    session. register() swaps in a client, e.g. a fake from fakes.py.
+    """
+
+    def __init__(self, pool_size=16):
+        self.pool_size = pool_size
+        self.clients = {}
+        self.lock = threading.Lock()
+        self.locks = {}
+        self.factories = {
+            "openai": self._openai,
+            "elevenlabs": self._elevenlabs,
+            "http": lambda: create_session(self.pool_size),
+            "scrapybara": self._scrapybara,
+            "genai": self._genai,
+        }
+
+    def _httpx_client(self, timeout):
+        import httpx
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.Client(limits=limits, timeout=httpx.Timeout(timeout, connect=10.0), follow_redirects=True)
+
+    def _openai(self):
+        from openai import OpenAI
+        return OpenAI(http_client=self._httpx_client(600.0))
+
+    def _elevenlabs(self):
+        from elevenlabs.client import ElevenLabs
+        return ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"), httpx_client=self._httpx_client(240.0))
+
+    def _scrapybara(self):
+        from scrapybara import Scrapybara
+        return Scrapybara(api_key=os.getenv("SCRAPYBARA_API_KEY"))
+
+    def _genai(self):
+        from google import genai
+        return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+    def get(self, name):
+        client = self.clients.get(name)
+        if client is not None:
+            return client
+        with self.lock:
+            lock = self.locks.setdefault(name, threading.Lock())
+        # One lock per client, so building one client never waits on another
+        with lock:
+            if name not in self.clients:
+                self.clients[name] = self.factories[name]()
+            return self.clients[name]
+
+    def openai(self):
+        return self.get("openai")
+
+    def elevenlabs(self):
+        return self.get("elevenlabs")
+
+    def http(self):
+        return self.get("http")
+
+    def scrapybara(self):
+        return self.get("scrapybara")
+
+    def genai(self):
+        return self.get("genai")
+
+    def register(self, name, client):
+        self.clients[name] = client
+
+    def warm(self, *names):
+        """Build clients on a daemon thread so their imports are done before they are needed"""
+        def build():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Could not prepare the {name} client: {e}")
+
+        thread = threading.Thread(target=build, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Close pooled connections of every client created so far"""
+        with self.lock:
+            clients, self.clients = self.clients, {}
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    pass
+
+
+clients = ClientRegistry()
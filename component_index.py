@@ -0,0 +1,148 @@
+import re
+from pathlib import Path, PurePosixPath
+from patch_engine import PatchError
+
+COMPONENTS_DIR = "src/components"
+
+FILE_BLOCK_PATTERN = re.compile(
+    r"^FILE:\s*(?P<path>\S+)\s*\n(?P<content>.*?)\n?^END FILE\s*$",
+    re.DOTALL | re.MULTILINE
+)
+
+FILES_FORMAT = """FILE: src/components/Header.js
+the complete content of the file
+END FILE"""
+
+_KEYFRAME_STOPS = re.compile(r"(from|to|[\d.]+%)(\s*,\s*(from|to|[\d.]+%))*")
+
+_STOPWORDS = {"a", "an", "the", "to", "of", "in", "on", "and", "or", "for", "with", "make", "it", "its",
+              "add", "change", "update", "create", "style", "set", "new", "more", "less", "please", "app"}
+
+
+def parse_file_blocks(text):
+    """Parse FILE blocks from a model response into {relative path: content}
+
+    Only .js and .css files under src/ are accepted, so a response can never
+    write outside the project's source tree.
+    """
+    files = {}
+    for match in FILE_BLOCK_PATTERN.finditer(text):
+        path = PurePosixPath(match.group("path"))
+        if path.is_absolute() or ".." in path.parts or path.parts[:1] != ("src",) \
+                or path.suffix not in (".js", ".css"):
+            raise PatchError(f"Refusing to write {path}")
+        files[str(path)] = match.group("content").rstrip("\n") + "\n"
+    if not files:
+        raise PatchError("No file blocks found in response")
+    return files
+
+
+def format_file_blocks(files):
+    return "\n".join(f"FILE: {path}\n{content.rstrip()}\nEND FILE" for path, content in files.items())
+
+
+def css_selectors(css):
+    """Selectors of every rule in a stylesheet, at-rule preludes excluded"""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    selectors = []
+    for prelude in re.findall(r"([^{};]+)\{", css):
+        prelude = prelude.strip()
+        if prelude.startswith("@") or _KEYFRAME_STOPS.fullmatch(prelude):
+            continue
+        selectors.extend(selector.strip() for selector in prelude.split(",") if selector.strip())
+    return list(dict.fromkeys(selectors))
+
+
+def _words(text):
+    """Lowercase words of text, splitting camelCase and kebab-case, with plural s dropped"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    words = re.findall(r"[a-zA-Z]+", text.lower())
+    return {word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words} - _STOPWORDS
+
+
+class ComponentIndex:
+    """Map each component of a split project to its files, CSS selectors and children
+
+    A split project keeps App.js as a thin composition root and every
+    component in src/components/<Name>.js with its styles in <Name>.css.
+    The index is rebuilt from disk, so it always reflects the last write.
+    """
+
+    def __init__(self, project_dir):
+        self.root = Path(project_dir)
+        self.components = {}
+        self.refresh()
+
+    def refresh(self):
+        self.components = {}
+        directory = self.root / COMPONENTS_DIR
+        if not directory.is_dir():
+            return self
+        for js_path in sorted(directory.glob("*.js")):
+            css_path = js_path.with_suffix(".css")
+            code = js_path.read_text()
+            styles = css_path.read_text() if css_path.exists() else ""
+            self.components[js_path.stem] = {
+                "js": f"{COMPONENTS_DIR}/{js_path.name}",
+                "css": f"{COMPONENTS_DIR}/{css_path.name}" if css_path.exists() else None,
+                "selectors": css_selectors(styles),
+                "renders": sorted(set(re.findall(r"<([A-Z]\w*)", code)) - {js_path.stem}),
+            }
+        for entry in self.components.values():
+            entry["renders"] = [name for name in entry["renders"] if name in self.components]
+        return self
+
+    def is_split(self):
+        return bool(self.components)
+
+    def select(self, request, limit=4):
+        """Names of the components a change request most likely touches, best match first
+
+        Words of the request are matched against component names (weighted
+        highest) and CSS selectors. Requests that match nothing, such as a
+        new section, get an empty list and only App.js is shown.
+        """
+        wanted = _words(request)
+        scores = {}
+        for name, entry in self.components.items():
+            score = 3 * len(wanted & _words(name)) + len(wanted & _words(" ".join(entry["selectors"])))
+            if score:
+                scores[name] = score
+        # A word shared by many selectors (title, button) should not pull in every component
+        best = max(scores.values(), default=0)
+        matches = [name for name, score in scores.items() if 2 * score >= best]
+        return sorted(matches, key=lambda name: (-scores[name], name))[:limit]
+
+    def files_for(self, names):
+        paths = []
+        for name in names:
+            entry = self.components[name]
+            paths += [entry["js"]] + ([entry["css"]] if entry["css"] else [])
+        return paths
+
+    def neighbors(self, names):
+        """Components rendering or rendered by any of names, excluding names themselves"""
+        related = set()
+        for name in names:
+            related.update(self.components[name]["renders"])
+            related.update(other for other, entry in self.components.items() if name in entry["renders"])
+        return sorted(related - set(names))
+
+    def summary(self, shown):
+        """Compact description of the components not shown in full
+
+        Neighbors of the shown components get their files, children and
+        selectors; everything else is listed by name only, which keeps the
+        summary small as the app grows.
+        """
+        neighbors = self.neighbors(shown)
+        lines = []
+        for name in neighbors:
+            entry = self.components[name]
+            selectors = " ".join(entry["selectors"][:6]) + (" ..." if len(entry["selectors"]) > 6 else "")
+            renders = ", ".join(entry["renders"]) or "nothing"
+            lines.append(f"- {name} ({entry['js']}): renders {renders}; selectors {selectors or 'none'}")
+        others = [name for name in self.components if name not in neighbors and name not in shown]
+        if others:
+            lines.append(f"- Also present: {', '.join(others)}")
+        return "\n".join(lines) or "- None"
@@ -0,0 +1,207 @@
+import itertools
+import queue
+import threading
+import time
+from tracing import tracer
+
+READY_STATES = {"READY"}
+FAILED_STATES = {"ERROR", "CANCELED"}
+
+# One push at a time per repository, so a superseded job cannot race its successor's ref update
+_push_locks = {}
+_push_locks_guard = threading.Lock()
+
+
+def _push_lock(full_name):
+    with _push_locks_guard:
+        return _push_locks.setdefault(full_name, threading.Lock())
+
+
+class DeploymentCancelled(Exception):
+    """Raised inside a job when a newer deployment supersedes it"""
+
+
+class DeploymentJob(threading.Thread):
+    """Run repo creation, push, Vercel deploy and status polling off the voice loop
+
+    Progress is reported as event dicts on the shared events queue:
+    {"job", "stage", "status", "message", "url"}, where status is one of
+    "started", "done", "ready", "failed" or "cancelled". on_event, if given,
+    is also called with each event from the job's thread.
+    """
+
+    STAGES = ("repository", "push", "deploy", "build")
+
+    def __init__(self, job_id, agent, events, repo_name, project_dir, files, changed=None, on_pushed=None,
+                 poll_initial=1.0, poll_max=16.0, poll_timeout=600.0, slots=None, on_event=None):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.agent = agent
+        self.events = events
+        self.repo_name = repo_name
+        self.project_dir = project_dir
+        self.files = files
+        # What differs from the last push to an existing repository, and a callback once pushed
+        self.changed = changed
+        self.on_pushed = on_pushed
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_timeout = poll_timeout
+        # Optional semaphore bounding how many jobs run at once across pipelines
+        self.slots = slots
+        self.on_event = on_event
+        self.cancelled = threading.Event()
+        self.deployment_id = None
+        self.stage = None
+
+    def emit(self, status, message, url=None):
+        event = {"job": self.job_id, "stage": self.stage, "status": status, "message": message, "url": url}
+        self.events.put(event)
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"Deployment event handler failed: {e}")
+
+    def fail(self, message, url=None):
+        """Report a failure, unless the job was superseded meanwhile and failed because of that"""
+        self._check_cancelled()
+        self.emit("failed", message, url)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _check_cancelled(self):
+        if self.cancelled.is_set():
+            raise DeploymentCancelled()
+
+    def _enter(self, stage, message):
+        self._check_cancelled()
+        self.stage = stage
+        self.emit("started", message)
+
+    def run(self):
+        with tracer.turn("deploy", job=self.job_id):
+            if self.slots is None:
+                return self._run()
+            if not self._wait_for_slot():
+                return
+            try:
+                self._run()
+            finally:
+                self.slots.release()
+
+    def _wait_for_slot(self):
+        """Block until a shared deployment slot frees up; False if cancelled meanwhile"""
+        if self.slots.acquire(blocking=False):
+            return True
+        self.stage = "queued"
+        self.emit("started", "Waiting for a free deployment worker...")
+        while not self.slots.acquire(timeout=0.5):
+            if self.cancelled.is_set():
+                self.emit("cancelled", "Superseded by a newer deployment.")
+                return False
+        return True
+
+    def _run(self):
+        try:
+            self._enter("repository", "Creating GitHub repository...")
+            created = self.agent.create_github_repo(self.repo_name)
+            repo = created or self.agent.find_github_repo(self.repo_name)
+            if not repo:
+                return self.fail("Could not create the GitHub repository.")
+            self.emit("done", f"GitHub repository ready: {repo['html_url']}", repo["html_url"])
+
+            self._enter("push", "Pushing your code to GitHub...")
+            # A new repository needs every file; an existing one only what changed since the last push
+            files = self.files if created or self.changed is None else self.changed
+            with _push_lock(repo["full_name"]):
+                self._check_cancelled()
+                pushed = not files or self.agent.push_to_github(repo["full_name"], files,
+                                                                 branch=repo.get("default_branch", "main"))
+            if not pushed:
+                return self.fail("Pushing to GitHub failed.")
+            if self.on_pushed:
+                self.on_pushed()
+            self.emit("done", f"Code pushed to GitHub ({len(files)} of {len(self.files)} files changed).")
+
+            self._enter("deploy", "Uploading to Vercel...")
+            deployment = self.agent.deploy_files(self.project_dir, self.repo_name)
+            if not deployment:
+                return self.fail("Creating the Vercel deployment failed.")
+            self.deployment_id = deployment.get("id")
+            self.emit("done", "Deployment created, waiting for the build.")
+
+            self._enter("build", "Building on Vercel...")
+            state = self._wait_until_ready(deployment)
+            url = f"https://{deployment['url']}"
+            if state in READY_STATES:
+                self.emit("ready", f"Your web app is now live at: {url}", url)
+            else:
+                self.fail(f"Deployment finished with state {state}.", url)
+        except DeploymentCancelled:
+            if self.deployment_id:
+                self.agent.cancel_deployment(self.deployment_id)
+            self.emit("cancelled", "Superseded by a newer deployment.")
+        except Exception as e:
+            if self.cancelled.is_set():
+                return self.emit("cancelled", "Superseded by a newer deployment.")
+            self.emit("failed", f"Deployment error: {e}")
+
+    def _wait_until_ready(self, deployment):
+        """Poll the deployment with exponential backoff until it settles"""
+        state = deployment.get("readyState")
+        delay = self.poll_initial
+        deadline = time.monotonic() + self.poll_timeout
+        while state not in READY_STATES | FAILED_STATES:
+            if time.monotonic() > deadline:
+                return "TIMEOUT"
+            if self.cancelled.wait(delay):
+                raise DeploymentCancelled()
+            status = self.agent.get_deployment(self.deployment_id)
+            if status:
+                state = status.get("readyState")
+            delay = min(delay * 2, self.poll_max)
+        return state
+
+
+class DeploymentPipeline:
+    """Start deployment jobs in the background; a new job supersedes the running one
+
+    on_event is called from the job's thread as each event happens, so
+    outcomes can be announced right away rather than on the next poll.
+    """
+
+    def __init__(self, agent, slots=None, on_event=None):
+        self.agent = agent
+        self.slots = slots
+        self.on_event = on_event
+        self.events = queue.Queue()
+        self.current = None
+        self.ids = itertools.count(1)
+
+    def start(self, repo_name, project_dir, files, changed=None, on_pushed=None):
+        """Cancel any in-flight deployment and start a new one"""
+        if self.busy():
+            self.current.cancel()
+        self.current = DeploymentJob(next(self.ids), self.agent, self.events, repo_name, project_dir, files,
+                                     changed=changed, on_pushed=on_pushed, slots=self.slots,
+                                     on_event=self.on_event)
+        self.current.start()
+        return self.current
+
+    def busy(self):
+        return self.current is not None and self.current.is_alive()
+
+    def poll_events(self):
+        """Return every event emitted since the last call, without blocking"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def cancel(self):
+        if self.busy():
+            self.current.cancel()
@@ -1,14 +1,33 @@
 import os
-import requests
+import base64
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from pathlib import Path
+from cache import DEFAULT_CACHE_ROOT, content_hash
+from clients import clients
+from file_manifest import hash_tree
+from tracing import tracer
 import json
 
 load_dotenv()
 
+
+def _body(response):
+    """The decoded JSON body, or the raw text when the server sent something else, e.g. an HTML 502"""
+    try:
+        return response.json()
+    except ValueError:
+        return response.text
+
+
 class DeploymentAgent:
-    def __init__(self):
+    def __init__(self, github_api=None, vercel_api=None, session=None):
         self.github_token = os.getenv("GITHUB_TOKEN")
         self.vercel_token = os.getenv("VERCEL_TOKEN")
+        self.github_api = github_api or os.getenv("GITHUB_API_URL", "https://api.github.com")
+        self.vercel_api = vercel_api or os.getenv("VERCEL_API_URL", "https://api.vercel.com")
         self.github_headers = {
             "Authorization": f"token {self.github_token}",
             "Accept": "application/vnd.github.v3+json"
@@ -16,40 +35,149 @@ class DeploymentAgent:
         self.vercel_headers = {
             "Authorization": f"Bearer {self.vercel_token}"
         }
+        # GitHub and Vercel calls share the registry's keep-alive session unless one is passed in
+        self._session = session
+        self.max_rate_limit_wait = 60
+        self.last_upload_stats = None
+        
+    def _github(self, method, path, **kwargs):
+        """Call the GitHub API on the shared session, waiting out primary rate limits"""
+        while True:
+            with tracer.span("github.request", method=method, path=path) as span:
+                response = self.session.request(method, f"{self.github_api}{path}",
+                                                headers=self.github_headers, **kwargs)
+                span.set(status=response.status_code)
+                span.add("bytes_sent", len(response.request.body or b""))
+                span.add("bytes_received", len(response.content))
+            if response.status_code not in (403, 429) or response.headers.get("X-RateLimit-Remaining") != "0":
+                return response
+            reset = int(response.headers.get("X-RateLimit-Reset", time.time() + 1))
+            wait = max(1, reset - time.time())
+            if wait > self.max_rate_limit_wait:
+                return response
+            print(f"GitHub rate limit reached, waiting {wait:.0f}s")
+            time.sleep(wait)
         
     def create_github_repo(self, repo_name, description=""):
         """Create a new GitHub repository"""
-        url = "https://api.github.com/user/repos"
         data = {
             "name": repo_name,
             "description": description,
-            "private": False
+            "private": False,
+            # An initial commit gives push_to_github a branch to build on
+            "auto_init": True
         }
         
-        response = requests.post(url, headers=self.github_headers, json=data)
+        response = self._github("POST", "/user/repos", json=data)
         return response.json() if response.status_code == 201 else None
         
-    def push_to_github(self, repo_name, files):
-        """Push generated files to GitHub"""
-        base_url = f"https://api.github.com/repos/{repo_name}/contents"
+    def find_github_repo(self, repo_name):
+        """Look up an existing repository of the authenticated user by name"""
+        response = self._github("GET", "/user")
+        if response.status_code != 200:
+            return None
+        response = self._github("GET", f"/repos/{response.json()['login']}/{repo_name}")
+        return response.json() if response.status_code == 200 else None
         
-        for file_path, content in files.items():
-            data = {
-                "message": f"Add {file_path}",
-                "content": content.encode('utf-8').hex(),
-                "branch": "main"
-            }
-            
-            response = requests.put(f"{base_url}/{file_path}", 
-                                  headers=self.github_headers, 
-                                  json=data)
-            
+    @tracer.traced("github.push")
+    def push_to_github(self, repo_name, files, message="Update from DEVIS", branch=None):
+        """Push generated files to GitHub as a single commit
+
+        Uses the Git Data API: text files are sent inline in one tree request
+        and binary files become blobs created concurrently, followed by one
+        commit and a ref update. Files mapped to None are deleted, so a push
+        can carry just what changed. branch defaults to the repository's
+        default branch. Returns the new commit SHA or None.
+        """
+        repo_path = f"/repos/{repo_name}/git"
+        if branch is None:
+            response = self._github("GET", f"/repos/{repo_name}")
+            branch = response.json().get("default_branch", "main") if response.status_code == 200 else "main"
+        files = {path: content.encode("utf-8") if isinstance(content, str) else content
+                 for path, content in files.items()}
+        if not files:
+            return None
+        
+        response = self._github("GET", f"{repo_path}/ref/heads/{branch}")
+        if response.status_code != 200:
+            # The Git Data API refuses to work on an empty repository, so seed it
+            # with one file through the contents API and build on that commit
+            first_path = next(iter(files))
+            response = self._github("PUT", f"/repos/{repo_name}/contents/{first_path}", json={
+                "message": message,
+                "content": base64.b64encode(files.pop(first_path)).decode("ascii"),
+                "branch": branch
+            })
             if response.status_code not in [201, 200]:
-                print(f"Error pushing {file_path}: {response.json()}")
+                print(f"Error initializing {repo_name}: {_body(response)}")
+                return None
+            parent_sha = response.json()["commit"]["sha"]
+            if not files:
+                return parent_sha
+        else:
+            parent_sha = response.json()["object"]["sha"]
+        
+        response = self._github("GET", f"{repo_path}/commits/{parent_sha}")
+        if response.status_code != 200:
+            print(f"Error reading commit {parent_sha}: {_body(response)}")
+            return None
+        base_tree = response.json()["tree"]["sha"]
+        
+        def create_blob(item):
+            path, content = item
+            response = self._github("POST", f"{repo_path}/blobs", json={
+                "content": base64.b64encode(content).decode("ascii"),
+                "encoding": "base64"
+            })
+            if response.status_code != 201:
+                raise RuntimeError(f"Error creating blob for {path}: {_body(response)}")
+            return {"path": path, "mode": "100644", "type": "blob", "sha": response.json()["sha"]}
+        
+        # Text files go inline in the tree request; only binary files need blobs
+        tree = []
+        binary = {}
+        for path, content in files.items():
+            if content is None:
+                # A null sha deletes the path from the base tree
+                tree.append({"path": path, "mode": "100644", "type": "blob", "sha": None})
+                continue
+            try:
+                tree.append({"path": path, "mode": "100644", "type": "blob", "content": content.decode("utf-8")})
+            except UnicodeDecodeError:
+                binary[path] = content
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, create_blob, item)
+                           for item in binary.items()]
+                tree.extend(future.result() for future in futures)
+        except RuntimeError as e:
+            print(e)
+            return None
+        
+        response = self._github("POST", f"{repo_path}/trees", json={"base_tree": base_tree, "tree": tree})
+        if response.status_code != 201:
+            print(f"Error creating tree: {_body(response)}")
+            return None
+        
+        response = self._github("POST", f"{repo_path}/commits", json={
+            "message": message,
+            "tree": response.json()["sha"],
+            "parents": [parent_sha]
+        })
+        if response.status_code != 201:
+            print(f"Error creating commit: {_body(response)}")
+            return None
+        commit_sha = response.json()["sha"]
+        
+        response = self._github("PATCH", f"{repo_path}/refs/heads/{branch}", json={"sha": commit_sha})
+        if response.status_code != 200:
+            print(f"Error updating {branch}: {_body(response)}")
+            return None
+        return commit_sha
                 
     def deploy_to_vercel(self, github_repo_url):
         """Deploy the GitHub repository to Vercel"""
-        url = "https://api.vercel.com/v9/projects"
+        url = f"{self.vercel_api}/v9/projects"
         
         # Create project
         project_data = {
@@ -60,23 +188,112 @@ class DeploymentAgent:
             }
         }
         
-        response = requests.post(url, headers=self.vercel_headers, json=project_data)
+        response = self.session.post(url, headers=self.vercel_headers, json=project_data)
         if response.status_code != 201:
-            print(f"Error creating Vercel project: {response.json()}")
+            print(f"Error creating Vercel project: {_body(response)}")
             return None
             
         project_id = response.json()["id"]
         
         # Trigger deployment
-        deploy_url = f"https://api.vercel.com/v13/deployments"
+        deploy_url = f"{self.vercel_api}/v13/deployments"
         deploy_data = {
             "projectId": project_id,
             "target": "production"
         }
         
-        response = requests.post(deploy_url, headers=self.vercel_headers, json=deploy_data)
+        response = self.session.post(deploy_url, headers=self.vercel_headers, json=deploy_data)
         return response.json() if response.status_code == 201 else None
 
+    def _upload_vercel_file(self, path, sha):
+        """Upload one file to Vercel's content-addressed file store"""
+        data = Path(path).read_bytes()
+        with tracer.span("vercel.upload") as span:
+            response = self.session.post(f"{self.vercel_api}/v2/files", data=data, headers={
+                **self.vercel_headers,
+                "Content-Type": "application/octet-stream",
+                "x-vercel-digest": sha
+            })
+            span.add("bytes_sent", len(data))
+        if response.status_code != 200:
+            raise RuntimeError(f"Error uploading {path}: {response.text}")
+        return len(data)
+
+    @tracer.traced("vercel.deploy")
+    def deploy_files(self, project_dir, name, project_settings=None, target="production"):
+        """Deploy a local directory to Vercel, uploading only files the server lacks
+
+        Every file is identified by its SHA-1. The deployment is created from
+        that manifest; Vercel answers with the hashes it does not have yet,
+        which are uploaded in parallel before the deployment is created again.
+        Hashes are cached per directory keyed on mtime and size, so a redeploy
+        after a one-line change hashes and uploads one file. These are source
+        files, node_modules excluded: Vercel runs the create-react-app build
+        itself, so there is no local build output to upload.
+        """
+        project_dir = Path(project_dir)
+        cache_path = DEFAULT_CACHE_ROOT / "deploy_manifests" / f"{content_hash(str(project_dir.resolve()))[:16]}.json"
+        manifest = hash_tree(project_dir, cache_path)
+        by_sha = {entry["sha"]: project_dir / path for path, entry in manifest.items()}
+        
+        deploy_data = {
+            "name": name,
+            "target": target,
+            "files": [{"file": path, "sha": entry["sha"], "size": entry["size"]} for path, entry in manifest.items()],
+            "projectSettings": project_settings or {"framework": "create-react-app"}
+        }
+        self.last_upload_stats = {"files": len(manifest), "uploaded": 0, "bytes": 0}
+        
+        for _ in range(2):
+            response = self.session.post(f"{self.vercel_api}/v13/deployments",
+                                         headers=self.vercel_headers, json=deploy_data)
+            if response.status_code in (200, 201):
+                return response.json()
+            
+            body = _body(response)
+            error = body.get("error", {}) if isinstance(body, dict) else {}
+            if error.get("code") != "missing_files":
+                print(f"Error creating Vercel deployment: {body}")
+                return None
+            
+            missing = [sha for sha in error.get("missing", []) if sha in by_sha]
+            try:
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    futures = [executor.submit(contextvars.copy_context().run,
+                                               self._upload_vercel_file, by_sha[sha], sha)
+                               for sha in missing]
+                    sizes = [future.result() for future in futures]
+            except RuntimeError as e:
+                print(e)
+                return None
+            self.last_upload_stats["uploaded"] += len(sizes)
+            self.last_upload_stats["bytes"] += sum(sizes)
+        
+        print(f"Vercel still reports missing files: {_body(response)}")
+        return None
+
+    @tracer.traced("vercel.status")
+    def get_deployment(self, deployment_id):
+        """Fetch a Vercel deployment, including its readyState"""
+        response = self.session.get(f"{self.vercel_api}/v13/deployments/{deployment_id}",
+                                    headers=self.vercel_headers)
+        return response.json() if response.status_code == 200 else None
+
+    def cancel_deployment(self, deployment_id):
+        """Cancel a Vercel deployment that is still building"""
+        response = self.session.patch(f"{self.vercel_api}/v12/deployments/{deployment_id}/cancel",
+                                      headers=self.vercel_headers)
+        return response.status_code == 200
+
+    @property
+    def session(self):
+        return self._session or clients.http()
+
+    def cleanup(self):
+        """Close a session passed in; the shared one is closed with the registry"""
+        if self._session is not None:
+            self._session.close()
+
 if __name__ == "__main__":
     agent = DeploymentAgent()
     # Example usage
@@ -0,0 +1,636 @@
+import base64
+import hashlib
+import io
+import itertools
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+import numpy as np
+
+# Rough size of one token, used to turn text into token counts and stream chunks
+CHARS_PER_TOKEN = 4
+# mp3_44100_128 output is 16 kB per second of speech
+MP3_BYTES_PER_SECOND = 16000
+
+
+class CallStats:
+    """Thread-safe call and byte counters shared by the fakes, keyed by service"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: defaultdict(int))
+
+    def record(self, service, calls=1, **amounts):
+        with self.lock:
+            self.counters[service]["calls"] += calls
+            for key, amount in amounts.items():
+                self.counters[service][key] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return {service: dict(counters) for service, counters in self.counters.items()}
+
+
+def _tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _usage(prompt, content):
+    return SimpleNamespace(prompt_tokens=_tokens(prompt), completion_tokens=_tokens(content),
+                           total_tokens=_tokens(prompt) + _tokens(content))
+
+
+def fake_app(requirements, sections=12):
+    """A deterministic App.js/App.css pair, sized like a small generated app"""
+    title = requirements.strip().rstrip(".").capitalize() or "My App"
+    items = "\n".join(
+        f"""        <section className="Card card-{i}">
+          <h2>Section {i}</h2>
+          <p>Placeholder content for section {i} of {title.lower()}.</p>
+        </section>""" for i in range(sections))
+    code = f"""import React, {{ useState }} from 'react';
+import './App.css';
+
+function App() {{
+  const [count, setCount] = useState(0);
+
+  return (
+    <div className="App">
+      <header className="App-header">
+        <h1>{title}</h1>
+        <button onClick={{() => setCount(count + 1)}}>Clicked {{count}} times</button>
+      </header>
+      <main className="App-main">
+{items}
+      </main>
+    </div>
+  );
+}}
+
+export default App;
+"""
+    cards = "\n\n".join(
+        f""".card-{i} h2 {{
+  color: #{(i * 2654435761) % 0xffffff:06x};
+  margin: 0 0 8px;
+}}""" for i in range(sections))
+    styles = f""".App {{
+  font-family: sans-serif;
+  text-align: center;
+}}
+
+.App-header {{
+  background-color: #282c34;
+  color: white;
+  padding: 24px;
+}}
+
+.Card {{
+  border: 1px solid #dee2e6;
+  border-radius: 8px;
+  margin: 16px auto;
+  max-width: 640px;
+  padding: 16px;
+}}
+
+{cards}
+"""
+    return code, styles
+
+
+def fake_edit(prompt):
+    """Answer an edit_app prompt with hunks retitling the app and recoloring the header"""
+    request = re.search(r"Change request: (.*)", prompt)
+    request = request.group(1).strip() if request else "update"
+    color = hashlib.sha1(request.encode("utf-8")).hexdigest()[:6]
+    hunks = []
+    title = re.search(r"^(\s*)<(h[12])([^>]*)>.*</\2>$", prompt, re.MULTILINE)
+    if title:
+        indent, tag, attributes = title.groups()
+        hunks.append(f"FILE: App.js\n<<<<<<< SEARCH\n{title.group(0)}\n=======\n"
+                     f"{indent}<{tag}{attributes}>{request.capitalize()}</{tag}>\n>>>>>>> REPLACE")
+    background = re.search(r"^  ((?:background-)?color): #[0-9a-f]{6};$", prompt, re.MULTILINE)
+    if background:
+        hunks.append(f"FILE: App.css\n<<<<<<< SEARCH\n{background.group(0)}\n=======\n"
+                     f"  {background.group(1)}: #{color};\n>>>>>>> REPLACE")
+    return "\n\n".join(hunks)
+
+
+COMPONENT_NAMES = ["Header", "Hero", "SearchBar", "RecipeList", "RecipeCard", "Favorites", "Ratings",
+                   "Comments", "Newsletter", "Pricing", "Testimonials", "Gallery", "Faq", "Contact", "Footer"]
+
+
+def _kebab(name):
+    return re.sub(r"([a-z0-9])([A-Z])", r"\1-\2", name).lower()
+
+
+def fake_component_files(requirements, count=8):
+    """A split app with count components, as {relative path: content}"""
+    title = requirements.strip().rstrip(".").capitalize() or "My App"
+    names = [COMPONENT_NAMES[i % len(COMPONENT_NAMES)] + (str(i // len(COMPONENT_NAMES) + 1)
+                                                          if i >= len(COMPONENT_NAMES) else "")
+             for i in range(count)]
+    files = {}
+    for i, name in enumerate(names):
+        css_class = _kebab(name)
+        heading = title if name == "Header" else f"{name} for {title.lower()}"
+        files[f"src/components/{name}.js"] = f"""import React from 'react';
+import './{name}.css';
+
+export default function {name}() {{
+  return (
+    <section className="{css_class}">
+      <h2 className="{css_class}-title">{heading}</h2>
+      <p className="{css_class}-body">Placeholder content for the {name} section.</p>
+      <button className="{css_class}-action">More</button>
+    </section>
+  );
+}}
+"""
+        files[f"src/components/{name}.css"] = f""".{css_class} {{
+  margin: 16px auto;
+  max-width: 720px;
+  padding: 16px;
+}}
+
+.{css_class}-title {{
+  color: #{(i * 2654435761) % 0xffffff:06x};
+}}
+
+.{css_class}-action {{
+  border-radius: 6px;
+  padding: 8px 16px;
+}}
+"""
+    imports = "\n".join(f"import {name} from './components/{name}';" for name in names)
+    body = "\n".join(f"      <{name} />" for name in names)
+    files["src/App.js"] = f"""import React from 'react';
+import './App.css';
+{imports}
+
+export default function App() {{
+  return (
+    <div className="App">
+{body}
+    </div>
+  );
+}}
+"""
+    files["src/App.css"] = """.App {
+  font-family: sans-serif;
+  text-align: center;
+}
+"""
+    return files
+
+
+def flatten_components(files):
+    """The same app as fake_component_files, kept in a single App.js and App.css"""
+    def components(suffix):
+        return [content for path, content in files.items()
+                if path.startswith("src/components/") and path.endswith(suffix)]
+
+    code = "import React from 'react';\nimport './App.css';\n\n" + "\n".join(
+        re.sub(r"^import .*\n", "", content, flags=re.MULTILINE).replace("export default ", "")
+        for content in components(".js"))
+    code += re.sub(r"^import .*\n", "", files["src/App.js"], flags=re.MULTILINE)
+    styles = files["src/App.css"] + "\n" + "\n".join(components(".css"))
+    return code, styles
+
+
+def fake_component_edit(prompt):
+    """Answer an edit_components prompt by retitling and recoloring the first component shown"""
+    request = re.search(r"Change request: (.*)", prompt)
+    request = request.group(1).strip() if request else "update"
+    color = hashlib.sha1(request.encode("utf-8")).hexdigest()[:6]
+    shown = dict(re.findall(r"^FILE: (src/components/\w+\.(?:js|css))\n(.*?)\nEND FILE", prompt,
+                            re.DOTALL | re.MULTILINE))
+    js = next((path for path in shown if path.endswith(".js")), None)
+    if js is None:
+        return "FILE: src/App.css\n.App {\n  font-family: sans-serif;\n  text-align: center;\n}\nEND FILE"
+    files = {js: re.sub(r"(<h2[^>]*>).*?(</h2>)", rf"\g<1>{request.capitalize()}\g<2>", shown[js], count=1)}
+    css = js[:-3] + ".css"
+    if css in shown:
+        files[css] = re.sub(r"color: #[0-9a-f]{6};", f"color: #{color};", shown[css], count=1)
+    return "\n".join(f"FILE: {path}\n{content}\nEND FILE" for path, content in files.items())
+
+
+def default_responder(prompt):
+    """Produce plausible output for each FrontendAgent prompt shape"""
+    if "split into component files" in prompt:
+        if "Change request:" in prompt:
+            return fake_component_edit(prompt)
+        requirements = re.search(r"Requirements: (.*)", prompt)
+        files = fake_component_files(requirements.group(1) if requirements else "")
+        return "\n".join(f"FILE: {path}\n{content.rstrip()}\nEND FILE" for path, content in files.items())
+    if "search/replace hunks" in prompt:
+        return fake_edit(prompt)
+    requirements = re.search(r"(?:Requirements|Component description): (.*)", prompt)
+    code, styles = fake_app(requirements.group(1) if requirements else "")
+    if "complete React App.js" in prompt:
+        return code
+    if "complete App.css" in prompt:
+        return styles
+    return "OK"
+
+
+class FakeChatCompletions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, messages, stream=False, stream_options=None, **kwargs):
+        prompt = "\n".join(message["content"] for message in messages)
+        content = self.owner.responder(prompt)
+        self.owner.stats.record("openai.chat", bytes_sent=len(prompt.encode("utf-8")),
+                                bytes_received=len(content.encode("utf-8")),
+                                prompt_tokens=_tokens(prompt), completion_tokens=_tokens(content))
+        if stream:
+            include_usage = bool(stream_options and stream_options.get("include_usage"))
+            return self._stream(prompt, content, include_usage)
+
+        time.sleep(self.owner.first_token_latency + _tokens(content) / self.owner.tokens_per_second)
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                               usage=_usage(prompt, content))
+
+    def _stream(self, prompt, content, include_usage):
+        """Yield chunks of a few tokens at the configured token rate"""
+        time.sleep(self.owner.first_token_latency)
+        step = CHARS_PER_TOKEN * self.owner.tokens_per_chunk
+        for start in range(0, len(content), step):
+            piece = content[start:start + step]
+            delta = SimpleNamespace(content=piece, role=None)
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)], usage=None)
+            time.sleep(_tokens(piece) / self.owner.tokens_per_second)
+        if include_usage:
+            yield SimpleNamespace(choices=[], usage=_usage(prompt, content))
+
+
+class FakeTranscriptions:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def create(self, model, file, **kwargs):
+        if isinstance(file, tuple):
+            data = file[1]
+        else:
+            data = file.read()
+        text = self.owner.transcripts()
+        self.owner.stats.record("openai.transcribe", bytes_sent=len(data), bytes_received=len(text))
+        time.sleep(self.owner.transcription_latency)
+        return SimpleNamespace(text=text)
+
+
+class FakeOpenAI:
+    """Stand-in for openai.OpenAI covering chat completions and Whisper transcription
+
+    Completions wait first_token_latency and then deliver tokens at
+    tokens_per_second, streamed or not. responder(prompt) chooses the reply;
+    transcripts() returns the text for each transcription request.
+    """
+
+    def __init__(self, stats=None, responder=default_responder, transcripts=lambda: "",
+                 first_token_latency=0.3, tokens_per_second=400.0, tokens_per_chunk=4,
+                 transcription_latency=0.2):
+        self.stats = stats or CallStats()
+        self.responder = responder
+        self.transcripts = transcripts
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_chunk = tokens_per_chunk
+        self.transcription_latency = transcription_latency
+        self.chat = SimpleNamespace(completions=FakeChatCompletions(self))
+        self.audio = SimpleNamespace(transcriptions=FakeTranscriptions(self))
+
+
+class FakeTextToSpeech:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def convert(self, text, voice_id=None, model_id=None, output_format=None, **kwargs):
+        self.owner.stats.record("elevenlabs.tts", characters=len(text))
+        time.sleep(self.owner.latency)
+        seconds = len(text) / self.owner.characters_per_second
+        audio = bytes(int(seconds * MP3_BYTES_PER_SECOND))
+        for start in range(0, len(audio), 4096):
+            chunk = audio[start:start + 4096]
+            self.owner.stats.record("elevenlabs.tts", calls=0, bytes_received=len(chunk))
+            yield chunk
+
+
+class FakeElevenLabs:
+    """Stand-in for the ElevenLabs client; audio length follows the text length"""
+
+    def __init__(self, stats=None, latency=0.25, characters_per_second=15.0):
+        self.stats = stats or CallStats()
+        self.latency = latency
+        self.characters_per_second = characters_per_second
+        self.text_to_speech = FakeTextToSpeech(self)
+
+
+class FakePlayer:
+    """Replaces elevenlabs.play: sleeps for the clip's duration divided by speedup"""
+
+    def __init__(self, speedup=20.0):
+        self.speedup = speedup
+
+    def __call__(self, audio):
+        time.sleep(len(audio) / MP3_BYTES_PER_SECOND / self.speedup)
+
+
+class ScriptedMicrophone:
+    """Stand-in for the sounddevice module that "speaks" a script of utterances
+
+    Each InputStream plays one utterance: pre-roll silence, speech-like audio
+    and then silence, delivered speedup times faster than real time so VAD
+    endpointing runs exactly as it would live. The matching text is handed
+    out by take(), which serves as FakeOpenAI's transcripts callable. Once
+    the script is exhausted the stream only produces silence.
+    """
+
+    def __init__(self, utterances, speech_seconds=1.5, speedup=20.0, block_size=1024, seed=0):
+        self.utterances = list(utterances)
+        self.speech_seconds = speech_seconds
+        self.speedup = speedup
+        self.block_size = block_size
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+        self.current = None
+
+    def take(self):
+        """Return the text of the utterance being captured, once"""
+        with self.lock:
+            text, self.current = self.current, None
+        return text or ""
+
+    def _signal(self, sample_rate, speaking):
+        silence = (0.0005 * self.rng.standard_normal(int(0.5 * sample_rate))).astype(np.float32)
+        if not speaking:
+            return silence
+        t = np.arange(int(self.speech_seconds * sample_rate)) / sample_rate
+        voice = sum(np.sin(2 * np.pi * f * t) / (i + 1) for i, f in enumerate((180, 360, 540, 900)))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4 * t)
+        speech = (0.2 * voice * envelope).astype(np.float32)
+        return np.concatenate([silence, speech])
+
+    def InputStream(self, samplerate, channels=1, dtype=None, callback=None, **kwargs):
+        with self.lock:
+            text = self.utterances.pop(0) if self.utterances else None
+            self.current = text
+        return _ScriptedStream(self, samplerate, callback, self._signal(samplerate, text is not None))
+
+    def rec(self, frames, samplerate, channels=1, dtype=None, **kwargs):
+        with self.lock:
+            self.current = self.utterances.pop(0) if self.utterances else None
+        signal = self._signal(samplerate, self.current is not None)
+        recording = np.zeros((frames, channels), dtype=np.float32)
+        recording[:min(frames, len(signal)), 0] = signal[:frames]
+        return recording
+
+    def wait(self):
+        pass
+
+
+class _ScriptedStream:
+    def __init__(self, microphone, sample_rate, callback, signal):
+        self.microphone = microphone
+        self.sample_rate = sample_rate
+        self.callback = callback
+        self.signal = signal
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        block = self.microphone.block_size
+        delay = block / self.sample_rate / self.microphone.speedup
+        for offset in itertools.count(0, block):
+            if self.stopped.is_set():
+                return
+            samples = self.signal[offset:offset + block]
+            if len(samples) < block:
+                tail = (0.0005 * self.microphone.rng.standard_normal(block - len(samples))).astype(np.float32)
+                samples = np.concatenate([samples, tail])
+            self.callback(samples.reshape(-1, 1), block, None, None)
+            time.sleep(delay)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+class FakeBrowserTool:
+    """Stand-in for scrapybara.tools.BrowserTool returning a fixed screenshot"""
+
+    def __init__(self, instance, image=None):
+        self.instance = instance
+        self.image = image
+
+    def __call__(self, command, url=None, **kwargs):
+        time.sleep(self.instance.owner.command_latency)
+        self.instance.owner.stats.record("scrapybara.browser")
+        if command == "screenshot":
+            if self.image is None:
+                from PIL import Image
+                buffer = io.BytesIO()
+                Image.new("RGB", (1280, 800), (248, 249, 250)).save(buffer, format="PNG")
+                self.image = buffer.getvalue()
+            return SimpleNamespace(base_64_image=base64.b64encode(self.image).decode("ascii"))
+        return SimpleNamespace(output="")
+
+
+class FakeInstance:
+    def __init__(self, owner):
+        self.owner = owner
+        self.browser = SimpleNamespace(start=lambda: self._call("browser.start"),
+                                       stop=lambda: self._call("browser.stop"))
+
+    def _call(self, name, latency=None):
+        self.owner.stats.record(f"scrapybara.{name}")
+        time.sleep(self.owner.command_latency if latency is None else latency)
+
+    def bash(self, command):
+        self._call("bash")
+
+    def pause(self):
+        self._call("pause")
+
+    def resume(self, timeout_hours=None):
+        self._call("resume", self.owner.resume_latency)
+
+    def stop(self):
+        self._call("stop")
+
+
+class FakeScrapybara:
+    """Stand-in for the Scrapybara client with cold-start and resume delays"""
+
+    def __init__(self, stats=None, start_latency=2.0, resume_latency=0.3, command_latency=0.05):
+        self.stats = stats or CallStats()
+        self.start_latency = start_latency
+        self.resume_latency = resume_latency
+        self.command_latency = command_latency
+
+    def start_ubuntu(self, timeout_hours=None, **kwargs):
+        self.stats.record("scrapybara.start")
+        time.sleep(self.start_latency)
+        return FakeInstance(self)
+
+
+class FakeGenAI:
+    """Stand-in for google.genai.Client answering every analysis with fixed text"""
+
+    def __init__(self, stats=None, latency=1.0, text="A clean layout with a dark header and a card grid."):
+        self.stats = stats or CallStats()
+        self.latency = latency
+        self.text = text
+        self.models = SimpleNamespace(generate_content=self._generate)
+
+    def _generate(self, model, contents, **kwargs):
+        sent = sum(len(part["inline_data"]["data"]) for content in contents
+                   for part in content["parts"] if "inline_data" in part)
+        self.stats.record("gemini.generate", bytes_sent=sent, bytes_received=len(self.text))
+        time.sleep(self.latency)
+        return SimpleNamespace(text=self.text)
+
+
+class _APIState:
+    def __init__(self, build_polls):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.repos = {}
+        self.heads = {}
+        self.blobs = set()
+        self.deployments = {}
+        self.build_polls = build_polls
+
+    def sha(self):
+        return hashlib.sha1(str(next(self.ids)).encode()).hexdigest()
+
+
+class _APIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        service = "vercel" if re.match(r"/v\d+/", self.path) else "github"
+        data = {}
+        if raw and self.path != "/v2/files":
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                pass
+        with self.server.state.lock:
+            status, payload = (self._vercel if service == "vercel" else self._github)(data, raw)
+        sent = self._reply(status, payload)
+        self.server.stats.record(f"http.{service}", bytes_sent=len(raw), bytes_received=sent)
+
+    do_GET = do_POST = do_PUT = do_PATCH = _handle
+
+    def _github(self, data, raw):
+        state = self.server.state
+        method, path = self.command, self.path
+        if (method, path) == ("GET", "/user"):
+            return 200, {"login": "devis"}
+        if (method, path) == ("POST", "/user/repos"):
+            if data["name"] in state.repos:
+                return 422, {"message": "Repository creation failed."}
+            full_name = f"devis/{data['name']}"
+            state.repos[data["name"]] = repo = {"name": data["name"], "full_name": full_name,
+                                               "html_url": f"https://github.com/{full_name}",
+                                               "default_branch": "main"}
+            if data.get("auto_init"):
+                state.heads[full_name] = state.sha()
+            return 201, repo
+
+        match = re.match(r"/repos/([^/]+/[^/]+)(/.*)?$", path)
+        if not match or match.group(1).split("/")[1] not in state.repos:
+            return 404, {"message": "Not Found"}
+        full_name, rest = match.group(1), match.group(2) or ""
+        if method == "GET" and not rest:
+            return 200, state.repos[full_name.split("/")[1]]
+        if method == "GET" and rest.startswith("/git/ref/heads/"):
+            if full_name not in state.heads:
+                return 409, {"message": "Git Repository is empty."}
+            return 200, {"object": {"sha": state.heads[full_name]}}
+        if method == "PUT" and rest.startswith("/contents/"):
+            state.heads[full_name] = state.sha()
+            return 201, {"commit": {"sha": state.heads[full_name]}}
+        if method == "GET" and rest.startswith("/git/commits/"):
+            return 200, {"sha": rest.rsplit("/", 1)[1], "tree": {"sha": state.sha()}}
+        if method == "POST" and rest in ("/git/blobs", "/git/trees", "/git/commits"):
+            return 201, {"sha": state.sha()}
+        if method == "PATCH" and rest.startswith("/git/refs/heads/"):
+            state.heads[full_name] = data["sha"]
+            return 200, {"object": {"sha": data["sha"]}}
+        return 404, {"message": "Not Found"}
+
+    def _vercel(self, data, raw):
+        state = self.server.state
+        method, path = self.command, self.path
+        if (method, path) == ("POST", "/v2/files"):
+            state.blobs.add(self.headers.get("x-vercel-digest"))
+            return 200, {}
+        if (method, path) == ("POST", "/v13/deployments"):
+            missing = [f["sha"] for f in data.get("files", []) if f["sha"] not in state.blobs]
+            if missing:
+                return 400, {"error": {"code": "missing_files", "missing": missing}}
+            deployment_id = f"dpl_{next(state.ids)}"
+            state.deployments[deployment_id] = {"id": deployment_id, "url": f"{data['name']}.vercel.app",
+                                                "readyState": "QUEUED", "polls": 0}
+            return 200, {k: v for k, v in state.deployments[deployment_id].items() if k != "polls"}
+        match = re.match(r"/v1[23]/deployments/([^/]+)(/cancel)?$", path)
+        if match and match.group(1) in state.deployments:
+            deployment = state.deployments[match.group(1)]
+            if match.group(2):
+                deployment["readyState"] = "CANCELED"
+            elif deployment["readyState"] not in ("READY", "CANCELED"):
+                deployment["polls"] += 1
+                deployment["readyState"] = "READY" if deployment["polls"] >= state.build_polls else "BUILDING"
+            return 200, {k: v for k, v in deployment.items() if k != "polls"}
+        return 404, {"error": {"code": "not_found"}}
+
+
+class LocalAPIServer:
+    """Local HTTP stand-in for the GitHub and Vercel endpoints DeploymentAgent uses
+
+    Serves both APIs on one port: pass url as github_api and vercel_api.
+    Deployments report BUILDING until they have been polled build_polls times.
+    """
+
+    def __init__(self, stats=None, build_polls=2, host="127.0.0.1", port=0):
+        self.stats = stats or CallStats()
+        self.httpd = ThreadingHTTPServer((host, port), _APIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = _APIState(build_polls)
+        self.httpd.stats = self.stats
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+DEFAULT_EXCLUDES = {"node_modules", ".git", ".vercel", ".DS_Store"}
+
+
+def sha1_file(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_files(directory, exclude=DEFAULT_EXCLUDES):
+    """Yield (relative posix path, absolute path) for every file under directory, skipping excluded names"""
+    directory = Path(directory)
+    for root, dirs, filenames in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in exclude)
+        for filename in sorted(filenames):
+            if filename in exclude:
+                continue
+            path = Path(root) / filename
+            yield path.relative_to(directory).as_posix(), path
+
+
+def hash_tree(directory, cache_path=None, exclude=DEFAULT_EXCLUDES):
+    """Return {relative path: {"sha": sha1, "size": bytes}} for a directory tree
+
+    With cache_path, hashes from the previous run are reused for files whose
+    mtime and size are unchanged, so only edited files are read again.
+    """
+    cached = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+
+    manifest = {}
+    for relative, path in iter_files(directory, exclude):
+        stat = path.stat()
+        previous = cached.get(relative)
+        if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+            sha = previous["sha"]
+        else:
+            sha = sha1_file(path)
+        manifest[relative] = {"sha": sha, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    if cache_path:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, cache_path)
+    return manifest
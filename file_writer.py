@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from streaming import file_mode
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ProjectWriter:
+    """Write generated files into a project without needless dev-server rebuilds
+
+    Content identical to what is already on disk is skipped. Changed files are
+    written to temp files first and then renamed into place back to back, so
+    the watcher never sees a half-written file and every file changed in one
+    batch lands inside a single rebuild window.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.staged = None
+        self.stats = {"writes": 0, "skipped": 0, "rebuilds": 0}
+        self.last_changed = []
+
+    def _current_digest(self, path):
+        try:
+            return _digest(path.read_bytes())
+        except OSError:
+            return None
+
+    @contextmanager
+    def batch(self):
+        """Collect writes made inside the block and apply them together on exit"""
+        outer = self.staged is None
+        if outer:
+            self.staged = {}
+        try:
+            yield self
+            if outer:
+                self._commit(self.staged)
+        finally:
+            if outer:
+                self.staged = None
+
+    def write(self, relative_path, content):
+        """Write a file now, or stage it when inside batch(); None content removes the file"""
+        if self.staged is not None:
+            self.staged[relative_path] = content
+        else:
+            self._commit({relative_path: content})
+
+    def _commit(self, files):
+        """Apply staged files; return the relative paths that actually changed"""
+        pending = []
+        removed = []
+        try:
+            for relative_path, content in files.items():
+                path = self.root / relative_path
+                if content is None:
+                    if path.exists():
+                        removed.append((path, relative_path))
+                    continue
+                data = content.encode("utf-8") if isinstance(content, str) else content
+                if self._current_digest(path) == _digest(data):
+                    self.stats["skipped"] += 1
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".devis-", suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                # mkstemp creates files readable by the owner only
+                os.chmod(temp_path, file_mode(path))
+                pending.append((temp_path, path, relative_path))
+
+            # All content is on disk before the first rename, so the renames run back to back
+            for temp_path, path, _ in pending:
+                os.replace(temp_path, path)
+            for path, _ in removed:
+                path.unlink()
+        except:
+            for temp_path, _, _ in pending:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+            raise
+
+        if pending or removed:
+            self.stats["writes"] += len(pending) + len(removed)
+            self.stats["rebuilds"] += 1
+        self.last_changed = [relative_path for _, _, relative_path in pending] + \
+                            [relative_path for _, relative_path in removed]
+        return self.last_changed
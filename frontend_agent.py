@@ -1,10 +1,30 @@
-import openai
+import contextvars
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from cache import DEFAULT_CACHE_ROOT, TieredCache, content_hash
+from clients import clients
+from component_index import FILES_FORMAT, ComponentIndex, format_file_blocks, parse_file_blocks
+from patch_engine import PATCH_FORMAT, PatchError, apply_hunks, parse_hunks
+from streaming import FenceStripper, atomic_write, css_checkpoint, js_checkpoint
+from tracing import tracer
+
+# Bump when any prompt template changes so cached completions are not reused
+PROMPT_VERSION = "1"
 
 class FrontendAgent:
-    def __init__(self):
-        self.client = openai.Client()
+    model = "o1-mini"
+
+    def __init__(self, use_cache=True, client=None):
+        self._client = client
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.stream_metrics = {}
+        self.cache = TieredCache(DEFAULT_CACHE_ROOT / "llm") if use_cache else None
+        
+    @property
+    def client(self):
+        return self._client or clients.openai()
         
     def _read_current_code(self, project_dir):
         """Read current App.js and App.css content"""
@@ -14,9 +34,124 @@ class FrontendAgent:
             return app_js, app_css
         except:
             return None, None
+
+    def _cache_key(self, kind, requirements, *current_files):
+        """Key a completion on model, template version, request and current file hashes"""
+        file_hashes = [content_hash(content) for content in current_files]
+        return content_hash(self.model, PROMPT_VERSION, kind, requirements, *file_hashes)
+
+    def _cache_get(self, cache_key):
+        if self.cache is None or cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        return cached.decode("utf-8") if cached is not None else None
+
+    def _cache_put(self, cache_key, content):
+        if self.cache is not None and cache_key is not None:
+            self.cache.put(cache_key, content.encode("utf-8"))
+
+    def _cache_delete(self, cache_key):
+        if self.cache is not None and cache_key is not None:
+            self.cache.delete(cache_key)
+
+    def _record_usage(self, span, usage):
+        if usage is not None:
+            span.add("prompt_tokens", usage.prompt_tokens)
+            span.add("completion_tokens", usage.completion_tokens)
+
+    def _complete(self, prompt, cache_key=None, parse=None):
+        """Run a blocking o1-mini completion and return the stripped text
+
+        With parse, return parse(text) instead, and cache the text only if
+        parse succeeds: a response that does not parse or apply is never
+        replayed, and one cached before this check is evicted.
+        """
+        with tracer.span("llm.complete", model=self.model) as span:
+            cached = self._cache_get(cache_key)
+            span.set(cached=cached is not None)
+            if cached is not None:
+                if parse is None:
+                    return cached
+                try:
+                    return parse(cached)
+                except PatchError:
+                    self._cache_delete(cache_key)
+                    raise
+            
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            self._record_usage(span, response.usage)
+            
+            content = response.choices[0].message.content.strip()
+            result = parse(content) if parse is not None else content
+            self._cache_put(cache_key, content)
+            return result
+
+    def _count_write(self, span, metrics, started):
+        """Count a progressive write, on the stream's span so the turn summary shows it"""
+        metrics["writes"] += 1
+        span.add("writes", 1)
+        if metrics["time_to_first_write"] is None:
+            metrics["time_to_first_write"] = time.perf_counter() - started
+            span.add("first_write_ms", 1000 * metrics["time_to_first_write"])
+
+    def _stream_complete(self, prompt, output_path, checkpoint, cache_key=None):
+        """Stream a completion into output_path, replacing it at each safe checkpoint"""
+        started = time.perf_counter()
+        metrics = {"time_to_first_write": None, "writes": 0}
+        self.stream_metrics[Path(output_path).name] = metrics
         
-    def generate_code(self, requirements, project_dir=None):
-        """Generate or update App.js based on requirements"""
+        with tracer.span("llm.stream", model=self.model, file=Path(output_path).name) as span:
+            cached = self._cache_get(cache_key)
+            span.set(cached=cached is not None)
+            if cached is not None:
+                atomic_write(output_path, cached)
+                self._count_write(span, metrics, started)
+                metrics["total_time"] = time.perf_counter() - started
+                return cached
+            
+            stripper = FenceStripper()
+            written = 0
+            
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                # The final chunk carries token usage and no choices
+                self._record_usage(span, getattr(chunk, "usage", None))
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if not stripper.feed(chunk.choices[0].delta.content):
+                    continue
+                
+                safe, suffix = checkpoint(stripper.output)
+                if safe > written:
+                    atomic_write(output_path, stripper.output[:safe] + suffix)
+                    written = safe
+                    self._count_write(span, metrics, started)
+            
+            content = stripper.finish()
+            atomic_write(output_path, content)
+            self._count_write(span, metrics, started)
+            metrics["total_time"] = time.perf_counter() - started
+            self._cache_put(cache_key, content)
+            return content
+        
+    def generate_code(self, requirements, project_dir=None, stream=False):
+        """Generate or update App.js based on requirements
+
+        With stream=True and a project_dir, App.js is rewritten progressively
+        as the completion arrives so the dev server can rebuild early.
+        """
         current_code = None
         if project_dir:
             current_code, _ = self._read_current_code(project_dir)
@@ -38,17 +173,13 @@ class FrontendAgent:
         {current_code if current_code else 'No existing code'}
         """
         
-        response = self.client.chat.completions.create(
-            model="o1-mini",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        return response.choices[0].message.content.strip()
+        cache_key = self._cache_key("App.js", requirements, current_code)
+        if stream and project_dir:
+            return self._stream_complete(prompt, Path(project_dir) / "src" / "App.js", js_checkpoint, cache_key)
+        return self._complete(prompt, cache_key)
         
-    def generate_styles(self, component_description, project_dir=None):
-        """Generate or update App.css based on requirements"""
+    def generate_styles(self, component_description, project_dir=None, stream=False):
+        """Generate or update App.css based on requirements, streaming like generate_code"""
         _, current_css = None, None
         if project_dir:
             _, current_css = self._read_current_code(project_dir)
@@ -70,23 +201,139 @@ class FrontendAgent:
         {current_css if current_css else 'No existing CSS'}
         """
         
-        response = self.client.chat.completions.create(
-            model="o1-mini",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+        cache_key = self._cache_key("App.css", component_description, current_css)
+        if stream and project_dir:
+            return self._stream_complete(prompt, Path(project_dir) / "src" / "App.css", css_checkpoint, cache_key)
+        return self._complete(prompt, cache_key)
+
+    def generate_app(self, requirements, project_dir=None, stream=False):
+        """Generate App.js and App.css concurrently, returning (code, styles)"""
+        # Both prompts are built from the files on disk before either is written,
+        # so the two round trips are independent and can overlap
+        self.stream_metrics.clear()
+        future_code = self.executor.submit(contextvars.copy_context().run,
+                                           self.generate_code, requirements, project_dir, stream)
+        future_styles = self.executor.submit(contextvars.copy_context().run,
+                                             self.generate_styles, requirements, project_dir, stream)
+        return future_code.result(), future_styles.result()
+
+    def edit_app(self, requirements, project_dir, stream=False):
+        """Apply a change as search/replace hunks, falling back to full regeneration
+
+        Returns (code, styles) like generate_app. Output tokens scale with the
+        size of the change rather than the size of the app.
+        """
+        current_code, current_css = self._read_current_code(project_dir)
+        if current_code is None or current_css is None:
+            return self.generate_app(requirements, project_dir, stream)
+        self.stream_metrics.clear()
+            
+        prompt = f"""You are editing an existing React app made of App.js and App.css. Output ONLY search/replace hunks, no explanations.
+        Change request: {requirements}
+        
+        Rules:
+        1. Each hunk names its file (App.js or App.css) and uses exactly this format:
+        {PATCH_FORMAT}
+        2. The SEARCH section must be copied verbatim from the current file and match exactly one location
+        3. Keep hunks small: include only the lines that change plus enough context to be unique
+        4. To add new code, SEARCH for a nearby line and REPLACE it with that line plus the new code
+        5. Just use pure CSS. Don't use any frameworks.
+        6. DO NOT include markdown code fences or explanations
+        
+        Current App.js:
+        {current_code}
+        
+        Current App.css:
+        {current_css}
+        """
+        
+        try:
+            cache_key = self._cache_key("patch", requirements, current_code, current_css)
+            patched = self._complete(prompt, cache_key, parse=lambda text: apply_hunks(
+                {"App.js": current_code, "App.css": current_css}, parse_hunks(text)))
+            return patched["App.js"], patched["App.css"]
+        except PatchError as e:
+            print(f"Patch could not be applied ({e}), regenerating full files")
+            return self.generate_app(requirements, project_dir, stream)
+        
+    def generate_components(self, requirements):
+        """Generate an app split into per-component files, returning {relative path: content}"""
+        prompt = f"""You are generating a React app split into component files. Output ONLY file blocks, no explanations.
+        Requirements: {requirements}
+        
+        Rules:
+        1. Output src/App.js, src/App.css and, for each component, src/components/<Name>.js and src/components/<Name>.css
+        2. Each file uses exactly this format:
+        {FILES_FORMAT}
+        3. Each component file default-exports one component named after the file and imports its own CSS file
+        4. Prefix class names with the component name in kebab case (e.g. .recipe-card-title) so selectors never collide
+        5. App.js only imports and composes components; App.css holds only global styles
+        6. Keep components small and focused, and use modern React practices
+        7. Just use pure CSS. Don't use any frameworks.
+        8. DO NOT include markdown code fences or explanations
+        """
         
-        return response.choices[0].message.content.strip()
+        cache_key = self._cache_key("components", requirements)
+        return self._complete(prompt, cache_key, parse=parse_file_blocks)
+
+    def edit_components(self, requirements, project_dir):
+        """Apply a change to a split app, sending only the components it touches
+
+        The prompt holds App.js, App.css and the files of the components
+        ComponentIndex.select picks for the request, plus a short summary of
+        the rest, so it stays about the same size as the app grows. Returns
+        {relative path: content} for the files rewritten or added. Projects
+        that are not split yet go through edit_app.
+        """
+        index = ComponentIndex(project_dir)
+        if not index.is_split():
+            code, styles = self.edit_app(requirements, project_dir)
+            return {"src/App.js": code, "src/App.css": styles}
+        self.stream_metrics.clear()
+        
+        selected = index.select(requirements)
+        shown = ["src/App.js", "src/App.css"] + index.files_for(selected)
+        current = {path: (Path(project_dir) / path).read_text() for path in shown
+                   if (Path(project_dir) / path).exists()}
+        
+        prompt = f"""You are editing a React app split into component files. Output ONLY file blocks, no explanations.
+        Change request: {requirements}
+        
+        Rules:
+        1. Output the complete new content of every file you change or add, using exactly this format:
+        {FILES_FORMAT}
+        2. Only output files shown below or new files; never output a file listed under other components
+        3. New components go in src/components/<Name>.js with their styles in src/components/<Name>.css, and must be imported where they are used
+        4. Prefix class names with the component name in kebab case so selectors never collide
+        5. Just use pure CSS. Don't use any frameworks.
+        6. DO NOT include markdown code fences or explanations
+        
+        Current files:
+        {format_file_blocks(current)}
+        
+        Other components (not shown, leave unchanged):
+        {index.summary(selected)}
+        """
+        
+        cache_key = self._cache_key("component-edit", requirements, *current.values())
+        try:
+            files = self._complete(prompt, cache_key, parse=parse_file_blocks)
+        except PatchError as e:
+            print(f"Component edit could not be applied ({e})")
+            return {}
+        hidden = set(index.files_for(index.components)) - set(shown)
+        for path in hidden & set(files):
+            print(f"Ignoring rewrite of {path}, which was not in the prompt")
+            del files[path]
+        return files
         
     def cleanup(self):
         """Clean up resources"""
-        pass
+        self.executor.shutdown(wait=False)
 
 if __name__ == "__main__":
     agent = FrontendAgent()
     sample_req = "Create a modern navigation bar with a logo, links, and a search bar"
-    code = agent.generate_code(sample_req)
-    styles = agent.generate_styles(sample_req)
+    code, styles = agent.generate_app(sample_req)
     print("Generated Code:", code)
     print("Generated Styles:", styles)
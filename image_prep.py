@@ -0,0 +1,47 @@
+import hashlib
+import io
+import os
+from PIL import Image
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg", "PNG": "image/png"}
+
+
+def load_image(image):
+    """Open PNG bytes, a file path or an existing PIL image as a PIL image"""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image))
+    return Image.open(image)
+
+
+def prepare_for_upload(image, max_dimension=1280, quality=80, image_format="WEBP"):
+    """Downscale so the longest side is at most max_dimension and recompress
+
+    Returns (bytes, mime_type). Layout, colours and components survive at this
+    size, which is all the analysis prompt asks about.
+    """
+    img = load_image(image)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    if max(img.size) > max_dimension:
+        scale = max_dimension / max(img.size)
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                         Image.LANCZOS)
+    buffer = io.BytesIO()
+    if image_format == "PNG":
+        img.save(buffer, format="PNG", optimize=True)
+    else:
+        img.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue(), MIME_TYPES[image_format]
+
+
+def save_artifact(image_bytes, directory, extension="png"):
+    """Write image bytes under a content-addressed name and return the path"""
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256(image_bytes).hexdigest()[:16]
+    path = os.path.join(directory, f"screenshot-{digest}.{extension}")
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(image_bytes)
+    return path
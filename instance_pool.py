@@ -0,0 +1,196 @@
+import threading
+import time
+from contextlib import contextmanager
+from clients import clients
+
+
+class PooledInstance:
+    """A browser-ready Scrapybara instance plus its pool bookkeeping"""
+
+    def __init__(self, instance, browser_tool):
+        self.instance = instance
+        self.browser_tool = browser_tool
+        self.paused = False
+        self.last_used = time.monotonic()
+        self.uses = 0
+
+
+class InstancePool:
+    """Keep Scrapybara instances warm between captures
+
+    Idle instances are paused rather than stopped and resumed on the next
+    acquire. A reaper thread stops instances idle longer than idle_timeout,
+    and any instance that fails its health check is discarded and replaced
+    with a fresh one. An error inside instance() only discards the instance
+    if it no longer answers commands, so a bad URL keeps the VM warm.
+    """
+
+    def __init__(self, client=None, max_size=1, idle_timeout=300, pause_when_idle=True,
+                 timeout_hours=1, reap_interval=30, tool_factory=None):
+        self._client = client
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.pause_when_idle = pause_when_idle
+        self.timeout_hours = timeout_hours
+        self.tool_factory = tool_factory
+        self.idle = []
+        self.in_use = 0
+        # Extra capacity granted for the duration of a batch by expanded()
+        self.expansions = []
+        self.lock = threading.Condition()
+        self.closed = False
+        self.stats = {"started": 0, "reused": 0, "discarded": 0, "reaped": 0}
+        self.reaper = threading.Thread(target=self._reap_loop, args=(reap_interval,), daemon=True)
+        self.reaper.start()
+
+    @property
+    def client(self):
+        return self._client or clients.scrapybara()
+
+    def _limit(self):
+        return max([self.max_size] + self.expansions)
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _browser_tool(self, instance):
+        if self.tool_factory:
+            return self.tool_factory(instance)
+        from scrapybara.tools import BrowserTool
+        return BrowserTool(instance)
+
+    def _start(self):
+        instance = self.client.start_ubuntu(timeout_hours=self.timeout_hours)
+        try:
+            instance.browser.start()
+        except Exception:
+            instance.stop()
+            raise
+        self._count("started")
+        return PooledInstance(instance, self._browser_tool(instance))
+
+    def _stop(self, pooled):
+        try:
+            pooled.instance.browser.stop()
+        except Exception:
+            pass
+        try:
+            pooled.instance.stop()
+        except Exception:
+            pass
+
+    def is_healthy(self, pooled):
+        """Resume a paused instance and check that it still answers commands"""
+        try:
+            if pooled.paused:
+                pooled.instance.resume(timeout_hours=self.timeout_hours)
+                pooled.paused = False
+            pooled.instance.bash(command="true")
+            return True
+        except Exception as e:
+            print(f"Discarding unhealthy Scrapybara instance: {e}")
+            return False
+
+    def acquire(self, timeout=None):
+        """Return a ready PooledInstance, reusing a warm one when possible"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while not self.idle and self.in_use >= self._limit():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No Scrapybara instance available")
+                self.lock.wait(remaining)
+            pooled = self.idle.pop() if self.idle else None
+            self.in_use += 1
+
+        try:
+            if pooled is not None:
+                if self.is_healthy(pooled):
+                    self._count("reused")
+                    pooled.uses += 1
+                    return pooled
+                self._count("discarded")
+                self._stop(pooled)
+            pooled = self._start()
+            pooled.uses += 1
+            return pooled
+        except Exception:
+            with self.lock:
+                self.in_use -= 1
+                self.lock.notify()
+            raise
+
+    def release(self, pooled, healthy=True):
+        """Return an instance to the pool, or stop it if it misbehaved"""
+        keep = healthy and not self.closed
+        if keep and self.pause_when_idle:
+            try:
+                pooled.instance.pause()
+                pooled.paused = True
+            except Exception as e:
+                print(f"Failed to pause Scrapybara instance: {e}")
+                keep = False
+        if not keep:
+            if not healthy:
+                self._count("discarded")
+            self._stop(pooled)
+
+        with self.lock:
+            self.in_use -= 1
+            if keep:
+                pooled.last_used = time.monotonic()
+                self.idle.append(pooled)
+            self.lock.notify()
+
+    @contextmanager
+    def instance(self, timeout=None):
+        """Context manager around acquire/release; on error the instance is kept if still healthy"""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled
+        except Exception:
+            self.release(pooled, healthy=self.is_healthy(pooled))
+            raise
+        else:
+            self.release(pooled)
+
+    @contextmanager
+    def expanded(self, size):
+        """Allow up to size instances inside the block, then stop idle ones beyond max_size"""
+        with self.lock:
+            self.expansions.append(size)
+            self.lock.notify_all()
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.expansions.remove(size)
+                surplus = max(0, len(self.idle) + self.in_use - self._limit())
+                surplus = min(surplus, len(self.idle))
+                stopped, self.idle = self.idle[:surplus], self.idle[surplus:]
+            for pooled in stopped:
+                self._stop(pooled)
+
+    def reap(self):
+        """Stop instances that have been idle longer than idle_timeout"""
+        now = time.monotonic()
+        with self.lock:
+            expired = [p for p in self.idle if now - p.last_used > self.idle_timeout]
+            self.idle = [p for p in self.idle if p not in expired]
+        for pooled in expired:
+            self._count("reaped")
+            self._stop(pooled)
+
+    def _reap_loop(self, interval):
+        while not self.closed:
+            time.sleep(interval)
+            self.reap()
+
+    def close(self):
+        """Stop every idle instance; instances in use are stopped when released"""
+        self.closed = True
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for pooled in idle:
+            self._stop(pooled)
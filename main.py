@@ -1,7 +1,16 @@
 from voice_agent import VoiceAgent
 from frontend_agent import FrontendAgent
 from deployment_agent import DeploymentAgent
+from deploy_pipeline import DeploymentPipeline
+from component_index import COMPONENTS_DIR
+from file_writer import ProjectWriter
+from patch_engine import PatchError
+from snapshot_store import SnapshotStore
+from template_cache import TemplateCache
+from clients import clients
+from tracing import tracer
 import os
+import re
 from dotenv import load_dotenv
 import subprocess
 import webbrowser
@@ -9,132 +18,316 @@ from pathlib import Path
 
 load_dotenv()
 
+WELCOME_MSG = """
+        Welcome to DEVIS - Your Voice Controlled Software Development Assistant!
+        
+        I'll help you build and deploy a web application through voice commands.
+        Let's start getting everything set up.
+        """
+
+# Prompts spoken every session, synthesized in the background at startup
+STATIC_PROMPTS = [
+    WELCOME_MSG,
+    "Setting up your React project...",
+    "Project setup complete!",
+    "What kind of web app would you like to create?",
+    "Great! I'll create a baseline app based on your requirements.",
+    "Starting development server...",
+    "Development server is running. You can see your app in the browser.",
+    "Updating your code...",
+    "Code updated! Check the browser to see your changes.",
+    "What changes would you like to make?",
+    "Processing your frontend request...",
+    "Great! Would you like to deploy your application now?",
+    "Say 'yes' to deploy or 'no' to continue development.",
+    "Deployment started in the background. You can keep making changes.",
+    "Thank you for using DEVIS! Goodbye.",
+]
+
+# Commands containing one of these are treated as change requests
+CHANGE_KEYWORDS = ['create', 'add', 'update', 'change', 'style']
+
+# "Undo", "redo" and "go back to turn 3" restore a snapshot instead of calling the model
+NUMBER_WORDS = {word: number for number, word in enumerate(
+    "one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen".split(), 1)}
+TENS_WORDS = {word: 10 * number for number, word in enumerate(
+    "twenty thirty forty fifty sixty seventy eighty ninety".split(), 2)}
+FILLER = r"(?:(?:ok|okay|hey|um+|uh+|so|well|now|devis|can you|could you|would you|will you|let's|lets|" \
+         r"i want to|i'd like to|just)\s+)*"
+# The whole utterance must be the command, so "undo that and add a footer" stays a change request
+UNDO_PATTERN = re.compile(r"^%s(undo|redo)(?:\s+(?:that|it|this|the last (?:change|edit|one)|"
+                          r"the last thing|last change|the change))?$" % FILLER)
+GOTO_PATTERN = re.compile(r"^%s(?:go back|jump back|jump|return|revert|roll back|restore|switch back)\b"
+                          r"(?:\s+\w+)*?\s+(?:turn|version|step)\s+(?:number\s+)?(?P<number>.+)$" % FILLER)
+
+
+def parse_turn_number(text):
+    """Turn "3", "twenty-one" or "twenty one" into an int; None for anything else"""
+    words = text.replace("-", " ").split()
+    if len(words) == 1 and words[0].isdigit():
+        return int(words[0])
+    if len(words) == 1:
+        return NUMBER_WORDS.get(words[0], TENS_WORDS.get(words[0]))
+    if len(words) == 2 and words[0] in TENS_WORDS and NUMBER_WORDS.get(words[1], 10) < 10:
+        return TENS_WORDS[words[0]] + NUMBER_WORDS[words[1]]
+    return None
+
+
+def parse_history_command(command):
+    """Return ("undo", None), ("redo", None), ("goto", number or None) or None for other commands
+
+    A jump whose turn number cannot be understood is ("goto", None), so it
+    can be asked about again rather than treated as a change request.
+    """
+    normalized = re.sub(r"[^\w\s'-]", " ", command.lower())
+    normalized = " ".join(word for word in normalized.split() if word != "please")
+    action = UNDO_PATTERN.match(normalized)
+    if action:
+        return action.group(1), None
+    goto = GOTO_PATTERN.match(normalized)
+    if goto:
+        return "goto", parse_turn_number(goto.group("number"))
+    return None
+
 class DEVIS:
-    def __init__(self):
-        """Initialize DEVIS with voice, frontend and deployment capabilities"""
-        self.voice_agent = VoiceAgent()
-        self.frontend_agent = FrontendAgent()
-        self.deployment_agent = DeploymentAgent()
+    def __init__(self, project_dir=None, voice_agent=None, frontend_agent=None,
+                 deployment_agent=None, dev_server=True, multi_file=False):
+        """Initialize DEVIS with voice, frontend and deployment capabilities
+
+        project_dir defaults to ~/Documents/devis-ui; pass a different one to
+        keep several projects side by side. Agents can be passed in pre-built,
+        e.g. wired to the offline fakes in fakes.py, and dev_server=False skips
+        npm start and the browser. multi_file=True splits the app into one
+        file per component and sends only the touched components each turn.
+        """
+        self.voice_agent = voice_agent or VoiceAgent()
+        self.frontend_agent = frontend_agent or FrontendAgent()
+        self.deployment_agent = deployment_agent or DeploymentAgent()
+        self.dev_server = dev_server
+        self.multi_file = multi_file
+        self.deploy_pipeline = DeploymentPipeline(self.deployment_agent, on_event=self.on_deploy_event)
         self.project_dir = None
+        self.requested_project_dir = project_dir
+        self.template_cache = TemplateCache()
+        self.writer = None
+        self.snapshots = None
+        self.voice_agent.presynthesize(STATIC_PROMPTS)
+        # Recording and transcription load while the welcome message plays
+        self.voice_agent.warm_up()
         
     def setup_local_project(self):
         """Set up local React project"""
         self.voice_agent.speak("Setting up your React project...")
-        self.project_dir = Path(os.path.expanduser("~/Documents/devis-ui"))
+        self.project_dir = Path(os.path.expanduser(self.requested_project_dir or "~/Documents/devis-ui"))
+        self.snapshots = SnapshotStore.for_project(self.project_dir)
         if not self.project_dir.exists():
-            subprocess.run(["npx", "create-react-app", str(self.project_dir)])
+            # History recorded for an earlier project at this path does not apply to a new one
+            self.snapshots.clear()
+            # Copy the cached skeleton instead of running create-react-app every time
+            try:
+                self.template_cache.materialize(self.project_dir)
+            except Exception as e:
+                print(f"React template unavailable ({e}), falling back to create-react-app")
+                subprocess.run(["npx", "create-react-app", str(self.project_dir)])
 
         self.voice_agent.speak("Project setup complete!")
         
     def run_local_dev_server(self):
         """Run local development server"""
-        if self.project_dir:
-            self.voice_agent.speak("Starting development server...")
+        if self.project_dir and self.dev_server:
+            self.voice_agent.speak("Starting development server...", wait=False)
             subprocess.Popen(["npm", "start"], cwd=self.project_dir)
             webbrowser.open("http://localhost:3000")
             self.voice_agent.speak("Development server is running. You can see your app in the browser.")
             
-    def update_local_code(self, generated_code, generated_styles):
+    def update_local_code(self, generated_code, generated_styles, label=""):
         """Update local project with new code"""
+        self.update_local_files({"src/App.js": generated_code, "src/App.css": generated_styles}, label)
+        
+    @tracer.traced("project.write")
+    def update_local_files(self, files, label=""):
+        """Write {relative path: content} into the project and snapshot the result"""
         if self.project_dir:
-            self.voice_agent.speak("Updating your code...")
-            app_file = self.project_dir / "src" / "App.js"
-            styles_file = self.project_dir / "src" / "App.css"
-            
-            with open(app_file, "w") as f:
-                f.write(generated_code)
-            with open(styles_file, "w") as f:
-                f.write(generated_styles)
+            self.voice_agent.speak("Updating your code...", wait=False)
+            self.write_files(files)
+            if self.snapshots is not None:
+                snapshot = self.snapshots.record(files, label)
+                print(f"Saved as turn {snapshot['id']}")
             self.voice_agent.speak("Code updated! Check the browser to see your changes.")
+
+    def write_files(self, files):
+        """Write {relative path: content or None to delete} in one batch; returns the changed paths"""
+        if self.writer is None or self.writer.root != self.project_dir:
+            self.writer = ProjectWriter(self.project_dir)
         
-    def run(self):
-        """Main loop for voice-controlled software development"""
-        welcome_msg = """
-        Welcome to DEVIS - Your Voice Controlled Software Development Assistant!
+        # One batch so the dev server rebuilds once, and only if something changed
+        with self.writer.batch():
+            for relative_path, content in files.items():
+                self.writer.write(relative_path, content)
+        stats = self.writer.stats
+        print(f"Changed: {', '.join(self.writer.last_changed) or 'nothing'} "
+              f"({stats['rebuilds']} rebuilds, {stats['skipped']} skipped writes this session)")
+        return self.writer.last_changed
+
+    def handle_history_command(self, command):
+        """Undo, redo or jump to an earlier turn if the command asks for it; True when it did
+
+        Restoring swaps files from the snapshot store, so it takes no model
+        call and rewrites only the files that differ.
+        """
+        parsed = parse_history_command(command)
+        if self.snapshots is None or parsed is None:
+            return False
         
-        I'll help you build and deploy a web application through voice commands.
-        Let's start getting everything set up.
+        action, number = parsed
+        previous = self.snapshots.current()
+        if action == "goto":
+            if number is None:
+                self.voice_agent.speak("Please say just the turn to go back to, like go back to turn three.")
+                return True
+            target = self.snapshots.goto(number)
+            missing = f"I don't have turn {number}."
+        elif action == "undo":
+            target = self.snapshots.undo()
+            missing = "There is nothing to undo."
+        else:
+            target = self.snapshots.redo()
+            missing = "There is nothing to redo."
+        if target is None:
+            self.voice_agent.speak(missing)
+            return True
+        
+        with tracer.span("project.restore", turn=target["id"]) as span:
+            changed = self.write_files(self.snapshots.diff(previous, target))
+            span.set(files=len(changed))
+        print(f"Restored turn {target['id']}: {target['label']}")
+        self.voice_agent.speak(f"Restored turn {target['id']}.")
+        return True
+        
+    def start_deployment(self, repo_name="devis-generated-ui"):
+        """Start a background deployment of the current project, superseding any running one
+
+        Once repo_name has been pushed to, only files changed since that push
+        are sent to GitHub.
         """
-        self.voice_agent.speak(welcome_msg)
+        files = {
+            "src/App.js": (self.project_dir / "src" / "App.js").read_text(),
+            "src/App.css": (self.project_dir / "src" / "App.css").read_text(),
+            "package.json": (self.project_dir / "package.json").read_text()
+        }
+        for path in sorted((self.project_dir / COMPONENTS_DIR).glob("*.*")):
+            files[f"{COMPONENTS_DIR}/{path.name}"] = path.read_text()
+        if self.snapshots is None:
+            return self.deploy_pipeline.start(repo_name, self.project_dir, files)
+        changed = self.snapshots.changes_since_deployed(repo_name, files)
+        return self.deploy_pipeline.start(repo_name, self.project_dir, files, changed=changed,
+                                          on_pushed=lambda: self.snapshots.mark_deployed(repo_name, files))
+
+    def create_baseline(self, requirements):
+        """Generate the first version of the app from the user's description"""
+        self.voice_agent.speak("Great! I'll create a baseline app based on your requirements.", wait=False)
+        if self.multi_file:
+            try:
+                return self.update_local_files(self.frontend_agent.generate_components(requirements), requirements)
+            except PatchError as e:
+                print(f"Component split failed ({e}), generating a single-file app")
+        baseline_code, baseline_styles = self.frontend_agent.generate_app(requirements, self.project_dir)
+        self.update_local_code(baseline_code, baseline_styles, requirements)
+
+    def apply_change(self, command):
+        """Apply a spoken change request to the current app"""
+        self.voice_agent.speak("Processing your frontend request...", wait=False)
+        if self.multi_file:
+            files = self.frontend_agent.edit_components(command, self.project_dir)
+            if not files:
+                self.voice_agent.speak("I could not apply that change. Please try again.")
+                return
+            return self.update_local_files(files, command)
+        # Try a small patch first; a full regeneration streams in if it does not apply
+        generated_code, generated_styles = self.frontend_agent.edit_app(command, self.project_dir, stream=True)
+        self.update_local_code(generated_code, generated_styles, command)
+
+    def request_deployment(self, repo_name="devis-generated-ui"):
+        """Deploy in the background so development can continue"""
+        if self.deploy_pipeline.busy():
+            self.voice_agent.speak("Replacing the deployment that is still running.", wait=False)
+        self.start_deployment(repo_name)
+        self.voice_agent.speak("Deployment started in the background. You can keep making changes.")
+
+    def on_deploy_event(self, event):
+        """Announce a deployment outcome as soon as the job reports it, without blocking the job
+
+        An outcome that arrives while the microphone is open is spoken once
+        recording ends, so it is not transcribed as part of the command.
+        """
+        if event["status"] in ("ready", "failed"):
+            self.voice_agent.announce(event["message"])
+
+    def announce_deploy_events(self):
+        """Log deployment progress since the last turn; outcomes were already spoken"""
+        for event in self.deploy_pipeline.poll_events():
+            print(f"[deploy #{event['job']}] {event['stage']}: {event['status']} - {event['message']}")
+
+    def run(self):
+        """Main loop for voice-controlled software development"""
+        self.voice_agent.speak(WELCOME_MSG)
 
         
         try:
-            # Initial setup
-            self.setup_local_project()
+            with tracer.turn("setup"):
+                # Initial setup
+                self.setup_local_project()
             
-            # Get initial requirements
-            initial_requirements = self.voice_agent.listen_for_input("What kind of web app would you like to create?")
+                # Get initial requirements
+                initial_requirements = self.voice_agent.listen_for_input("What kind of web app would you like to create?")
             
-            if initial_requirements:
-                self.voice_agent.speak("Great! I'll create a baseline app based on your requirements.")
-                baseline_code = self.frontend_agent.generate_code(initial_requirements, self.project_dir)
-                baseline_styles = self.frontend_agent.generate_styles(initial_requirements, self.project_dir)
-                self.update_local_code(baseline_code, baseline_styles)
+                if initial_requirements:
+                    self.create_baseline(initial_requirements)
             
-            # Start development server
-            self.run_local_dev_server()
+                # Start development server
+                self.run_local_dev_server()
             
             
             while True:
-                # Listen for command
-                command = self.voice_agent.listen_for_input("What changes would you like to make?")
+                with tracer.turn("turn"):
+                    self.announce_deploy_events()
                 
-                if not command:
-                    break
+                    # Listen for command
+                    command = self.voice_agent.listen_for_input("What changes would you like to make?")
                 
-                # Check if user is satisfied
-                if "looks good" in command.lower():
-                    self.voice_agent.speak("Great! Would you like to deploy your application now?")
-                    deploy_command = self.voice_agent.listen_for_input("Say 'yes' to deploy or 'no' to continue development.")
-                    
-                    if deploy_command and "yes" in deploy_command.lower():
-                        # Deployment phase
-                        self.voice_agent.speak("Starting deployment process...")
-                        
-                        # Create GitHub repository
-                        self.voice_agent.speak("Creating GitHub repository...")
-                        repo_name = "devis-generated-ui"
-                        repo = self.deployment_agent.create_github_repo(repo_name)
-                        
-                        if repo:
-                            self.voice_agent.speak(f"Created GitHub repository: {repo['html_url']}")
-                            
-                            # Push code to GitHub
-                            if self.project_dir:
-                                self.voice_agent.speak("Pushing your code to GitHub...")
-                                files = {
-                                    "src/App.js": (self.project_dir / "src" / "App.js").read_text(),
-                                    "src/App.css": (self.project_dir / "src" / "App.css").read_text(),
-                                    "package.json": (self.project_dir / "package.json").read_text()
-                                }
-                                self.deployment_agent.push_to_github(repo["full_name"], files)
-                                self.voice_agent.speak("Code pushed to GitHub successfully!")
-                                
-                                # Deploy to Vercel
-                                self.voice_agent.speak("Deploying to Vercel...")
-                                deployment = self.deployment_agent.deploy_to_vercel(self.project_dir)
-                                if deployment:
-                                    self.voice_agent.speak(f"Your web app is now live at: {deployment['url']}")
-                                    break
-                        
-                        self.voice_agent.speak("Deployment complete! Thank you for using DEVIS.")
+                    if not command:
                         break
+                
+                    # Check if user is satisfied
+                    if "looks good" in command.lower():
+                        self.voice_agent.speak("Great! Would you like to deploy your application now?")
+                        deploy_command = self.voice_agent.listen_for_input("Say 'yes' to deploy or 'no' to continue development.")
+                    
+                        if deploy_command and "yes" in deploy_command.lower():
+                            self.request_deployment()
+                            continue
                     
-                    else:
-                        self.voice_agent.speak("Okay, let's continue development. What changes would you like to make?")
+                        else:
+                            self.voice_agent.speak("Okay, let's continue development. What changes would you like to make?")
+                            continue
+                
+                    # Undo, redo and jumps to an earlier turn never reach the model
+                    elif self.handle_history_command(command):
                         continue
                 
-                # Process frontend changes
-                elif any(keyword in command.lower() for keyword in ['create', 'add', 'update', 'change', 'style']):
-                    self.voice_agent.speak("Processing your frontend request...")
-                    generated_code = self.frontend_agent.generate_code(command, self.project_dir)
-                    generated_styles = self.frontend_agent.generate_styles(command, self.project_dir)
-                    self.update_local_code(generated_code, generated_styles)
+                    # Process frontend changes
+                    elif any(keyword in command.lower() for keyword in CHANGE_KEYWORDS):
+                        self.apply_change(command)
                 
-                # Exit command
-                elif "exit" in command.lower():
-                    self.voice_agent.speak("Thank you for using DEVIS! Goodbye.")
-                    break
+                    # Exit command
+                    elif "exit" in command.lower():
+                        if self.deploy_pipeline.busy():
+                            self.voice_agent.speak("Waiting for your deployment to finish...")
+                            self.deploy_pipeline.current.join(timeout=600)
+                            self.announce_deploy_events()
+                        self.voice_agent.speak("Thank you for using DEVIS! Goodbye.")
+                        break
                 
         except KeyboardInterrupt:
             self.voice_agent.speak("Thank you for using DEVIS! Goodbye.")
@@ -147,12 +340,20 @@ class DEVIS:
     def cleanup(self):
         """Clean up resources"""
         try:
+            self.deploy_pipeline.cancel()
             self.voice_agent.cleanup()
             self.frontend_agent.cleanup()
             self.deployment_agent.cleanup()
+            clients.close()
         except:
             pass
 
 if __name__ == "__main__":
-    devis = DEVIS()
+    import argparse
+    parser = argparse.ArgumentParser(description="Voice controlled software development")
+    parser.add_argument("--project-dir", help="project directory (default: ~/Documents/devis-ui)")
+    parser.add_argument("--multi-file", action="store_true", help="split the app into one file per component")
+    args = parser.parse_args()
+    
+    devis = DEVIS(project_dir=args.project_dir, multi_file=args.multi_file)
     devis.run()
@@ -0,0 +1,88 @@
+import re
+
+HUNK_PATTERN = re.compile(
+    r"^(?:FILE:\s*(?P<file>\S+)\s*\n)?"
+    r"<<<<<<< SEARCH\n(?P<search>.*?)\n?=======\n(?P<replace>.*?)\n?>>>>>>> REPLACE",
+    re.DOTALL | re.MULTILINE
+)
+
+PATCH_FORMAT = """FILE: App.js
+<<<<<<< SEARCH
+exact lines copied from the current file
+=======
+the lines that replace them
+>>>>>>> REPLACE"""
+
+
+class PatchError(Exception):
+    """Raised when a patch cannot be parsed or applied cleanly"""
+
+
+def parse_hunks(text):
+    """Parse search/replace hunks from a model response into (file, search, replace) tuples
+
+    A FILE: header applies to every hunk after it until the next header. A
+    SEARCH marker that does not start a complete hunk raises PatchError
+    rather than dropping part of the change.
+    """
+    hunks = []
+    filename = None
+    for match in HUNK_PATTERN.finditer(text):
+        filename = match.group("file") or filename
+        if filename is None:
+            raise PatchError("Search/replace hunk without a FILE: header")
+        hunks.append((filename, match.group("search"), match.group("replace")))
+    if not hunks:
+        raise PatchError("No search/replace hunks found in response")
+    markers = len(re.findall(r"^<<<<<<< SEARCH$", text, re.MULTILINE))
+    if markers != len(hunks):
+        raise PatchError(f"Parsed {len(hunks)} of {markers} search/replace hunks")
+    return hunks
+
+
+def _find_loose(content, search):
+    """Locate search in content ignoring leading/trailing whitespace on each line"""
+    search_lines = [line.strip() for line in search.strip("\n").split("\n")]
+    content_lines = content.split("\n")
+    matches = []
+    for start in range(len(content_lines) - len(search_lines) + 1):
+        window = content_lines[start:start + len(search_lines)]
+        if [line.strip() for line in window] == search_lines:
+            matches.append(start)
+    if len(matches) != 1:
+        return None
+    start = matches[0]
+    begin = len("\n".join(content_lines[:start])) + (1 if start else 0)
+    end = begin + len("\n".join(content_lines[start:start + len(search_lines)]))
+    return begin, end
+
+
+def apply_hunk(content, search, replace):
+    """Apply a single hunk, requiring the search text to match exactly one location"""
+    if not search.strip():
+        raise PatchError("Empty search block")
+
+    count = content.count(search)
+    if count == 1:
+        return content.replace(search, replace, 1)
+    if count > 1:
+        raise PatchError(f"Search block matches {count} locations")
+
+    span = _find_loose(content, search)
+    if span is None:
+        raise PatchError(f"Search block not found: {search.strip().splitlines()[0]!r}")
+    begin, end = span
+    return content[:begin] + replace + content[end:]
+
+
+def apply_hunks(files, hunks):
+    """Apply hunks to a {filename: content} mapping and return the patched copy
+
+    Either every hunk applies or PatchError is raised and nothing changes.
+    """
+    patched = dict(files)
+    for filename, search, replace in hunks:
+        if filename not in patched:
+            raise PatchError(f"Patch targets unknown file {filename}")
+        patched[filename] = apply_hunk(patched[filename], search, replace)
+    return patched
@@ -1,85 +1,202 @@
-from scrapybara import Scrapybara
-from scrapybara.core.api_error import ApiError
-from scrapybara.tools import BrowserTool
 from dotenv import load_dotenv
 import os
-from google import genai
-from PIL import Image
 import base64
 import io
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from analysis_cache import AnalysisCache
+from cache import DEFAULT_CACHE_ROOT
+from clients import clients
+from image_prep import load_image, prepare_for_upload, save_artifact
+from instance_pool import InstancePool
 
 load_dotenv()
 
+ANALYSIS_PROMPT = "Analyze this UI screenshot and describe the layout, colors, components, and design patterns used. Focus on actionable details that could be used to recreate a similar design."
+# Bump when ANALYSIS_PROMPT changes so cached analyses are not reused
+ANALYSIS_PROMPT_VERSION = "1"
+
+
+def _describe_error(e):
+    # Scrapybara's ApiError carries the HTTP status; checking for it avoids importing the SDK
+    if getattr(e, "status_code", None) is not None:
+        return f"Scrapybara API Error {e.status_code}: {getattr(e, 'body', '')}"
+    return str(e) or type(e).__name__
+
+
 class ScreenshotAgent:
-    def __init__(self):
-        self.client = Scrapybara(api_key=os.getenv("SCRAPYBARA_API_KEY"))
-        self.instance = None
-        self.genai_client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    def __init__(self, client=None, genai_client=None, tool_factory=None):
+        # Browser-ready instances are paused between captures instead of stopped;
+        # without a tool_factory the pool wraps each instance in a BrowserTool
+        self.pool = InstancePool(client, tool_factory=tool_factory)
+        self._genai_client = genai_client
+        # Images are downscaled and recompressed before analysis
+        self.upload_settings = {"max_dimension": 1280, "quality": 80, "image_format": "WEBP"}
+        # Set to a directory to keep content-addressed copies of captures
+        self.artifact_dir = os.getenv("DEVIS_SCREENSHOT_DIR")
+        self.last_upload = None
+        # Visually identical captures reuse an earlier analysis
+        self.analysis_cache = AnalysisCache(DEFAULT_CACHE_ROOT / "screenshot_analyses.json")
+        
+    @property
+    def client(self):
+        return self.pool.client
+        
+    @property
+    def genai_client(self):
+        return self._genai_client or clients.genai()
+        
+    def _screenshot(self, pooled, url):
+        """Navigate a pooled browser to url and return the decoded PNG bytes"""
+        # Navigate to URL
+        pooled.browser_tool(command="go_to", url=url)
+        
+        # Take screenshot
+        screenshot_result = pooled.browser_tool(command="screenshot")
+        return base64.b64decode(screenshot_result.base_64_image)
+        
+    def _capture_image(self, url, timeout=None):
+        with self.pool.instance(timeout) as pooled:
+            return self._screenshot(pooled, url)
         
     def capture_screenshot(self, url):
-        """Capture screenshot of a webpage"""
+        """Capture screenshot of a webpage and return the PNG bytes"""
         try:
-            # Start Ubuntu instance
-            self.instance = self.client.start_ubuntu()
-            
-            # Start browser and get CDP URL
-            cdp_url = self.instance.browser.start().cdp_url
-            
-            # Create browser tool
-            browser_tool = BrowserTool(self.instance)
-            
-            # Navigate to URL
-            browser_tool(command="go_to", url=url)
+            image = self._capture_image(url)
             
-            # Take screenshot
-            screenshot_result = browser_tool(command="screenshot")
+            if self.artifact_dir:
+                save_artifact(image, self.artifact_dir)
             
-            # Save to screenshot.png in the current directory
-            output_path = os.path.join(os.path.dirname(__file__), "screenshot.png")
-            with open(output_path, "wb") as f:
-                f.write(base64.b64decode(screenshot_result.base_64_image))
+            return image
             
-            # Cleanup
-            self.instance.browser.stop()
-            self.instance.stop()
-            self.instance = None
-            
-            return output_path
-            
-        except ApiError as e:
-            print(f"Scrapybara API Error {e.status_code}: {e.body}")
-            if self.instance:
-                self.instance.stop()
-                self.instance = None
-            return None
         except Exception as e:
-            print(f"Error capturing screenshot: {e}")
-            if self.instance:
-                self.instance.stop()
-                self.instance = None
+            print(f"Error capturing screenshot: {_describe_error(e)}")
             return None
             
-    def analyze_screenshot(self, screenshot_path):
-        """Analyze screenshot using Google Gemini"""
+    def capture_many(self, urls, concurrency=3, timeout=60):
+        """Capture several URLs in parallel, returning (results, report)
+
+        results holds one dict per URL, in order, with either the PNG bytes in
+        "image" or the failure in "error"; one bad URL never fails the batch.
+        Each URL gets timeout seconds from when its capture starts. Scrapybara's
+        BrowserTool drives one page per instance, so parallelism comes from up
+        to `concurrency` warm pooled instances, each reused across the batch.
+        The pool only grows for the batch; extra instances are stopped after.
+        """
+        results = [{"url": url, "image": None, "error": None, "seconds": None} for url in urls]
+        starts = {}
+        held = {}
+        timed_out = set()
+        held_lock = threading.Lock()
+        
+        def give_back(index, healthy, timeout_fired=False):
+            # Whoever takes the instance out of held releases it: the worker, or the timeout below
+            with held_lock:
+                pooled = held.pop(index, None)
+                if timeout_fired:
+                    timed_out.add(index)
+            if pooled is not None:
+                self.pool.release(pooled, healthy=healthy)
+        
+        def capture(index):
+            starts[index] = time.monotonic()
+            pooled = self.pool.acquire(timeout)
+            with held_lock:
+                late = index in timed_out
+                if not late:
+                    held[index] = pooled
+            if late:
+                self.pool.release(pooled)
+                raise TimeoutError(f"Timed out after {timeout}s")
+            try:
+                image = self._screenshot(pooled, urls[index])
+            except Exception:
+                give_back(index, self.pool.is_healthy(pooled))
+                raise
+            give_back(index, True)
+            return image
+        
+        batch_started = time.monotonic()
+        with self.pool.expanded(concurrency):
+            executor = ThreadPoolExecutor(max_workers=concurrency)
+            futures = {executor.submit(capture, index): index for index in range(len(urls))}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future in done:
+                    index = futures[future]
+                    results[index]["seconds"] = now - starts.get(index, now)
+                    try:
+                        results[index]["image"] = future.result()
+                    except Exception as e:
+                        results[index]["error"] = _describe_error(e)
+                for future in list(pending):
+                    index = futures[future]
+                    if index in starts and now - starts[index] > timeout:
+                        # The worker cannot be interrupted, so stop its instance to free
+                        # the slot and unblock the stuck call
+                        give_back(index, False, timeout_fired=True)
+                        results[index]["error"] = f"Timed out after {timeout}s"
+                        results[index]["seconds"] = now - starts[index]
+                        pending.discard(future)
+            executor.shutdown(wait=False)
+        
+        elapsed = time.monotonic() - batch_started
+        captured = sum(1 for result in results if result["image"] is not None)
+        report = {
+            "urls": len(urls),
+            "captured": captured,
+            "failed": len(urls) - captured,
+            "seconds": elapsed,
+            "captures_per_minute": 60 * captured / elapsed if elapsed else 0.0,
+        }
+        return results, report
+        
+    def analyze_screenshot(self, screenshot, url=None):
+        """Analyze screenshot using Google Gemini
+
+        Accepts PNG bytes, a PIL image or a file path. The image is downscaled
+        and recompressed in memory before upload. url, the page the screenshot
+        shows, keeps cached analyses of other pages from being reused for it;
+        without it only an identical image reuses a cached analysis.
+        """
         try:
-            if not screenshot_path:
+            if screenshot is None or (isinstance(screenshot, (str, bytes)) and not screenshot):
                 return None
+            
+            started = time.perf_counter()
+            self.last_upload = None
+            img = load_image(screenshot)
+            cached = self.analysis_cache.get(img, ANALYSIS_PROMPT_VERSION, page=url)
+            if cached is not None:
+                return cached
+            
+            data, mime_type = prepare_for_upload(img, **self.upload_settings)
+            self.last_upload = {
+                "bytes": len(data),
+                "original_bytes": len(screenshot) if isinstance(screenshot, bytes) else None,
+                "prepare_seconds": time.perf_counter() - started,
+            }
                 
-            with Image.open(screenshot_path) as img:
-                response = self.genai_client.models.generate_content(
-                    model="gemini-2.0-flash",
-                    contents=[{
-                        "role": "user",
-                        "parts": [{
-                            "text": "Analyze this UI screenshot and describe the layout, colors, components, and design patterns used. Focus on actionable details that could be used to recreate a similar design.",
-                            "inline_data": {
-                                "mime_type": "image/png",
-                                "data": img
-                            }
-                        }]
-                    }]
-                )
-                return response.text
+            response = self.genai_client.models.generate_content(
+                model="gemini-2.0-flash",
+                contents=[{
+                    "role": "user",
+                    "parts": [
+                        {"text": ANALYSIS_PROMPT},
+                        {"inline_data": {
+                            "mime_type": mime_type,
+                            "data": data
+                        }}
+                    ]
+                }]
+            )
+            self.last_upload["analysis_seconds"] = time.perf_counter() - started
+            if response.text:
+                self.analysis_cache.put(img, ANALYSIS_PROMPT_VERSION, response.text, page=url)
+            return response.text
                 
         except Exception as e:
             print(f"Error analyzing screenshot: {e}")
@@ -87,14 +204,7 @@ class ScreenshotAgent:
             
     def cleanup(self):
         """Clean up resources"""
-        if self.instance:
-            try:
-                self.instance.browser.stop()
-                self.instance.stop()
-            except:
-                pass
-            finally:
-                self.instance = None
+        self.pool.close()
 
 if __name__ == "__main__":
     # Test the screenshot agent
@@ -107,20 +217,32 @@ if __name__ == "__main__":
     
     for url in test_urls:
         print(f"\nTesting with {url}")
-        screenshot_path = agent.capture_screenshot(url)
-        if screenshot_path:
-            print(f"Screenshot saved to: {screenshot_path}")
-            if os.path.exists(screenshot_path):
-                size = os.path.getsize(screenshot_path)
-                print(f"Screenshot size: {size} bytes")
-                if size > 1000:  # Basic validation that file has content
-                    print(" Success!")
-                else:
-                    print(" Screenshot seems too small")
+        screenshot = agent.capture_screenshot(url)
+        if screenshot:
+            size = len(screenshot)
+            print(f"Screenshot size: {size} bytes")
+            if size > 1000:  # Basic validation that image has content
+                print(" Success!")
             else:
-                print(" Screenshot file not found")
+                print(" Screenshot seems too small")
         else:
             print(" Failed to capture screenshot")
-        
-        # Cleanup between tests
-        agent.cleanup()
+    
+    # One warm instance serves every URL above
+    print(f"\nInstance pool stats: {agent.pool.stats}")
+    
+    # Same URLs again as one concurrent batch
+    results, report = agent.capture_many(test_urls, concurrency=3)
+    for result in results:
+        status = f"{len(result['image'])} bytes" if result["image"] else result["error"]
+        print(f"{result['url']}: {status}")
+    print(f"Batch: {report['captured']}/{report['urls']} captured, "
+          f"{report['captures_per_minute']:.1f} captures/minute")
+    
+    # Analysing the same designs twice should be served from the cache
+    for _ in range(2):
+        for result in results:
+            if result["image"]:
+                agent.analyze_screenshot(result["image"], result["url"])
+    print(f"Analysis cache hit rate: {agent.analysis_cache.hit_rate():.0%}")
+    agent.cleanup()
@@ -0,0 +1,503 @@
+import argparse
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from cache import DEFAULT_CACHE_ROOT, TieredCache
+from component_index import COMPONENTS_DIR
+from deployment_agent import DeploymentAgent
+from frontend_agent import FrontendAgent
+from main import CHANGE_KEYWORDS, DEVIS, STATIC_PROMPTS
+from template_cache import TemplateCache
+from tracing import percentile, tracer
+from transcription import ChunkedTranscriber
+from voice_agent import VoiceAgent
+
+
+class Overloaded(Exception):
+    """Raised when a request is refused for backpressure; maps to 429 or 503 with Retry-After"""
+
+    def __init__(self, status_code, message, retry_after=1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class SessionVoice:
+    """Stands in for VoiceAgent inside a server session
+
+    Nothing is played on the server. Every utterance becomes a "speech" event
+    for the client, which can fetch its audio from the event's "audio" path.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def speak(self, text, wait=True):
+        self.session.say(text)
+
+    def announce(self, text):
+        self.session.say(text)
+
+    def presynthesize(self, texts=(), background=True):
+        return None
+
+    def warm_up(self):
+        return None
+
+    def cleanup(self):
+        pass
+
+
+class Turn:
+    """One queued command and, once processed, its outcome"""
+
+    def __init__(self, command):
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted = time.monotonic()
+        self.latency = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {"turn_id": self.id, "command": self.command, "status": self.status,
+                "result": self.result, "error": self.error, "latency": self.latency}
+
+
+class Session:
+    """One designer's DEVIS state, project directory, turn queue and event log
+
+    Turns run one at a time in submission order, since each edit builds on
+    the files the previous one wrote.
+    """
+
+    def __init__(self, session_id, manager, project_dir, max_queued):
+        self.id = session_id
+        self.devis = DEVIS(project_dir=project_dir, voice_agent=SessionVoice(self),
+                           frontend_agent=manager.frontend_agent(),
+                           deployment_agent=manager.deployment_agent, dev_server=False,
+                           multi_file=manager.multi_file)
+        self.devis.deploy_pipeline.slots = manager.deploy_slots
+        self.devis.template_cache = manager.template_cache
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.turns = OrderedDict()
+        self.events = deque(maxlen=500)
+        # Text of recent utterances by id; only these can be synthesized for the session
+        self.utterances = OrderedDict()
+        self.seq = itertools.count(1)
+        self.lock = threading.Lock()
+        self.awaiting_deploy_confirmation = False
+        self.last_active = time.monotonic()
+        self.worker = None
+
+    def emit(self, kind, **fields):
+        with self.lock:
+            self.events.append({"seq": next(self.seq), "type": kind, "time": time.time(), **fields})
+
+    def say(self, text, keep=100):
+        """Queue an utterance for the client as a "speech" event with the path of its audio"""
+        speech_id = uuid.uuid4().hex[:12]
+        with self.lock:
+            self.utterances[speech_id] = text
+            while len(self.utterances) > keep:
+                self.utterances.popitem(last=False)
+        self.emit("speech", text=text, speech_id=speech_id,
+                  audio=f"/sessions/{self.id}/speech/{speech_id}")
+
+    def utterance(self, speech_id):
+        with self.lock:
+            text = self.utterances.get(speech_id)
+        if text is None:
+            raise HTTPException(404, f"No utterance {speech_id}")
+        return text
+
+    def drain_deploy_events(self):
+        """Move deployment progress into the event log; DEVIS speaks outcomes as they happen"""
+        for event in self.devis.deploy_pipeline.poll_events():
+            self.emit("deploy", **event)
+
+    def events_since(self, after=0):
+        self.drain_deploy_events()
+        with self.lock:
+            return [event for event in self.events if event["seq"] > after]
+
+    def remember(self, turn, keep=100):
+        self.turns[turn.id] = turn
+        while len(self.turns) > keep:
+            self.turns.popitem(last=False)
+
+    def handle(self, command):
+        """Run one command through the same branches as DEVIS.run; returns what happened"""
+        devis = self.devis
+        with tracer.turn("turn", session=self.id):
+            self.drain_deploy_events()
+            lowered = command.lower()
+            if devis.project_dir is None:
+                devis.setup_local_project()
+                devis.create_baseline(command)
+                return "created"
+
+            if self.awaiting_deploy_confirmation:
+                self.awaiting_deploy_confirmation = False
+                if "yes" in lowered:
+                    devis.request_deployment(f"devis-{self.id}")
+                    return "deploying"
+                devis.voice_agent.speak("Okay, let's continue development. What changes would you like to make?")
+                return "continued"
+
+            if "looks good" in lowered:
+                self.awaiting_deploy_confirmation = True
+                devis.voice_agent.speak("Great! Would you like to deploy your application now?")
+                devis.voice_agent.speak("Say 'yes' to deploy or 'no' to continue development.")
+                return "confirm_deploy"
+
+            if devis.handle_history_command(command):
+                return "restored"
+
+            if any(keyword in lowered for keyword in CHANGE_KEYWORDS):
+                devis.apply_change(command)
+                return "changed"
+
+            devis.voice_agent.speak("What changes would you like to make?")
+            return "ignored"
+
+    def files(self):
+        project_dir = self.devis.project_dir
+        if project_dir is None:
+            return {}
+        paths = ["src/App.js", "src/App.css"]
+        paths += [f"{COMPONENTS_DIR}/{path.name}" for path in sorted((project_dir / COMPONENTS_DIR).glob("*.*"))]
+        return {path: (project_dir / path).read_text() for path in paths if (project_dir / path).exists()}
+
+
+class SessionManager:
+    """Sessions plus the clients and bounded worker pools they share
+
+    One OpenAI client, TTS voice agent, deployment agent (and its keep-alive
+    HTTP session) and LLM cache serve every session. Turns run on the
+    generation pool, transcription on its own pool shared by every audio
+    stream, captures on the screenshot pool, and at most deploy_workers
+    deployments build at once. Each session queues at most max_queued_turns
+    turns (429 beyond that) and the server as a whole max_pending_turns (503).
+    """
+
+    def __init__(self, root=None, openai_client=None, voice_agent=None, deployment_agent=None,
+                 template_cache=None, screenshot_agent_factory=None, use_llm_cache=True, multi_file=False,
+                 max_sessions=64, max_queued_turns=4, max_pending_turns=128, session_ttl=3600,
+                 generation_workers=8, transcription_workers=8, screenshot_workers=2, deploy_workers=4):
+        self.root = Path(root or DEFAULT_CACHE_ROOT / "sessions")
+        self.voice_agent = voice_agent or VoiceAgent(client=openai_client)
+        self.openai_client = openai_client or self.voice_agent.client
+        self.deployment_agent = deployment_agent or DeploymentAgent()
+        self.template_cache = template_cache or TemplateCache()
+        self.llm_cache = TieredCache(DEFAULT_CACHE_ROOT / "llm", max_entries=1024) if use_llm_cache else None
+        self.screenshot_agent_factory = screenshot_agent_factory
+        self.multi_file = multi_file
+        self.screenshot_agent = None
+        self.screenshot_lock = threading.Lock()
+
+        self.max_sessions = max_sessions
+        self.max_queued_turns = max_queued_turns
+        self.max_pending_turns = max_pending_turns
+        self.session_ttl = session_ttl
+        self.screenshot_workers = screenshot_workers
+        self.generation_pool = ThreadPoolExecutor(generation_workers, thread_name_prefix="devis-generate")
+        self.transcription_pool = ThreadPoolExecutor(transcription_workers, thread_name_prefix="devis-transcribe")
+        self.screenshot_pool = ThreadPoolExecutor(screenshot_workers, thread_name_prefix="devis-screenshot")
+        self.deploy_slots = threading.BoundedSemaphore(deploy_workers)
+
+        self.sessions = {}
+        self.pending = 0
+        self.turn_latencies = deque(maxlen=1000)
+        self.rejected = {"sessions": 0, "session_queue": 0, "server_queue": 0}
+
+    def frontend_agent(self):
+        agent = FrontendAgent(use_cache=False, client=self.openai_client)
+        agent.cache = self.llm_cache
+        return agent
+
+    def _run_in(self, pool, func, *args):
+        return asyncio.get_running_loop().run_in_executor(pool, contextvars.copy_context().run, func, *args)
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPException(404, f"No session {session_id}")
+        session.last_active = time.monotonic()
+        return session
+
+    async def create_session(self):
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected["sessions"] += 1
+            raise Overloaded(503, "Session limit reached", retry_after=30)
+        session_id = uuid.uuid4().hex[:12]
+        session = Session(session_id, self, self.root / session_id, self.max_queued_turns)
+        session.worker = asyncio.create_task(self._work(session))
+        self.sessions[session_id] = session
+        session.say("What kind of web app would you like to create?")
+        return session
+
+    async def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        session.worker.cancel()
+        # Turns still queued will never run; release their capacity and wake their waiters
+        while not session.queue.empty():
+            turn = session.queue.get_nowait()
+            turn.status = "cancelled"
+            self.pending -= 1
+            turn.done.set()
+        # DEVIS.cleanup would also close the shared agents, so only release what is per-session
+        session.devis.deploy_pipeline.cancel()
+        session.devis.frontend_agent.cleanup()
+
+    def check_capacity(self, session):
+        """Refuse work early, before spending a transcription on it"""
+        if self.pending >= self.max_pending_turns:
+            self.rejected["server_queue"] += 1
+            raise Overloaded(503, "Server is at capacity", retry_after=2)
+        if session.queue.full():
+            self.rejected["session_queue"] += 1
+            raise Overloaded(429, "Too many turns queued for this session", retry_after=1)
+
+    def submit_turn(self, session, command):
+        self.check_capacity(session)
+        turn = Turn(command)
+        session.queue.put_nowait(turn)
+        session.remember(turn)
+        self.pending += 1
+        return turn
+
+    async def _work(self, session):
+        while True:
+            turn = await session.queue.get()
+            turn.status = "running"
+            try:
+                turn.result = await self._run_in(self.generation_pool, session.handle, turn.command)
+                turn.status = "done"
+            except asyncio.CancelledError:
+                turn.status = "cancelled"
+                raise
+            except Exception as e:
+                turn.status = "failed"
+                turn.error = str(e)
+                session.say(f"An error occurred: {e}")
+            finally:
+                turn.latency = time.monotonic() - turn.submitted
+                self.turn_latencies.append(turn.latency)
+                self.pending -= 1
+                turn.done.set()
+
+    async def transcribe(self, upload):
+        """Transcribe an encoded audio file given as (filename, bytes)"""
+        return await self._run_in(self.transcription_pool, self.voice_agent.transcribe_audio, upload)
+
+    async def transcribe_stream(self, chunks, sample_rate):
+        """Transcribe 16-bit little-endian PCM while it is still arriving
+
+        Windows are sent to Whisper as soon as they fill up, on the shared
+        transcription pool, so only the tail is left when the upload ends.
+        """
+        def transcribe_window(samples):
+            return self.voice_agent.transcribe_audio(samples, sample_rate) or ""
+
+        transcriber = ChunkedTranscriber(transcribe_window, sample_rate, **self.voice_agent.transcription_window,
+                                         executor=self.transcription_pool)
+        leftover = b""
+        async for chunk in chunks:
+            data = leftover + chunk
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            if usable:
+                transcriber.add(np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768)
+        # finish() waits on the transcription pool, so it must not occupy a slot in it
+        return await asyncio.to_thread(transcriber.finish)
+
+    async def synthesize(self, text):
+        return await asyncio.to_thread(self.voice_agent.synthesize, text)
+
+    def _screenshot_agent(self):
+        with self.screenshot_lock:
+            if self.screenshot_agent is None:
+                if self.screenshot_agent_factory:
+                    self.screenshot_agent = self.screenshot_agent_factory()
+                else:
+                    from screenshot_agent import ScreenshotAgent
+                    self.screenshot_agent = ScreenshotAgent()
+                self.screenshot_agent.pool.max_size = self.screenshot_workers
+            return self.screenshot_agent
+
+    def _capture_and_analyze(self, url):
+        agent = self._screenshot_agent()
+        with tracer.span("screenshot.analyze", url=url):
+            image = agent.capture_screenshot(url)
+            return agent.analyze_screenshot(image, url) if image else None
+
+    async def analyze(self, url):
+        return await self._run_in(self.screenshot_pool, self._capture_and_analyze, url)
+
+    async def reap_idle(self, interval=60):
+        """Close sessions nobody has touched for session_ttl seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id, session in list(self.sessions.items()):
+                if session.last_active < cutoff and session.queue.empty():
+                    await self.close_session(session_id)
+
+    def stats(self):
+        latencies = list(self.turn_latencies)
+        return {
+            "sessions": len(self.sessions),
+            "pending_turns": self.pending,
+            "queued_per_session": {session_id: session.queue.qsize() for session_id, session in self.sessions.items()},
+            "turn_latency_p50": percentile(latencies, 0.5) if latencies else None,
+            "turn_latency_p95": percentile(latencies, 0.95) if latencies else None,
+            "rejected": dict(self.rejected),
+            "llm_cache_hit_rate": self.llm_cache.hit_rate() if self.llm_cache else None,
+        }
+
+    async def close(self):
+        for session_id in list(self.sessions):
+            await self.close_session(session_id)
+        for pool in (self.generation_pool, self.transcription_pool, self.screenshot_pool):
+            pool.shutdown(wait=False)
+        if self.screenshot_agent is not None:
+            self.screenshot_agent.cleanup()
+        self.voice_agent.cleanup()
+        self.deployment_agent.cleanup()
+
+
+class TurnRequest(BaseModel):
+    text: str
+    wait: bool = False
+
+
+class ScreenshotRequest(BaseModel):
+    url: str
+
+
+def create_app(manager=None):
+    """Build the FastAPI app serving many DEVIS sessions from one process"""
+    manager = manager or SessionManager()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        manager.voice_agent.presynthesize(STATIC_PROMPTS)
+        reaper = asyncio.create_task(manager.reap_idle())
+        yield
+        reaper.cancel()
+        await manager.close()
+
+    app = FastAPI(title="DEVIS", lifespan=lifespan)
+    app.state.manager = manager
+
+    @app.exception_handler(Overloaded)
+    async def overloaded(request, exc):
+        return JSONResponse({"detail": str(exc)}, status_code=exc.status_code,
+                            headers={"Retry-After": str(exc.retry_after)})
+
+    async def queue_turn(session, text, wait):
+        if not text:
+            raise HTTPException(422, "Could not understand the audio")
+        turn = manager.submit_turn(session, text)
+        if wait:
+            await turn.done.wait()
+        return turn.to_dict()
+
+    @app.post("/sessions", status_code=201)
+    async def create_session():
+        session = await manager.create_session()
+        return {"session_id": session.id, "events": session.events_since(0)}
+
+    @app.delete("/sessions/{session_id}", status_code=204)
+    async def close_session(session_id: str):
+        manager.get(session_id)
+        await manager.close_session(session_id)
+
+    @app.post("/sessions/{session_id}/turns", status_code=202)
+    async def submit_text(session_id: str, body: TurnRequest):
+        return await queue_turn(manager.get(session_id), body.text, body.wait)
+
+    @app.post("/sessions/{session_id}/audio", status_code=202)
+    async def submit_audio(session_id: str, request: Request, filename: str = "speech.wav", wait: bool = False):
+        """Queue a turn from an uploaded audio file (WAV, FLAC, MP3, WebM...)"""
+        session = manager.get(session_id)
+        manager.check_capacity(session)
+        text = await manager.transcribe((filename, await request.body()))
+        return await queue_turn(session, text, wait)
+
+    @app.post("/sessions/{session_id}/audio/stream", status_code=202)
+    async def stream_audio(session_id: str, request: Request, sample_rate: int = 16000, wait: bool = False):
+        """Queue a turn from raw 16-bit mono PCM, transcribed while the upload is in progress"""
+        session = manager.get(session_id)
+        manager.check_capacity(session)
+        text = await manager.transcribe_stream(request.stream(), sample_rate)
+        return await queue_turn(session, text, wait)
+
+    @app.get("/sessions/{session_id}/turns/{turn_id}")
+    async def get_turn(session_id: str, turn_id: str):
+        turn = manager.get(session_id).turns.get(turn_id)
+        if turn is None:
+            raise HTTPException(404, f"No turn {turn_id}")
+        return turn.to_dict()
+
+    @app.get("/sessions/{session_id}/events")
+    async def get_events(session_id: str, after: int = 0):
+        return manager.get(session_id).events_since(after)
+
+    @app.get("/sessions/{session_id}/files")
+    async def get_files(session_id: str):
+        return manager.get(session_id).files()
+
+    @app.post("/sessions/{session_id}/screenshot")
+    async def analyze_screenshot(session_id: str, body: ScreenshotRequest):
+        manager.get(session_id)
+        return {"url": body.url, "analysis": await manager.analyze(body.url)}
+
+    @app.get("/sessions/{session_id}/speech/{speech_id}")
+    async def get_speech(session_id: str, speech_id: str):
+        text = manager.get(session_id).utterance(speech_id)
+        return Response(await manager.synthesize(text), media_type="audio/mpeg")
+
+    @app.get("/stats")
+    async def stats():
+        return manager.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve DEVIS sessions over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--root", help="directory for session projects (default: ~/.cache/devis/sessions)")
+    parser.add_argument("--max-sessions", type=int, default=64)
+    parser.add_argument("--generation-workers", type=int, default=8)
+    parser.add_argument("--deploy-workers", type=int, default=4)
+    parser.add_argument("--multi-file", action="store_true", help="split apps into one file per component")
+    args = parser.parse_args()
+
+    # Interleaved turns from many sessions make the per-turn summaries unreadable
+    tracer.print_turns = False
+    manager = SessionManager(root=args.root, max_sessions=args.max_sessions,
+                             generation_workers=args.generation_workers, deploy_workers=args.deploy_workers,
+                             multi_file=args.multi_file)
+    # State lives in this process, so run a single worker
+    uvicorn.run(create_app(manager), host=args.host, port=args.port)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from cache import DEFAULT_CACHE_ROOT, content_hash
+
+
+def _encode(content):
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class SnapshotStore:
+    """Content-addressed history of a project's generated files
+
+    Each snapshot maps relative paths to blob digests. A blob is stored once
+    under objects/ however many snapshots share it, so a turn that changes
+    one component adds one blob. history.json keeps the snapshots, the
+    position undo and redo move, and per repository the files last pushed.
+    Only the newest max_snapshots are kept; blobs no longer referenced are
+    deleted when older snapshots are dropped.
+    """
+
+    def __init__(self, directory, max_snapshots=50):
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.history_path = self.directory / "history.json"
+        self.max_snapshots = max_snapshots
+        self.lock = threading.RLock()
+        self.snapshots = []
+        self.position = -1
+        self.next_id = 1
+        self.deployed = {}
+        self._load()
+
+    @classmethod
+    def for_project(cls, project_dir, root=None, **kwargs):
+        """The store of one project directory, kept under the cache root"""
+        key = content_hash(str(Path(project_dir).resolve()))[:16]
+        return cls(Path(root or DEFAULT_CACHE_ROOT / "snapshots") / key, **kwargs)
+
+    def _load(self):
+        try:
+            with open(self.history_path) as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.snapshots = history.get("snapshots", [])
+        self.position = history.get("position", len(self.snapshots) - 1)
+        self.next_id = history.get("next_id", len(self.snapshots) + 1)
+        self.deployed = history.get("deployed", {})
+
+    def _save(self):
+        temp_path = self.history_path.with_name(f".history.{threading.get_ident()}.tmp")
+        temp_path.write_text(json.dumps({"snapshots": self.snapshots, "position": self.position,
+                                         "next_id": self.next_id, "deployed": self.deployed}))
+        os.replace(temp_path, self.history_path)
+
+    def _put_blob(self, data):
+        digest = _digest(data)
+        path = self.objects / digest
+        if not path.exists():
+            temp_path = path.with_name(f".{digest}.{threading.get_ident()}.tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        return digest
+
+    def read_blob(self, digest):
+        return (self.objects / digest).read_bytes()
+
+    def current(self):
+        with self.lock:
+            return self.snapshots[self.position] if self.position >= 0 else None
+
+    def record(self, files, label=""):
+        """Snapshot the project after files were written; returns the current snapshot
+
+        files may hold only what a turn changed: paths not mentioned keep
+        their content from the current snapshot. A turn that changed nothing
+        records nothing.
+        """
+        with self.lock:
+            current = self.current()
+            manifest = dict(current["files"]) if current else {}
+            for path, content in files.items():
+                manifest[path] = self._put_blob(_encode(content))
+            if current is not None and manifest == current["files"]:
+                return current
+
+            # A new turn after an undo drops the undone snapshots, as in any editor
+            dropped = len(self.snapshots) - self.position - 1
+            del self.snapshots[self.position + 1:]
+            snapshot = {"id": self.next_id, "label": label, "time": time.time(), "files": manifest}
+            self.next_id += 1
+            self.snapshots.append(snapshot)
+            excess = max(0, len(self.snapshots) - self.max_snapshots)
+            del self.snapshots[:excess]
+            self.position = len(self.snapshots) - 1
+            if dropped or excess:
+                self._collect_garbage()
+            self._save()
+            return snapshot
+
+    def _collect_garbage(self):
+        referenced = {digest for snapshot in self.snapshots for digest in snapshot["files"].values()}
+        for path in self.objects.iterdir():
+            if path.name not in referenced:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _move_to(self, index):
+        with self.lock:
+            if not 0 <= index < len(self.snapshots):
+                return None
+            self.position = index
+            self._save()
+            return self.snapshots[index]
+
+    def undo(self):
+        """Step back one snapshot; None at the oldest one"""
+        with self.lock:
+            return self._move_to(self.position - 1)
+
+    def redo(self):
+        """Step forward again after an undo; None at the newest one"""
+        with self.lock:
+            return self._move_to(self.position + 1)
+
+    def goto(self, snapshot_id):
+        """Move to the snapshot recorded as turn snapshot_id; None if it was never kept"""
+        with self.lock:
+            for index, snapshot in enumerate(self.snapshots):
+                if snapshot["id"] == snapshot_id:
+                    return self._move_to(index)
+            return None
+
+    def diff(self, old, new):
+        """{path: bytes} that turn old's files into new's, with None for paths to delete"""
+        old_files = old["files"] if old else {}
+        changes = {path: self.read_blob(digest) for path, digest in new["files"].items()
+                   if old_files.get(path) != digest}
+        changes.update({path: None for path in old_files if path not in new["files"]})
+        return changes
+
+    def changes_since_deployed(self, repo_name, files):
+        """The part of files that differs from the last push to repo_name
+
+        Deleted paths map to None. Returns None if nothing was pushed to
+        repo_name yet, in which case every file has to go.
+        """
+        with self.lock:
+            deployed = self.deployed.get(repo_name)
+        if deployed is None:
+            return None
+        changed = {path: content for path, content in files.items()
+                   if deployed["files"].get(path) != _digest(_encode(content))}
+        changed.update({path: None for path in deployed["files"] if path not in files})
+        return changed
+
+    def mark_deployed(self, repo_name, files):
+        """Remember what repo_name now holds, so the next push sends only the difference"""
+        with self.lock:
+            current = self.current()
+            self.deployed[repo_name] = {
+                "snapshot": current["id"] if current else None,
+                "files": {path: _digest(_encode(content)) for path, content in files.items()},
+            }
+            self._save()
+
+    def clear(self):
+        """Forget the history, e.g. when the project directory was created from scratch"""
+        with self.lock:
+            self.snapshots = []
+            self.position = -1
+            self.next_id = 1
+            self.deployed = {}
+            self._collect_garbage()
+            self._save()
@@ -0,0 +1,79 @@
+import contextvars
+import queue
+import threading
+
+
+class Utterance:
+    """Handle for a queued piece of speech; done is set once playback finishes"""
+
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.error = None
+        # Workers run in the caller's context so tracing spans stay attached to it
+        self.context = contextvars.copy_context()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class SpeechQueue:
+    """Background speech pipeline that synthesizes the next utterance while the current one plays
+
+    synthesize(text) must return audio bytes and play(audio) must block until
+    playback ends, so each Utterance completes on real playback rather than a
+    duration estimate.
+    """
+
+    def __init__(self, synthesize, play, lookahead=2):
+        self.synthesize = synthesize
+        self.play = play
+        self.pending = queue.Queue()
+        self.ready = queue.Queue(maxsize=lookahead)
+        self.synth_thread = threading.Thread(target=self._synth_worker, daemon=True)
+        self.play_thread = threading.Thread(target=self._play_worker, daemon=True)
+        self.synth_thread.start()
+        self.play_thread.start()
+
+    def say(self, text):
+        """Queue text for playback and return its Utterance without blocking"""
+        utterance = Utterance(text)
+        self.pending.put(utterance)
+        return utterance
+
+    def _synth_worker(self):
+        while True:
+            utterance = self.pending.get()
+            if utterance is None:
+                self.ready.put(None)
+                return
+            audio = None
+            try:
+                if utterance.text:
+                    audio = utterance.context.run(self.synthesize, utterance.text)
+            except Exception as e:
+                utterance.error = e
+                print(f"Speech synthesis failed: {e}")
+                print(f"Fallback to text: {utterance.text}")  # Fallback to printing
+            self.ready.put((utterance, audio))
+
+    def _play_worker(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                return
+            utterance, audio = item
+            try:
+                if audio is not None:
+                    utterance.context.run(self.play, audio)
+            except Exception as e:
+                utterance.error = e
+                print(f"Speech playback failed: {e}")
+                print(f"Fallback to text: {utterance.text}")
+            finally:
+                utterance.done.set()
+
+    def close(self, timeout=5):
+        """Stop the workers once queued speech has drained"""
+        self.pending.put(None)
+        self.play_thread.join(timeout)
@@ -0,0 +1,287 @@
+import os
+import re
+import stat
+import tempfile
+
+# Read once at import: os.umask can only be queried by setting it
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def file_mode(path):
+    """Permission bits for a replacement of path: its current mode, or what open() would create"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write(path, content):
+    """Replace path with content via a temp file in the same directory and a rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".devis-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        # mkstemp creates files readable by the owner only
+        os.chmod(temp_path, file_mode(path))
+        os.replace(temp_path, path)
+    except:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+class FenceStripper:
+    """Drop markdown code fence lines from a token stream as it arrives"""
+
+    def __init__(self):
+        self.pending = ""
+        self.output = ""
+
+    def feed(self, token):
+        """Add a token and return the text that became definitive"""
+        self.pending += token
+        emitted = ""
+        while "\n" in self.pending:
+            line, self.pending = self.pending.split("\n", 1)
+            if not line.strip().startswith("```"):
+                emitted += line + "\n"
+        self.output += emitted
+        return emitted
+
+    def finish(self):
+        """Flush the trailing partial line and return the full stripped text"""
+        if self.pending and not self.pending.strip().startswith("```"):
+            self.output += self.pending
+        self.pending = ""
+        return self.output.strip()
+
+
+def _scan_safe_offsets(text):
+    """Yield offsets just past each newline that sits outside brackets, strings and comments"""
+    depth = 0
+    quote = None
+    comment = None
+    i = 0
+    while i < len(text):
+        char = text[i]
+        pair = text[i:i + 2]
+        if comment == "line":
+            if char == "\n":
+                comment = None
+                if depth == 0:
+                    yield i + 1
+        elif comment == "block":
+            if pair == "*/":
+                comment = None
+                i += 1
+        elif quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif pair == "//":
+            comment = "line"
+            i += 1
+        elif pair == "/*":
+            comment = "block"
+            i += 1
+        elif char in "\"'`":
+            quote = char
+        elif char in "({[":
+            depth += 1
+        elif char in ")}]":
+            depth -= 1
+        elif char == "\n" and depth == 0:
+            yield i + 1
+        i += 1
+
+
+# Characters after which "/" starts a regex literal and "<" a JSX element, not division or less-than
+_EXPRESSION_START = set("(,=:[!&|?{};+-*%<>~^")
+_EXPRESSION_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "yield",
+                        "await", "default"}
+
+
+class _JSScanner:
+    """Track JavaScript/JSX nesting well enough to find where top-level statements end
+
+    The stack holds one frame per open bracket, JSX tag and JSX children
+    block. Quotes only start strings in code and inside tags, so an
+    apostrophe in JSX text is just text, and "/" after an operator starts a
+    regex literal that may contain quotes and brackets.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.stack = []
+        self.last = ""  # last significant character in code
+        self.word = ""  # identifier or keyword ending at last
+
+    def _skip_string(self, i, quote):
+        text = self.text
+        i += 1
+        braces = 0
+        while i < len(text):
+            char = text[i]
+            if char == "\\":
+                i += 2
+                continue
+            if quote == "`":
+                if text.startswith("${", i):
+                    braces += 1
+                    i += 2
+                    continue
+                if char == "}" and braces:
+                    braces -= 1
+                elif char == "`" and not braces:
+                    return i + 1
+            elif char == quote or char == "\n":
+                return i + 1
+            i += 1
+        return i
+
+    def _skip_regex(self, i):
+        text = self.text
+        i += 1
+        in_class = False
+        while i < len(text) and text[i] != "\n":
+            char = text[i]
+            if char == "\\":
+                i += 2
+                continue
+            if char == "[":
+                in_class = True
+            elif char == "]":
+                in_class = False
+            elif char == "/" and not in_class:
+                i += 1
+                while i < len(text) and text[i].isalpha():
+                    i += 1
+                return i
+            i += 1
+        return i
+
+    def _starts_expression(self):
+        return not self.last or self.last in _EXPRESSION_START or self.word in _EXPRESSION_KEYWORDS
+
+    def _note(self, char):
+        if char.isalnum() or char in "_$":
+            self.word = self.word + char if self.last.isalnum() or self.last in "_$" else char
+        else:
+            self.word = ""
+        self.last = char
+
+    def statement_ends(self):
+        """Yield offsets just past each newline that ends a complete top-level statement"""
+        text = self.text
+        line_start = 0
+        i = 0
+        while i < len(text):
+            char = text[i]
+            frame = self.stack[-1] if self.stack else "code"
+
+            if frame in ("tag", "closing-tag"):
+                if char in "\"'":
+                    i = self._skip_string(i, char)
+                    continue
+                if char == "{":
+                    self.stack.append("}")
+                    self.last, self.word = "{", ""
+                elif text.startswith("/>", i):
+                    self.stack.pop()
+                    i += 1
+                    self._close_element()
+                elif char == ">":
+                    self.stack.pop()
+                    if frame == "tag":
+                        self.stack.append("children")
+                    else:
+                        self.stack.pop()  # the children block this tag closes
+                        self._close_element()
+                i += 1
+                continue
+
+            if frame == "children":
+                if char == "{":
+                    self.stack.append("}")
+                    self.last, self.word = "{", ""
+                elif text.startswith("</", i):
+                    self.stack.append("closing-tag")
+                    i += 1
+                elif char == "<":
+                    self.stack.append("tag")
+                i += 1
+                continue
+
+            # Code, at top level or inside a bracket
+            if text.startswith("//", i):
+                end = text.find("\n", i)
+                i = len(text) if end < 0 else end
+                continue
+            if text.startswith("/*", i):
+                end = text.find("*/", i + 2)
+                i = len(text) if end < 0 else end + 2
+                continue
+            if char in "\"'`":
+                i = self._skip_string(i, char)
+                self.last, self.word = char, ""
+                continue
+            if char == "/" and self._starts_expression():
+                i = self._skip_regex(i)
+                self.last, self.word = "/", ""
+                continue
+            if char == "<" and self._starts_expression() and (text[i + 1:i + 2].isalpha() or
+                                                               text[i + 1:i + 2] == ">"):
+                self.stack.append("tag")
+                i += 1
+                continue
+            if char in "([{":
+                self.stack.append({"(": ")", "[": "]", "{": "}"}[char])
+            elif char in ")]}" and self.stack and self.stack[-1] == char:
+                self.stack.pop()
+            elif char == "\n":
+                line = text[line_start:i].lstrip()
+                complete = self.last in (";", "}") or (line.startswith("import ") and self.last in ("\"", "'"))
+                if not self.stack and complete:
+                    yield i + 1
+                line_start = i + 1
+            if not char.isspace():
+                self._note(char)
+            i += 1
+
+    def _close_element(self):
+        # After a whole element the code continues as if after a value
+        if not self.stack or self.stack[-1] not in ("children",):
+            self.last, self.word = ")", ""
+
+
+_DEFINES_APP = re.compile(r"^(?:export\s+)?(?:function|class|const|let|var)\s+App\b", re.MULTILINE)
+
+
+def js_checkpoint(text):
+    """Return (length, suffix): the longest run of complete top-level statements, and code to append
+
+    index.js imports the default export, so a prefix that defines App but
+    has not reached its export gets "export default App;" appended. A
+    prefix that does not define App yet is not written: (0, "").
+    """
+    safe = 0
+    for offset in _JSScanner(text).statement_ends():
+        safe = offset
+    prefix = text[:safe]
+    if "export default" in prefix:
+        return safe, ""
+    if _DEFINES_APP.search(prefix):
+        return safe, "\nexport default App;\n"
+    return 0, ""
+
+
+def css_checkpoint(text):
+    """Return (length, ""): the longest prefix of complete CSS rules, or 0"""
+    safe = 0
+    for offset in _scan_safe_offsets(text):
+        if text[:offset].rstrip().endswith("}"):
+            safe = offset
+    return safe, ""
@@ -0,0 +1,187 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from cache import DEFAULT_CACHE_ROOT
+from file_manifest import hash_tree, sha1_file
+
+# Bump to rebuild the cached skeleton, e.g. after changing how it is created
+TEMPLATE_VERSION = "cra-1"
+
+MANIFEST_NAME = ".devis-template.json"
+LOCKFILE = Path("node_modules") / ".package-lock.json"
+
+# Serializes builds between threads; a file lock does the same between processes
+_build_lock = threading.Lock()
+
+
+def npm_package_name(name):
+    """A valid npm package name derived from a directory name"""
+    name = re.sub(r"[^a-z0-9._~-]+", "-", name.lower()).lstrip("._-")
+    return name[:214].rstrip("-._") or "devis-app"
+
+
+def clone_tree(source, target):
+    """Copy a directory tree, sharing data copy-on-write where the filesystem allows it
+
+    Unlike hardlinks, a clone is an independent file: a postinstall script or
+    loader cache writing into one project's node_modules cannot touch the
+    template or any other project.
+    """
+    # GNU cp reflinks on btrfs/XFS, macOS cp -c clones on APFS; both copy otherwise
+    for command in (["cp", "-a", "--reflink=auto"], ["cp", "-c", "-R"]):
+        try:
+            result = subprocess.run(command + [str(source), str(target)], capture_output=True)
+        except OSError:
+            continue
+        if result.returncode == 0:
+            return
+        shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(source, target, symlinks=True)
+
+
+class TemplateCache:
+    """A pristine create-react-app skeleton, built once and materialized per project
+
+    The template lives under the DEVIS cache directory, node_modules included.
+    New projects clone node_modules from it copy-on-write where the
+    filesystem supports it (plain copies otherwise), so no project can write
+    into the template, and copy everything else. A manifest of the
+    non-dependency files plus the npm lockfile hash is checked before each
+    use. Builds are serialized across threads and processes.
+    """
+
+    def __init__(self, root=None, version=TEMPLATE_VERSION):
+        self.root = Path(root or DEFAULT_CACHE_ROOT / "templates")
+        self.version = version
+        self.path = self.root / version
+
+    def is_ready(self):
+        return (self.path / MANIFEST_NAME).exists()
+
+    @contextmanager
+    def _locked(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with _build_lock, open(self.root / ".build.lock", "w") as lock_file:
+            try:
+                import fcntl
+            except ImportError:
+                fcntl = None
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def build(self):
+        """Create the template with create-react-app and record its manifest"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.root, prefix=".building-"))
+        try:
+            project = staging / "devis-template"
+            subprocess.run(["npx", "create-react-app", str(project)], check=True)
+            shutil.rmtree(project / ".git", ignore_errors=True)
+            self._write_manifest(project)
+            if self.path.exists():
+                shutil.rmtree(self.path)
+            os.replace(project, self.path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _write_manifest(self, project):
+        manifest = {
+            "version": self.version,
+            "created": time.time(),
+            "files": {path: entry["sha"] for path, entry in hash_tree(project).items()},
+            "lockfile": sha1_file(project / LOCKFILE) if (project / LOCKFILE).exists() else None,
+        }
+        with open(project / MANIFEST_NAME, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    def verify(self):
+        """Return a list of problems with the cached template; empty means intact"""
+        if not self.is_ready():
+            return ["template has not been built"]
+        with open(self.path / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+        current = {path: entry["sha"] for path, entry in hash_tree(self.path).items() if path != MANIFEST_NAME}
+        problems = [f"changed or missing: {path}" for path, sha in manifest["files"].items()
+                    if current.get(path) != sha]
+        problems += [f"unexpected file: {path}" for path in current if path not in manifest["files"]]
+        if manifest["lockfile"]:
+            lockfile = self.path / LOCKFILE
+            if not lockfile.exists() or sha1_file(lockfile) != manifest["lockfile"]:
+                problems.append("node_modules does not match its lockfile")
+        return problems
+
+    def ensure(self):
+        """Build the template if it is missing or fails verification"""
+        if not self.verify():
+            return
+        with self._locked():
+            # Another session may have built it while this one waited for the lock
+            problems = self.verify()
+            if problems:
+                if self.is_ready():
+                    print(f"Rebuilding React template: {problems[0]}")
+                self.build()
+
+    def refresh(self):
+        """Discard the cached template and build a fresh one"""
+        with self._locked():
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.build()
+
+    def materialize(self, destination):
+        """Create a new project at destination from the template"""
+        self.ensure()
+        destination = Path(destination)
+        if destination.exists():
+            raise FileExistsError(f"{destination} already exists")
+        staging = destination.with_name(f".{destination.name}.partial")
+        shutil.rmtree(staging, ignore_errors=True)
+
+        for root, dirs, filenames in os.walk(self.path):
+            relative = Path(root).relative_to(self.path)
+            (staging / relative).mkdir(parents=True, exist_ok=True)
+            if relative == Path(".") and "node_modules" in dirs:
+                dirs.remove("node_modules")
+                clone_tree(self.path / "node_modules", staging / "node_modules")
+            # os.walk lists symlinked directories as dirs
+            for name in dirs + filenames:
+                source = Path(root) / name
+                target = staging / relative / name
+                if source.is_symlink():
+                    os.symlink(os.readlink(source), target)
+                elif name in filenames and name != MANIFEST_NAME:
+                    shutil.copy2(source, target)
+            dirs[:] = [d for d in dirs if not (Path(root) / d).is_symlink()]
+
+        package_json = staging / "package.json"
+        package = json.loads(package_json.read_text())
+        package["name"] = npm_package_name(destination.name)
+        package_json.write_text(json.dumps(package, indent=2) + "\n")
+        os.replace(staging, destination)
+        return destination
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the cached React project template")
+    parser.add_argument("command", choices=["status", "build", "refresh", "verify"])
+    args = parser.parse_args()
+
+    cache = TemplateCache()
+    if args.command == "status":
+        print(f"{cache.path}: {'ready' if cache.is_ready() else 'not built'}")
+    elif args.command == "build":
+        cache.ensure()
+    elif args.command == "refresh":
+        cache.refresh()
+    elif args.command == "verify":
+        problems = cache.verify()
+        print("\n".join(problems) if problems else "Template is intact")
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# The modules live flat at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Keep caches, traces and deploy manifests out of the real ~/.cache/devis
+os.environ["DEVIS_CACHE_DIR"] = tempfile.mkdtemp(prefix="devis-tests-")
@@ -0,0 +1,40 @@
+from PIL import Image, ImageDraw
+from analysis_cache import AnalysisCache
+
+
+def page(size=(1280, 800), banner=(30, 30, 30)):
+    img = Image.new("RGB", size, (248, 249, 250))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, size[0], size[1] // 8], fill=banner)
+    draw.rectangle([size[0] // 10, size[1] // 3, size[0] // 2, size[1] // 2], fill=(40, 90, 200))
+    return img
+
+
+def test_similar_capture_of_the_same_page_hits():
+    cache = AnalysisCache()
+    cache.put(page(), "1", "dark header", page="https://a.example")
+    assert cache.get(page(banner=(34, 30, 30)), "1", page="https://a.example") == "dark header"
+
+
+def test_other_page_with_a_similar_thumbnail_misses():
+    cache = AnalysisCache()
+    cache.put(page(), "1", "dark header", page="https://a.example")
+    assert cache.get(page(), "1", page="https://b.example") is None
+
+
+def test_different_dimensions_miss():
+    cache = AnalysisCache()
+    cache.put(page(), "1", "dark header", page="https://a.example")
+    # Same proportions, so the 8x8 hashes match, but a different capture size
+    assert cache.get(page(size=(640, 400)), "1", page="https://a.example") is None
+    assert cache.get(page(size=(1280, 2400)), "1", page="https://a.example") is None
+    assert cache.stats == {"hits": 0, "misses": 2}
+
+
+def test_without_a_url_only_the_same_pixels_hit():
+    cache = AnalysisCache()
+    cache.put(page(), "1", "dark header")
+    # A different sparse page of the same size whose thumbnail hashes are close
+    login = page(banner=(34, 30, 30))
+    assert cache.get(login, "1") is None
+    assert cache.get(page(), "1") == "dark header"
@@ -0,0 +1,39 @@
+import io
+import numpy as np
+import soundfile as sf
+from audio_codec import encode_audio, resample
+
+SOURCE_RATE = 44100
+
+
+def level_db(frequency, dst_rate=16000):
+    t = np.arange(2 * SOURCE_RATE) / SOURCE_RATE
+    out = resample(np.sin(2 * np.pi * frequency * t).astype(np.float32), SOURCE_RATE, dst_rate)
+    # Skip the filter's edge effects
+    out = out[1000:-1000]
+    return 20 * np.log10(np.sqrt(np.mean(out * out)) / np.sqrt(0.5))
+
+
+def test_speech_band_passes_unchanged():
+    for frequency in (300, 1000, 3000):
+        assert abs(level_db(frequency)) < 0.5
+
+
+def test_content_above_the_new_nyquist_does_not_alias():
+    # 12 kHz would fold back to 4 kHz at 16 kHz; a two-sample average only took 3.7 dB off it
+    for frequency in (7500, 9000, 12000, 20000):
+        assert level_db(frequency) < -60
+
+
+def test_upsampling_and_equal_rates():
+    samples = np.linspace(-1, 1, 100, dtype=np.float32)
+    assert np.array_equal(resample(samples, 16000, 16000), samples)
+    assert len(resample(samples, 16000, 32000)) == 200
+
+
+def test_encode_audio_writes_16_khz_flac():
+    t = np.arange(SOURCE_RATE) / SOURCE_RATE
+    filename, data = encode_audio(0.5 * np.sin(2 * np.pi * 440 * t), SOURCE_RATE)
+    decoded, rate = sf.read(io.BytesIO(data))
+    assert filename == "speech.flac"
+    assert rate == 16000 and len(decoded) == 16000
@@ -0,0 +1,51 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from clients import create_session
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers the first request on each path with the status in the path, then 200"""
+
+    seen = {}
+
+    def _handle(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        key = (self.command, self.path)
+        FlakyHandler.seen[key] = FlakyHandler.seen.get(key, 0) + 1
+        status = int(self.path.strip("/")) if FlakyHandler.seen[key] == 1 else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    FlakyHandler.seen = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_get_is_retried_after_a_server_error(server):
+    session = create_session(retries=1)
+    assert session.get(f"{server}/502").status_code == 200
+    assert FlakyHandler.seen[("GET", "/502")] == 2
+
+
+def test_post_is_not_retried_after_a_server_error(server):
+    session = create_session(retries=1)
+    assert session.post(f"{server}/502", json={}).status_code == 502
+    assert FlakyHandler.seen[("POST", "/502")] == 1
+
+
+def test_post_is_retried_when_rate_limited(server):
+    session = create_session(retries=1)
+    assert session.post(f"{server}/429", json={}).status_code == 200
+    assert FlakyHandler.seen[("POST", "/429")] == 2
@@ -0,0 +1,89 @@
+import pytest
+from component_index import ComponentIndex, css_selectors, parse_file_blocks
+from fakes import FakeOpenAI
+from frontend_agent import FrontendAgent
+from patch_engine import PatchError
+
+COMPONENTS = {
+    "Header": ("export default function Header() {\n  return <header className=\"header\"><Logo /></header>;\n}\n",
+               ".header { display: flex; }\n.header-title { font-size: 2rem; }\n"),
+    "Logo": ("export default function Logo() {\n  return <img className=\"logo\" />;\n}\n",
+             ".logo { width: 48px; }\n"),
+    "RecipeCard": ("export default function RecipeCard() {\n  return <div className=\"recipe-card\" />;\n}\n",
+                   ".recipe-card { padding: 1rem; }\n.recipe-card-title { font-weight: bold; }\n"),
+    "Footer": ("export default function Footer() {\n  return <footer className=\"footer\" />;\n}\n",
+               ".footer { color: gray; }\n"),
+}
+
+
+def make_split_project(root):
+    (root / "src" / "components").mkdir(parents=True)
+    (root / "src" / "App.js").write_text("export default function App() {\n  return <Header />;\n}\n")
+    (root / "src" / "App.css").write_text("body { margin: 0; }\n")
+    for name, (code, styles) in COMPONENTS.items():
+        (root / "src" / "components" / f"{name}.js").write_text(code)
+        (root / "src" / "components" / f"{name}.css").write_text(styles)
+    return root
+
+
+def block(path, content="x"):
+    return f"FILE: {path}\n{content}\nEND FILE\n"
+
+
+def test_file_blocks_under_src_are_parsed():
+    files = parse_file_blocks(block("src/App.js", "one") + block("src/components/Card.css", "two"))
+    assert files == {"src/App.js": "one\n", "src/components/Card.css": "two\n"}
+
+
+@pytest.mark.parametrize("path", ["../src/App.js", "src/../../etc/passwd.js", "/src/App.js", "/etc/App.css",
+                                  "package.json", "src/setup.sh", "public/index.js", "src/App.jsx"])
+def test_paths_outside_src_or_of_other_types_are_refused(path):
+    with pytest.raises(PatchError, match="Refusing to write"):
+        parse_file_blocks(block("src/App.js") + block(path))
+
+
+def test_response_without_file_blocks_is_refused():
+    with pytest.raises(PatchError, match="No file blocks"):
+        parse_file_blocks("Sure! Here is your app.")
+
+
+def test_css_selectors_skip_comments_at_rules_and_keyframe_stops():
+    css = """/* .commented { } */
+    .a, .b > p { color: red; }
+    @media (max-width: 600px) { .a { color: blue; } }
+    @keyframes fade { from { opacity: 0; } 50%, to { opacity: 1; } }
+    """
+    assert css_selectors(css) == [".a", ".b > p"]
+
+
+def test_select_ranks_name_matches_above_selector_matches(tmp_path):
+    index = ComponentIndex(make_split_project(tmp_path))
+    assert index.select("make the recipe cards bigger") == ["RecipeCard"]
+    # "title" matches a Header and a RecipeCard selector, "header" the Header name too
+    assert index.select("change the header title color") == ["Header"]
+    assert index.select("add a newsletter signup") == []
+
+
+def test_summary_describes_neighbors_and_lists_the_rest(tmp_path):
+    index = ComponentIndex(make_split_project(tmp_path))
+    summary = index.summary(["Header"])
+    assert summary.splitlines() == [
+        "- Logo (src/components/Logo.js): renders nothing; selectors .logo",
+        "- Also present: Footer, RecipeCard",
+    ]
+
+
+def test_rewrite_of_a_component_not_in_the_prompt_is_dropped(tmp_path):
+    project_dir = make_split_project(tmp_path / "project")
+
+    def responder(prompt):
+        return (block("src/components/Header.js", "export default function Header() { return null; }")
+                + block("src/components/Footer.js", "export default function Footer() { return null; }")
+                + block("src/components/Banner.js", "export default function Banner() { return null; }"))
+
+    agent = FrontendAgent(use_cache=False, client=FakeOpenAI(responder=responder, first_token_latency=0,
+                                                             tokens_per_second=1e9))
+    files = agent.edit_components("make the header sticky", project_dir)
+    agent.cleanup()
+
+    assert sorted(files) == ["src/components/Banner.js", "src/components/Header.js"]
@@ -0,0 +1,63 @@
+import threading
+from deploy_pipeline import DeploymentPipeline
+
+
+class FakeAgent:
+    """Deployment agent whose push blocks until released and then fails like a lost ref race"""
+
+    def __init__(self):
+        self.pushing = threading.Event()
+        self.release = threading.Event()
+        self.pushes = []
+
+    def create_github_repo(self, name):
+        return {"html_url": f"https://github.com/devis/{name}", "full_name": f"devis/{name}"}
+
+    def find_github_repo(self, name):
+        return None
+
+    def push_to_github(self, full_name, files, branch="main"):
+        self.pushes.append(dict(files))
+        if len(self.pushes) == 1:
+            self.pushing.set()
+            self.release.wait(5)
+            return None
+        return "sha"
+
+    def deploy_files(self, project_dir, name):
+        return {"id": "dpl", "url": f"{name}.vercel.app", "readyState": "READY"}
+
+    def cancel_deployment(self, deployment_id):
+        return True
+
+
+def test_superseded_job_reports_cancelled_and_pushes_are_serialized(tmp_path):
+    agent = FakeAgent()
+    heard = []
+    pipeline = DeploymentPipeline(agent, on_event=heard.append)
+    first = pipeline.start("app", tmp_path, {"src/App.js": "one"})
+    assert agent.pushing.wait(5)
+
+    second = pipeline.start("app", tmp_path, {"src/App.js": "two"})
+    # The second push waits for the first to finish instead of racing it
+    assert len(agent.pushes) == 1
+    agent.release.set()
+    first.join(5)
+    second.join(5)
+
+    statuses = {job: [e["status"] for e in heard if e["job"] == job] for job in (1, 2)}
+    assert statuses[1][-1] == "cancelled"
+    assert "failed" not in statuses[1]
+    assert statuses[2][-1] == "ready"
+    assert agent.pushes[-1] == {"src/App.js": "two"}
+
+
+def test_events_reach_the_callback_as_they_happen(tmp_path):
+    agent = FakeAgent()
+    agent.release.set()
+    agent.pushes.append({})  # let the next push succeed
+    heard = []
+    job = DeploymentPipeline(agent, on_event=heard.append).start("app", tmp_path, {"src/App.js": "x"})
+    job.join(5)
+    assert heard[-1]["status"] == "ready"
+    assert [e["stage"] for e in heard if e["status"] == "started"] == ["repository", "push", "deploy", "build"]
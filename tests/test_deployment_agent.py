@@ -0,0 +1,62 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from clients import create_session
+from deployment_agent import DeploymentAgent
+from fakes import LocalAPIServer
+
+
+def make_project(root):
+    (root / "src").mkdir(parents=True)
+    (root / "package.json").write_text('{"name": "app"}')
+    (root / "src" / "App.js").write_text("export default function App() { return null; }\n")
+    (root / "src" / "App.css").write_text("body { margin: 0; }\n")
+    (root / "node_modules" / "react").mkdir(parents=True)
+    (root / "node_modules" / "react" / "index.js").write_text("module.exports = {};\n")
+    return root
+
+
+def test_redeploy_uploads_only_changed_files(tmp_path):
+    project = make_project(tmp_path / "app")
+    with LocalAPIServer(build_polls=1) as server:
+        agent = DeploymentAgent(github_api=server.url, vercel_api=server.url, session=create_session())
+        assert agent.deploy_files(project, "app")
+        assert agent.last_upload_stats == {"files": 3, "uploaded": 3, "bytes": agent.last_upload_stats["bytes"]}
+
+        assert agent.deploy_files(project, "app")
+        assert agent.last_upload_stats["uploaded"] == 0
+
+        (project / "src" / "App.css").write_text("body { margin: 1px; }\n")
+        assert agent.deploy_files(project, "app")
+        assert agent.last_upload_stats["uploaded"] == 1
+        assert agent.last_upload_stats["bytes"] == len("body { margin: 1px; }\n")
+        agent.cleanup()
+
+
+class BadGatewayHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = b"<html><body><h1>502 Bad Gateway</h1></body></html>"
+        self.send_response(502)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_html_error_page_fails_the_deploy_without_raising(tmp_path, capsys):
+    project = make_project(tmp_path / "app")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), BadGatewayHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    # No retries, so the 502 comes straight back
+    agent = DeploymentAgent(github_api=url, vercel_api=url, session=create_session(retries=0))
+    try:
+        assert agent.deploy_files(project, "app") is None
+        assert agent.push_to_github("devis/app", {"src/App.js": "x"}, branch="main") is None
+    finally:
+        httpd.shutdown()
+        agent.cleanup()
+    assert "502 Bad Gateway" in capsys.readouterr().out
@@ -0,0 +1,36 @@
+import os
+import stat
+from file_writer import ProjectWriter
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_batch_writes_changed_files_once_and_keeps_modes(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "App.js").write_text("old")
+    os.chmod(tmp_path / "src" / "App.js", 0o644)
+    writer = ProjectWriter(tmp_path)
+
+    with writer.batch():
+        writer.write("src/App.js", "new")
+        writer.write("src/components/Header.js", "header")
+
+    assert writer.last_changed == ["src/App.js", "src/components/Header.js"]
+    assert writer.stats["rebuilds"] == 1
+    assert mode(tmp_path / "src" / "App.js") == 0o644
+    umask = os.umask(0o022)
+    os.umask(umask)
+    assert mode(tmp_path / "src" / "components" / "Header.js") == 0o666 & ~umask
+
+
+def test_unchanged_content_is_skipped_and_none_removes(tmp_path):
+    writer = ProjectWriter(tmp_path)
+    writer.write("src/App.css", "body {}")
+    writer.write("src/App.css", "body {}")
+    assert writer.stats == {"writes": 1, "skipped": 1, "rebuilds": 1}
+
+    writer.write("src/App.css", None)
+    assert not (tmp_path / "src" / "App.css").exists()
+    assert writer.last_changed == ["src/App.css"]
@@ -0,0 +1,45 @@
+from cache import TieredCache
+from fakes import FakeOpenAI, default_responder
+from frontend_agent import FrontendAgent
+
+
+def bad_patch_responder(prompt):
+    if "search/replace hunks" in prompt:
+        return "FILE: App.js\n<<<<<<< SEARCH\nnot in the file\n=======\nanything\n>>>>>>> REPLACE"
+    return default_responder(prompt)
+
+
+def make_project(tmp_path):
+    (tmp_path / "src").mkdir(parents=True)
+    (tmp_path / "src" / "App.js").write_text("export default function App() {\n  return <h1>Hi</h1>;\n}\n")
+    (tmp_path / "src" / "App.css").write_text(".App {\n  color: #000000;\n}\n")
+    return tmp_path
+
+
+def test_patch_that_does_not_apply_is_not_cached(tmp_path):
+    project_dir = make_project(tmp_path / "project")
+    agent = FrontendAgent(use_cache=False, client=FakeOpenAI(responder=bad_patch_responder, first_token_latency=0,
+                                            tokens_per_second=1e9))
+    agent.cache = TieredCache(tmp_path / "llm")
+    code, styles = agent.edit_app("change the title", project_dir)
+    agent.cleanup()
+
+    assert "export default" in code and styles
+    current_code, current_css = agent._read_current_code(project_dir)
+    key = agent._cache_key("patch", "change the title", current_code, current_css)
+    assert agent.cache.get(key) is None
+
+
+def test_cached_patch_that_no_longer_applies_is_evicted(tmp_path):
+    project_dir = make_project(tmp_path / "project")
+    agent = FrontendAgent(use_cache=False, client=FakeOpenAI(first_token_latency=0, tokens_per_second=1e9))
+    agent.cache = TieredCache(tmp_path / "llm")
+    current_code, current_css = agent._read_current_code(project_dir)
+    key = agent._cache_key("patch", "change the title", current_code, current_css)
+    agent.cache.put(key, b"no hunks here")
+
+    code, _ = agent.edit_app("change the title", project_dir)
+    agent.cleanup()
+
+    assert "export default" in code
+    assert agent.cache.get(key) is None
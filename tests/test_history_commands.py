@@ -0,0 +1,35 @@
+import pytest
+from main import parse_history_command, parse_turn_number
+
+
+@pytest.mark.parametrize("command, expected", [
+    ("Undo.", ("undo", None)),
+    ("undo the last change", ("undo", None)),
+    ("Okay, undo that please", ("undo", None)),
+    ("please redo", ("redo", None)),
+    ("Can you go back to turn 2?", ("goto", 2)),
+    ("Go back to turn twenty-one.", ("goto", 21)),
+    ("go back to turn twenty one", ("goto", 21)),
+    ("ok devis, jump back to version number three please", ("goto", 3)),
+    ("go back to turn banana", ("goto", None)),
+])
+def test_history_commands(command, expected):
+    assert parse_history_command(command) == expected
+
+
+@pytest.mark.parametrize("command", [
+    "Undo the last change and add a footer",
+    "add an undo button",
+    "restore the footer color",
+    "change the title to fresh recipes",
+])
+def test_change_requests_are_not_history_commands(command):
+    assert parse_history_command(command) is None
+
+
+def test_turn_numbers():
+    assert parse_turn_number("7") == 7
+    assert parse_turn_number("twenty") == 20
+    assert parse_turn_number("forty-two") == 42
+    assert parse_turn_number("twenty twenty") is None
+    assert parse_turn_number("three four") is None
@@ -0,0 +1,62 @@
+import pytest
+from fakes import FakeScrapybara
+from instance_pool import InstancePool
+
+
+def make_pool(**kwargs):
+    client = FakeScrapybara(start_latency=0, resume_latency=0, command_latency=0)
+    return client, InstancePool(client, tool_factory=lambda instance: None, reap_interval=3600, **kwargs)
+
+
+def test_error_in_use_keeps_a_healthy_instance_warm():
+    client, pool = make_pool()
+    with pytest.raises(ValueError):
+        with pool.instance() as pooled:
+            raise ValueError("bad url")
+    with pool.instance() as again:
+        assert again is pooled
+    pool.close()
+
+    assert pool.stats == {"started": 1, "reused": 1, "discarded": 0, "reaped": 0}
+    assert client.stats.snapshot()["scrapybara.start"]["calls"] == 1
+
+
+def test_error_in_use_discards_an_instance_that_stopped_answering():
+    _, pool = make_pool()
+    with pytest.raises(RuntimeError):
+        with pool.instance() as pooled:
+            def broken(command):
+                raise RuntimeError("instance gone")
+            pooled.instance.bash = broken
+            raise RuntimeError("capture failed")
+    with pool.instance() as fresh:
+        assert fresh is not pooled
+    pool.close()
+
+    assert pool.stats["discarded"] == 1
+    assert pool.stats["started"] == 2
+
+
+def test_paused_instance_is_resumed_and_reused():
+    client, pool = make_pool()
+    with pool.instance() as first:
+        pass
+    assert first.paused
+    with pool.instance() as second:
+        assert second is first and not second.paused
+    pool.close()
+
+    calls = client.stats.snapshot()
+    assert calls["scrapybara.pause"]["calls"] == 2
+    assert calls["scrapybara.resume"]["calls"] == 1
+
+
+def test_idle_instances_are_reaped():
+    client, pool = make_pool(idle_timeout=0)
+    with pool.instance():
+        pass
+    pool.reap()
+    pool.close()
+
+    assert pool.stats["reaped"] == 1
+    assert client.stats.snapshot()["scrapybara.stop"]["calls"] == 1
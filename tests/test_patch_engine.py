@@ -0,0 +1,62 @@
+import pytest
+from patch_engine import PatchError, apply_hunk, apply_hunks, parse_hunks
+
+APP = """function App() {
+  return (
+    <div className="App">
+      <h1>Todo</h1>
+    </div>
+  );
+}
+"""
+
+
+def hunk(search, replace, filename="App.js"):
+    header = f"FILE: {filename}\n" if filename else ""
+    return f"{header}<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE\n"
+
+
+def test_exact_hunk_applies():
+    hunks = parse_hunks(hunk("      <h1>Todo</h1>", "      <h1>Tasks</h1>"))
+    assert hunks == [("App.js", "      <h1>Todo</h1>", "      <h1>Tasks</h1>")]
+    assert "<h1>Tasks</h1>" in apply_hunks({"App.js": APP}, hunks)["App.js"]
+
+
+def test_loose_hunk_ignores_indentation():
+    patched = apply_hunk(APP, "<h1>Todo</h1>\n</div>", "      <h1>Tasks</h1>\n    </div>")
+    assert patched == APP.replace("<h1>Todo</h1>", "<h1>Tasks</h1>")
+
+
+def test_ambiguous_hunk_is_refused():
+    with pytest.raises(PatchError, match="2 locations"):
+        apply_hunk("a = 1\na = 1\n", "a = 1", "a = 2")
+
+
+def test_missing_search_text_is_refused():
+    with pytest.raises(PatchError, match="not found"):
+        apply_hunk(APP, "<h2>Nope</h2>", "<h2>Yes</h2>")
+
+
+def test_unknown_file_leaves_every_file_unchanged():
+    files = {"App.js": APP, "App.css": ".App {}"}
+    hunks = parse_hunks(hunk("<h1>Todo</h1>", "<h1>Tasks</h1>") + hunk(".App {}", "", "Other.css"))
+    with pytest.raises(PatchError, match="unknown file Other.css"):
+        apply_hunks(files, hunks)
+    assert files == {"App.js": APP, "App.css": ".App {}"}
+
+
+def test_one_header_covers_the_hunks_after_it():
+    text = (hunk("<h1>Todo</h1>", "<h1>Tasks</h1>") + hunk("<div className=\"App\">", "<main className=\"App\">", None)
+            + hunk(".App {}", ".App { margin: 0; }", "App.css"))
+    assert [filename for filename, _, _ in parse_hunks(text)] == ["App.js", "App.js", "App.css"]
+
+
+def test_hunk_without_any_header_is_refused():
+    with pytest.raises(PatchError, match="FILE: header"):
+        parse_hunks(hunk("<h1>Todo</h1>", "<h1>Tasks</h1>", None))
+
+
+def test_incomplete_hunk_is_not_dropped_silently():
+    text = hunk("<h1>Todo</h1>", "<h1>Tasks</h1>") + "<<<<<<< SEARCH\n</div>\n=======\n</main>\n"
+    with pytest.raises(PatchError, match="1 of 2"):
+        parse_hunks(text)
@@ -0,0 +1,91 @@
+import subprocess
+import threading
+import sys
+from pathlib import Path
+from analysis_cache import AnalysisCache
+from fakes import FakeBrowserTool, FakeGenAI, FakeScrapybara
+from screenshot_agent import ScreenshotAgent
+
+
+def make_agent():
+    agent = ScreenshotAgent(client=FakeScrapybara(start_latency=0, resume_latency=0, command_latency=0),
+                            genai_client=FakeGenAI(latency=0), tool_factory=FakeBrowserTool)
+    agent.analysis_cache = AnalysisCache()
+    return agent
+
+
+def test_importing_the_app_does_not_load_the_scrapybara_sdk():
+    check = "import sys, main, server, screenshot_agent; assert 'scrapybara' not in sys.modules"
+    root = Path(__file__).resolve().parent.parent
+    subprocess.run([sys.executable, "-c", check], cwd=root, check=True)
+
+
+def test_capture_and_analyze_with_fake_clients():
+    agent = make_agent()
+    image = agent.capture_screenshot("https://example.com")
+    assert image.startswith(b"\x89PNG")
+    assert agent.analyze_screenshot(image) == agent.genai_client.text
+    agent.cleanup()
+
+
+def test_capture_many_reports_api_errors_by_status():
+    class ApiError(Exception):
+        def __init__(self, status_code, body):
+            super().__init__(body)
+            self.status_code = status_code
+            self.body = body
+
+    agent = make_agent()
+
+    def screenshot(pooled, url):
+        if "bad" in url:
+            raise ApiError(404, "not found")
+        return b"png"
+    agent._screenshot = screenshot
+
+    results, report = agent.capture_many(["https://ok.example", "https://bad.example"], concurrency=2)
+    agent.cleanup()
+
+    assert results[0]["image"] == b"png"
+    assert results[1]["error"] == "Scrapybara API Error 404: not found"
+    assert report["captured"] == 1
+
+
+def test_cached_analysis_does_not_report_the_previous_upload():
+    agent = make_agent()
+    image = agent.capture_screenshot("https://example.com")
+    agent.analyze_screenshot(image, "https://example.com")
+    assert agent.last_upload["bytes"] > 0
+    assert agent.analyze_screenshot(image, "https://example.com") == agent.genai_client.text
+    assert agent.last_upload is None
+    agent.cleanup()
+
+
+def test_capture_many_times_out_a_hanging_url_and_shrinks_the_pool():
+    hang = threading.Event()
+
+    def tool_factory(instance):
+        tool = FakeBrowserTool(instance)
+
+        def browser_tool(command, url=None, **kwargs):
+            if command == "go_to" and "hangs" in url:
+                hang.wait(5)
+            return tool(command, url=url, **kwargs)
+        return browser_tool
+
+    client = FakeScrapybara(start_latency=0, resume_latency=0, command_latency=0)
+    agent = ScreenshotAgent(client=client, genai_client=FakeGenAI(latency=0), tool_factory=tool_factory)
+    urls = ["https://a.example", "https://hangs.example", "https://b.example", "https://c.example"]
+    results, report = agent.capture_many(urls, concurrency=3, timeout=0.5)
+    pool = agent.pool
+
+    assert results[1]["error"] == "Timed out after 0.5s"
+    assert [result["image"] is not None for result in results] == [True, False, True, True]
+    assert report["captured"] == 3 and report["failed"] == 1
+    assert pool.in_use == 0
+    assert len(pool.idle) <= pool.max_size
+    # The hung instance is stopped rather than returned to the pool
+    assert pool.stats["discarded"] == 1
+
+    hang.set()
+    agent.cleanup()
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from pathlib import Path
+from fastapi.testclient import TestClient
+from deployment_agent import DeploymentAgent
+from fakes import FakeElevenLabs, FakeOpenAI, FakePlayer
+from server import SessionManager, create_app
+from voice_agent import VoiceAgent
+
+
+def make_manager(tmp_path):
+    openai_client = FakeOpenAI()
+    voice_agent = VoiceAgent(client=openai_client, voice_client=FakeElevenLabs(), player=FakePlayer())
+    return SessionManager(root=tmp_path / "sessions", openai_client=openai_client, voice_agent=voice_agent,
+                          deployment_agent=DeploymentAgent(), use_llm_cache=False)
+
+
+def make_client(tmp_path):
+    manager = make_manager(tmp_path)
+    return manager, TestClient(create_app(manager))
+
+
+def test_speech_audio_is_served_only_for_queued_utterances(tmp_path):
+    manager, client = make_client(tmp_path)
+    with client:
+        session_id = client.post("/sessions").json()["session_id"]
+        speech = [event for event in client.get(f"/sessions/{session_id}/events").json()
+                  if event["type"] == "speech"]
+        assert speech[0]["audio"] == f"/sessions/{session_id}/speech/{speech[0]['speech_id']}"
+
+        response = client.get(speech[0]["audio"])
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.content
+
+        assert client.get(f"/sessions/{session_id}/speech/unknown").status_code == 404
+        assert client.get("/sessions/unknown/speech/" + speech[0]["speech_id"]).status_code == 404
+        assert client.get("/tts", params={"text": "anything at all"}).status_code == 404
+
+
+def test_files_include_components(tmp_path):
+    manager, client = make_client(tmp_path)
+    with client:
+        session_id = client.post("/sessions").json()["session_id"]
+        # Stand in for setup_local_project, which would copy the whole template
+        devis = manager.get(session_id).devis
+        devis.project_dir = project_dir = Path(devis.requested_project_dir)
+        (project_dir / "src" / "components").mkdir(parents=True)
+        (project_dir / "src" / "App.js").write_text("export default App;")
+        (project_dir / "src" / "components" / "Card.js").write_text("export default Card;")
+        (project_dir / "src" / "components" / "Card.css").write_text(".card {}")
+
+        files = client.get(f"/sessions/{session_id}/files").json()
+
+    assert files == {"src/App.js": "export default App;", "src/components/Card.css": ".card {}",
+                     "src/components/Card.js": "export default Card;"}
+
+
+def test_closing_a_session_releases_its_queued_turns(tmp_path):
+    manager = make_manager(tmp_path)
+    release = threading.Event()
+
+    async def scenario():
+        session = await manager.create_session()
+        session.handle = lambda command: release.wait(5)
+        turns = [manager.submit_turn(session, f"change {n}") for n in range(4)]
+        while turns[0].status != "running":
+            await asyncio.sleep(0.01)
+        await manager.close_session(session.id)
+        await asyncio.sleep(0)
+        release.set()
+        await manager.close()
+        return turns
+
+    turns = asyncio.run(scenario())
+
+    assert manager.pending == 0
+    assert [turn.status for turn in turns] == ["cancelled"] * 4
+    assert all(turn.done.is_set() for turn in turns)
@@ -0,0 +1,75 @@
+import os
+from snapshot_store import SnapshotStore
+
+
+def blobs(store):
+    return len(os.listdir(store.objects))
+
+
+def test_unchanged_files_are_stored_once(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.record({"src/App.js": "one", "src/App.css": "same"}, "first")
+    store.record({"src/App.js": "two"}, "second")
+    assert blobs(store) == 3
+    assert store.current()["files"]["src/App.css"] == store.snapshots[0]["files"]["src/App.css"]
+
+
+def test_recording_identical_files_adds_no_snapshot(tmp_path):
+    store = SnapshotStore(tmp_path)
+    first = store.record({"src/App.js": "one"}, "first")
+    assert store.record({"src/App.js": "one"}, "again") is first
+    assert len(store.snapshots) == 1
+
+
+def test_retention_drops_oldest_snapshots_and_their_blobs(tmp_path):
+    store = SnapshotStore(tmp_path, max_snapshots=3)
+    for turn in range(5):
+        store.record({"src/App.js": f"version {turn}", "src/App.css": "same"}, f"turn {turn}")
+    assert [snapshot["id"] for snapshot in store.snapshots] == [3, 4, 5]
+    assert blobs(store) == 4
+    assert store.goto(1) is None
+
+
+def test_new_turn_after_undo_drops_the_redo_entries(tmp_path):
+    store = SnapshotStore(tmp_path)
+    for turn in range(3):
+        store.record({"src/App.js": f"version {turn}"}, f"turn {turn}")
+    store.undo()
+    store.undo()
+    store.record({"src/App.js": "branch"}, "branch")
+
+    assert [snapshot["id"] for snapshot in store.snapshots] == [1, 4]
+    assert store.redo() is None
+    assert blobs(store) == 2
+
+
+def test_diff_restores_content_and_deletes_added_files(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.record({"src/App.js": "one"}, "first")
+    store.record({"src/App.js": "two", "src/components/Footer.js": "footer"}, "second")
+    current = store.current()
+    target = store.undo()
+    assert store.diff(current, target) == {"src/App.js": b"one", "src/components/Footer.js": None}
+    assert store.diff(target, store.redo()) == {"src/App.js": b"two", "src/components/Footer.js": b"footer"}
+
+
+def test_history_survives_reopening(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.record({"src/App.js": "one"}, "first")
+    store.record({"src/App.js": "two"}, "second")
+    store.undo()
+    reopened = SnapshotStore(tmp_path)
+    assert reopened.current()["id"] == 1
+    assert reopened.redo()["id"] == 2
+
+
+def test_changes_since_deployed_include_deletions(tmp_path):
+    store = SnapshotStore(tmp_path)
+    files = {"src/App.js": "one", "src/App.css": "css", "package.json": "{}"}
+    assert store.changes_since_deployed("app", files) is None
+
+    store.mark_deployed("app", files)
+    assert store.changes_since_deployed("app", files) == {}
+    changed = {"src/App.js": "two", "package.json": "{}"}
+    assert store.changes_since_deployed("app", changed) == {"src/App.js": "two", "src/App.css": None}
+    assert store.changes_since_deployed("other-repo", changed) is None
@@ -0,0 +1,59 @@
+import time
+from fakes import MP3_BYTES_PER_SECOND, FakeElevenLabs, FakePlayer
+from speech_queue import SpeechQueue
+
+
+def make_queue(fail_on=None, speedup=20.0):
+    voice = FakeElevenLabs(latency=0.05, characters_per_second=15.0)
+    player = FakePlayer(speedup=speedup)
+    played = []
+
+    def synthesize(text):
+        if text == fail_on:
+            raise RuntimeError("quota exceeded")
+        return b"".join(voice.text_to_speech.convert(text=text))
+
+    def play(audio):
+        player(audio)
+        played.append(len(audio))
+
+    return SpeechQueue(synthesize, play), played, voice
+
+
+def clip_bytes(text):
+    return int(len(text) / 15.0 * MP3_BYTES_PER_SECOND)
+
+
+def test_utterances_play_in_the_order_they_were_queued():
+    speech, played, voice = make_queue()
+    texts = ["Setting up your React project...", "Done.", "What kind of web app would you like to create?"]
+    utterances = [speech.say(text) for text in texts]
+    assert all(utterance.wait(5) for utterance in utterances)
+    speech.close()
+
+    assert played == [clip_bytes(text) for text in texts]
+    assert voice.stats.snapshot()["elevenlabs.tts"]["characters"] == sum(len(text) for text in texts)
+
+
+def test_say_returns_before_playback_ends():
+    # About 1.7 s of audio played at 4x speed takes over 0.4 s
+    speech, played, _ = make_queue(speedup=4.0)
+    started = time.monotonic()
+    utterance = speech.say("Your web app is now live.")
+    assert time.monotonic() - started < 0.05
+    assert not utterance.done.is_set()
+    assert utterance.wait(5)
+    assert time.monotonic() - started >= 0.4
+    speech.close()
+
+
+def test_failed_synthesis_still_completes_and_later_speech_plays():
+    speech, played, _ = make_queue(fail_on="Deploying now")
+    failed = speech.say("Deploying now")
+    after = speech.say("Anything else?")
+    assert failed.wait(5) and after.wait(5)
+    speech.close()
+
+    assert isinstance(failed.error, RuntimeError)
+    assert after.error is None
+    assert played == [clip_bytes("Anything else?")]
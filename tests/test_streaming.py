@@ -0,0 +1,77 @@
+import os
+import stat
+from streaming import atomic_write, css_checkpoint, js_checkpoint
+
+APP = """import React, { useState } from 'react';
+import './App.css';
+
+const EMAIL = /^[^'"@]+@[a-z{]+$/i;
+
+function Card({ title }) {
+  return (
+    <div className="card">
+      <p>Don't miss {title.length > 3 ? <b>long</b> : 'short'}</p>
+      <img src="a.png" />
+    </div>
+  );
+}
+
+function App() {
+  const [count, setCount] = useState(0);
+  const half = count / 2;
+  return <><Card title="x" /><p>It's {half}</p></>;
+}
+
+export default App;
+"""
+
+
+def test_prefix_with_app_but_no_export_gets_one_appended():
+    cut = APP.index("export default")
+    safe, suffix = js_checkpoint(APP[:cut + 5])
+    assert APP[:safe] == APP[:cut]
+    assert suffix.strip() == "export default App;"
+
+
+def test_apostrophes_in_jsx_text_and_quotes_in_regexes_do_not_hide_statement_ends():
+    cut = APP.index("function App")
+    # Card is complete, so the checkpoint reaches it once App is there too
+    safe, _ = js_checkpoint(APP[:cut] + "function App() {\n  return <Card />;\n}\n")
+    assert safe > cut
+
+
+def test_nothing_is_written_before_app_is_defined():
+    assert js_checkpoint(APP[:APP.index("function App")]) == (0, "")
+
+
+def test_statement_split_mid_jsx_is_not_a_checkpoint():
+    cut = APP.index("<p>It's")
+    safe, suffix = js_checkpoint(APP[:cut])
+    assert safe <= APP.index("function App")
+
+
+def test_complete_file_needs_no_suffix():
+    assert js_checkpoint(APP) == (len(APP), "")
+
+
+def test_css_checkpoint_stops_after_the_last_complete_rule():
+    css = ".a {\n  color: red;\n}\n.b {\n  content: '}';\n"
+    safe, suffix = css_checkpoint(css)
+    assert css[:safe] == ".a {\n  color: red;\n}\n" and suffix == ""
+
+
+def test_atomic_write_keeps_the_file_mode(tmp_path):
+    path = tmp_path / "App.js"
+    path.write_text("old")
+    os.chmod(path, 0o644)
+    atomic_write(path, "new")
+    assert path.read_text() == "new"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+def test_atomic_write_new_file_gets_the_umask_default(tmp_path):
+    umask = os.umask(0o022)
+    os.umask(umask)
+    path = tmp_path / "App.css"
+    atomic_write(path, "body {}")
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
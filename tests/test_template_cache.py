@@ -0,0 +1,45 @@
+import json
+import os
+from template_cache import TemplateCache, npm_package_name
+
+
+def fake_template(tmp_path):
+    cache = TemplateCache(root=tmp_path / "templates", version="test")
+    project = cache.path
+    (project / "src").mkdir(parents=True)
+    (project / "src" / "App.js").write_text("export default function App() { return null; }\n")
+    (project / "package.json").write_text(json.dumps({"name": "devis-template"}))
+    package = project / "node_modules" / "react"
+    package.mkdir(parents=True)
+    (package / "index.js").write_text("module.exports = {};\n")
+    (project / "node_modules" / ".bin").mkdir()
+    os.symlink("../react/index.js", project / "node_modules" / ".bin" / "react")
+    (project / "node_modules" / ".package-lock.json").write_text("{}")
+    cache._write_manifest(project)
+    return cache
+
+
+def test_writes_inside_node_modules_do_not_reach_the_template(tmp_path):
+    cache = fake_template(tmp_path)
+    project = cache.materialize(tmp_path / "My App")
+
+    with open(project / "node_modules" / "react" / "index.js", "a") as f:
+        f.write("// patched by a postinstall script\n")
+
+    assert (cache.path / "node_modules" / "react" / "index.js").read_text() == "module.exports = {};\n"
+    assert os.readlink(project / "node_modules" / ".bin" / "react") == "../react/index.js"
+    assert not (project / ".devis-template.json").exists()
+    assert cache.verify() == []
+
+
+def test_package_name_is_a_valid_npm_name(tmp_path):
+    cache = fake_template(tmp_path)
+    project = cache.materialize(tmp_path / ".My Recipe App")
+    assert json.loads((project / "package.json").read_text())["name"] == "my-recipe-app"
+
+
+def test_npm_package_name():
+    assert npm_package_name("devis-ui") == "devis-ui"
+    assert npm_package_name("_Private Stuff!") == "private-stuff"
+    assert npm_package_name("...") == "devis-app"
+    assert len(npm_package_name("a" * 300)) == 214
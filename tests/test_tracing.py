@@ -0,0 +1,84 @@
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from tracing import Tracer, percentile, report, summarize_turn
+
+
+def read(path):
+    with open(path) as f:
+        return {record["name"]: record for record in map(json.loads, f)}
+
+
+def test_spans_in_worker_threads_stay_under_their_turn(tmp_path, capsys):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path))
+
+    def stage(name):
+        with tracer.span(name) as span:
+            span.add("bytes_sent", 100)
+
+    with tracer.turn("turn") as turn:
+        with ThreadPoolExecutor(2) as executor:
+            for name in ("generate", "transcribe"):
+                executor.submit(contextvars.copy_context().run, stage, name).result()
+        with tracer.span("write"):
+            pass
+
+    records = read(path)
+    for name in ("generate", "transcribe", "write"):
+        assert records[name]["parent"] == turn.span_id
+        assert records[name]["trace"] == turn.trace_id
+    assert records["generate"]["counters"] == {"bytes_sent": 100}
+    assert records["generate"]["thread"] != records["write"]["thread"]
+    assert records["turn"]["parent"] is None
+    # The turn summary lists every stage with its counters
+    printed = capsys.readouterr().out
+    assert printed.startswith("Turn turn: ")
+    assert "bytes_sent=100" in printed and "write" in printed
+
+
+def test_a_span_in_a_thread_without_the_context_starts_its_own_trace(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), print_turns=False)
+
+    def detached():
+        with tracer.span("detached"):
+            pass
+
+    with tracer.turn("turn"):
+        with ThreadPoolExecutor(1) as executor:
+            executor.submit(detached).result()
+    assert read(path)["detached"]["parent"] is None
+
+
+def test_summarize_turn_totals_stages_slowest_first():
+    root = {"name": "turn", "duration_ms": 1200.0}
+    children = [
+        {"name": "llm.stream", "duration_ms": 800.0, "counters": {"completion_tokens": 300}},
+        {"name": "tts.synthesize", "duration_ms": 100.0, "counters": {}},
+        {"name": "tts.synthesize", "duration_ms": 150.0, "counters": {"characters": 40}},
+    ]
+    lines = summarize_turn(root, children).splitlines()
+    assert lines[0] == "Turn turn: 1200 ms"
+    assert lines[1].split()[:4] == ["llm.stream", "800", "ms", "x1"]
+    assert lines[2].split() == ["tts.synthesize", "250", "ms", "x2", "characters=40"]
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile([7], 0.95) == 7
+
+
+def test_report_aggregates_trace_files(tmp_path, capsys):
+    paths = []
+    for session in ("a", "b"):
+        path = tmp_path / f"{session}.jsonl"
+        path.write_text("\n".join(json.dumps({"session": session, "name": "turn", "duration_ms": ms})
+                                  for ms in (100.0, 300.0)) + "\n\n")
+        paths.append(path)
+    report(paths)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "2 sessions, 4 spans"
+    assert lines[2].split() == ["turn", "4", "100.0", "300.0", "300.0"]
@@ -0,0 +1,78 @@
+import numpy as np
+from transcription import ChunkedTranscriber, stitch_transcripts
+
+SAMPLE_RATE = 100  # one word per second keeps the fake easy to reason about
+WORDS = "make the header blue and add a footer with three links to the recipes page".split()
+
+
+def speech(words):
+    """One second per word; sample values are word ids, zero is silence"""
+    return np.repeat(np.arange(1, len(words) + 1, dtype=np.float32), SAMPLE_RATE)
+
+
+class FakeWhisper:
+    """Hears a word when at least half of it is inside the window, like a cut-off syllable"""
+
+    def __init__(self, words):
+        self.words = words
+        self.windows = []
+
+    def __call__(self, samples):
+        self.windows.append(len(samples))
+        heard = []
+        for word_id in dict.fromkeys(samples.astype(int).tolist()):
+            if word_id and np.count_nonzero(samples == word_id) >= SAMPLE_RATE // 2:
+                heard.append(self.words[word_id - 1])
+        return " ".join(heard)
+
+
+def transcribe(signal, block=37, **window):
+    whisper = FakeWhisper(WORDS)
+    transcriber = ChunkedTranscriber(whisper, SAMPLE_RATE, **window)
+    for start in range(0, len(signal), block):
+        transcriber.add(signal[start:start + block])
+    return transcriber.finish(), whisper
+
+
+def test_overlapping_words_are_heard_once():
+    text, whisper = transcribe(speech(WORDS), window_seconds=6.0, overlap_seconds=1.5)
+    assert len(whisper.windows) > 2
+    assert text == " ".join(WORDS)
+
+
+def test_stitch_drops_repeated_words_despite_case_and_punctuation():
+    assert stitch_transcripts(["Make the header blue and", "Blue, and add a footer"]) == \
+        "Make the header blue and add a footer"
+
+
+def test_stitch_tolerates_a_word_cut_at_the_window_edge():
+    assert stitch_transcripts(["add a big foot", "a big footer with links"]) == "add a big footer with links"
+
+
+def test_empty_chunks_are_skipped():
+    assert stitch_transcripts(["", "make the header", "", "header blue", ""]) == "make the header blue"
+    assert stitch_transcripts(["", ""]) == ""
+
+
+def test_silent_window_does_not_break_stitching():
+    words = WORDS[:4]
+    signal = np.concatenate((speech(words), np.zeros(8 * SAMPLE_RATE, dtype=np.float32)))
+    text, whisper = transcribe(signal, window_seconds=4.0, overlap_seconds=1.0)
+    assert whisper(np.zeros(SAMPLE_RATE, dtype=np.float32)) == ""
+    assert text == " ".join(words)
+
+
+def test_tail_shorter_than_the_overlap_is_not_sent_again():
+    # 10 s: windows at 0-6 and 4-10 cover everything, the 2 s left over is all overlap
+    words = WORDS[:10]
+    text, whisper = transcribe(speech(words), window_seconds=6.0, overlap_seconds=2.0)
+    assert whisper.windows == [600, 600]
+    assert text == " ".join(words)
+
+
+def test_short_final_chunk_adds_only_its_new_words():
+    # 11 s: the tail from 9 s holds 1.5 s of overlap and half a second of new audio
+    words = WORDS[:11]
+    text, whisper = transcribe(speech(words), window_seconds=6.0, overlap_seconds=1.5)
+    assert whisper.windows == [600, 600, 200]
+    assert text == " ".join(words)
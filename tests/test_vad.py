@@ -0,0 +1,101 @@
+import numpy as np
+from vad import EnergyVAD, RingBuffer, VADRecorder
+
+SAMPLE_RATE = 16000
+FRAME = 480  # 30 ms at 16 kHz
+
+
+def tone(seconds, amplitude=0.3, frequency=220.0):
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def noise(seconds, amplitude=0.001, seed=0):
+    rng = np.random.default_rng(seed)
+    return (amplitude * rng.standard_normal(int(SAMPLE_RATE * seconds))).astype(np.float32)
+
+
+def frames_covering(seconds):
+    return -(-int(SAMPLE_RATE * seconds) // FRAME)
+
+
+def record(signal, block=1024, **kwargs):
+    recorder = VADRecorder(EnergyVAD(SAMPLE_RATE, **kwargs.pop("vad", {})), **kwargs)
+    for start in range(0, len(signal), block):
+        if recorder.feed(signal[start:start + block]):
+            break
+    return recorder
+
+
+def states(vad, signal):
+    return [vad.process(signal[start:start + FRAME]) for start in range(0, len(signal) - FRAME + 1, FRAME)]
+
+
+def test_onset_after_consecutive_voiced_frames():
+    vad = EnergyVAD(SAMPLE_RATE, onset_ms=90)
+    result = states(vad, np.concatenate((noise(0.6), tone(0.3))))
+    onset = result.index("onset")
+    assert onset == 20 + vad.onset_frames - 1
+    assert set(result[:20]) == {"silence"}
+
+
+def test_short_click_does_not_start_speech():
+    vad = EnergyVAD(SAMPLE_RATE, onset_ms=90)
+    result = states(vad, np.concatenate((noise(0.6), tone(0.03), noise(0.6, seed=1))))
+    assert "onset" not in result
+
+
+def test_hangover_keeps_short_pauses_inside_the_utterance():
+    vad = EnergyVAD(SAMPLE_RATE, trailing_silence_ms=300)
+    signal = np.concatenate((noise(0.3), tone(0.5), noise(0.15, seed=1), tone(0.5), noise(1.0, seed=2)))
+    result = states(vad, signal)
+    assert result.count("onset") == 1
+    assert result.count("end") == 1
+    # The end comes trailing_silence_ms after the second tone stops, not during the pause
+    first_silent_frame = frames_covering(0.3 + 0.5 + 0.15 + 0.5)
+    assert result.index("end") == first_silent_frame + vad.trailing_frames - 1
+
+
+def test_noise_floor_adapts_to_loud_background():
+    # A fan spinning up: the background rises by 36 dB over 3 s, then stays loud
+    rising = noise(3.0, amplitude=1.0) * np.geomspace(0.0003, 0.02, 3 * SAMPLE_RATE).astype(np.float32)
+    vad = EnergyVAD(SAMPLE_RATE, threshold_db=-60.0)
+    result = states(vad, np.concatenate((rising, noise(1.0, amplitude=0.02, seed=1))))
+    assert "onset" not in result
+
+
+def test_speech_from_the_first_frame_is_detected():
+    recorder = record(np.concatenate((tone(2.0), noise(2.0))), no_speech_timeout=1.0)
+    assert recorder.speech_started
+    assert len(recorder.audio()) >= 2.0 * SAMPLE_RATE
+
+
+def test_recorder_keeps_pre_roll_and_stops_at_end_of_speech():
+    signal = np.concatenate((noise(1.0), tone(1.0), noise(2.0, seed=1)))
+    recorder = record(signal, pre_roll_ms=300)
+    audio = recorder.audio()
+    assert recorder.done and recorder.end_sample is not None
+    # Pre-roll, the tone and the trailing silence, but not all the leading or trailing noise
+    assert 1.3 * SAMPLE_RATE <= len(audio) <= 2.3 * SAMPLE_RATE
+    assert recorder.end_sample < len(signal)
+
+
+def test_recorder_cuts_off_at_max_duration():
+    recorder = record(np.concatenate((noise(0.5), tone(10.0))), max_duration=2.0)
+    assert recorder.done
+    assert recorder.recorded == frames_covering(2.0) * FRAME
+    assert recorder.samples_seen < 3 * SAMPLE_RATE
+
+
+def test_recorder_gives_up_without_speech():
+    recorder = record(noise(5.0), no_speech_timeout=1.0)
+    assert recorder.done
+    assert len(recorder.audio()) == 0
+    assert recorder.samples_seen <= 1.1 * SAMPLE_RATE
+
+
+def test_ring_buffer_keeps_most_recent_samples_in_order():
+    buffer = RingBuffer(5)
+    buffer.extend([1, 2, 3])
+    buffer.extend([4, 5, 6, 7])
+    assert buffer.read().tolist() == [3, 4, 5, 6, 7]
@@ -0,0 +1,76 @@
+import threading
+import time
+import numpy as np
+from fakes import FakeElevenLabs, FakePlayer
+from speech_queue import SpeechQueue
+from voice_agent import VoiceAgent
+
+
+class StallingMicrophone:
+    """Delivers quiet noise and then a tone, and then stops calling back without closing"""
+
+    def __init__(self, sample_rate=44100, block=1024):
+        rng = np.random.default_rng(0)
+        quiet = 0.001 * rng.standard_normal(sample_rate // 2)
+        t = np.arange(sample_rate // 2) / sample_rate
+        self.signal = np.concatenate((quiet, 0.3 * np.sin(2 * np.pi * 220 * t))).astype(np.float32)
+        self.block = block
+
+    def InputStream(self, samplerate, channels=1, dtype=None, callback=None, **kwargs):
+        microphone = self
+
+        class Stream:
+            def __enter__(self):
+                def run():
+                    for start in range(0, len(microphone.signal), microphone.block):
+                        samples = microphone.signal[start:start + microphone.block]
+                        callback(samples.reshape(-1, 1), len(samples), None, None)
+                        time.sleep(0.001)
+                threading.Thread(target=run, daemon=True).start()
+                return self
+
+            def __exit__(self, *exc):
+                pass
+
+        return Stream()
+
+
+def test_record_utterance_returns_partial_audio_when_the_stream_stalls():
+    agent = VoiceAgent(voice_client=FakeElevenLabs(latency=0), player=FakePlayer(speedup=1000),
+                       audio_backend=StallingMicrophone())
+    agent.stream_stall_timeout = 0.2
+    started = time.monotonic()
+    recording = agent.record_utterance()
+    agent.cleanup()
+
+    assert time.monotonic() - started < 5
+    assert recording is not None and len(recording) > 0.3 * agent.sample_rate
+
+
+def test_announcements_wait_until_the_microphone_closes():
+    log = []
+    agent = VoiceAgent(voice_client=FakeElevenLabs(latency=0), player=FakePlayer(speedup=1000))
+    agent.speech = SpeechQueue(lambda text: text, lambda text: log.append(("played", text)))
+
+    def record_and_transcribe():
+        # A deployment finishes while the user is talking
+        threading.Thread(target=agent.announce, args=("Your web app is now live",)).start()
+        time.sleep(0.1)
+        log.append(("recorded", None))
+        return "make the header blue"
+    agent.record_and_transcribe = record_and_transcribe
+
+    assert agent.listen_for_input("What changes would you like to make?") == "make the header blue"
+    agent.cleanup()
+
+    assert log == [("played", "What changes would you like to make?"), ("recorded", None),
+                   ("played", "Your web app is now live"), ("played", "I heard: make the header blue")]
+
+
+def test_announcements_outside_recording_play_at_once():
+    played = []
+    agent = VoiceAgent(voice_client=FakeElevenLabs(latency=0), player=FakePlayer(speedup=1000))
+    agent.speech = SpeechQueue(lambda text: text, played.append)
+    agent.announce("Deployment failed").wait(5)
+    agent.cleanup()
+    assert played == ["Deployment failed"]
@@ -0,0 +1,172 @@
+import argparse
+import contextvars
+import functools
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from cache import DEFAULT_CACHE_ROOT
+
+_current_span = contextvars.ContextVar("devis_span", default=None)
+
+
+class Span:
+    """One timed stage; counters such as tokens or bytes are attached with add()"""
+
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.attrs = dict(attrs)
+        self.counters = defaultdict(float)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount):
+        self.counters[key] += amount
+
+
+class Tracer:
+    """Nested latency spans written to a JSONL file, one record per finished span
+
+    Spans nest through a context variable, so work handed to other threads
+    stays attached to its turn when submitted with contextvars.copy_context().
+    Spans opened with turn() additionally print a per-stage summary when they
+    finish, unless print_turns is off.
+    """
+
+    def __init__(self, path=None, enabled=True, print_turns=True):
+        self.path = path
+        self.enabled = enabled
+        self.print_turns = print_turns
+        self.lock = threading.Lock()
+        self.finished = {}
+        self.session_id = uuid.uuid4().hex[:12]
+
+    @contextmanager
+    def span(self, name, **attrs):
+        if not self.enabled:
+            yield Span(name, None, attrs)
+            return
+        parent = _current_span.get()
+        span = Span(name, parent, attrs)
+        token = _current_span.set(span)
+        if parent is None:
+            with self.lock:
+                self.finished[span.trace_id] = []
+        started_wall = time.time()
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span, started_wall, duration)
+
+    def turn(self, name, **attrs):
+        """Open a top-level span that prints a per-stage summary when it ends"""
+        return self.span(name, turn=True, **attrs)
+
+    def traced(self, name=None):
+        """Decorator that runs the function inside a span named after it"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current(self):
+        return _current_span.get()
+
+    def _finish(self, span, started_wall, duration):
+        record = {
+            "session": self.session_id,
+            "trace": span.trace_id,
+            "span": span.span_id,
+            "parent": span.parent_id,
+            "name": span.name,
+            "start": started_wall,
+            "duration_ms": round(duration * 1000, 3),
+            "thread": threading.current_thread().name,
+            "attrs": span.attrs,
+            "counters": dict(span.counters),
+        }
+        with self.lock:
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+            if span.parent_id is not None:
+                # Children finishing after their root (queued speech) are only written to the file
+                if span.trace_id in self.finished:
+                    self.finished[span.trace_id].append(record)
+                return
+            children = self.finished.pop(span.trace_id, [])
+        if span.attrs.get("turn") and self.print_turns:
+            print(summarize_turn(record, children))
+
+
+def summarize_turn(root, children):
+    """Format a turn as total time plus time and counters per stage"""
+    totals = defaultdict(lambda: {"ms": 0.0, "count": 0, "counters": defaultdict(float)})
+    for record in children:
+        stage = totals[record["name"]]
+        stage["ms"] += record["duration_ms"]
+        stage["count"] += 1
+        for key, value in record["counters"].items():
+            stage["counters"][key] += value
+    lines = [f"Turn {root['name']}: {root['duration_ms']:.0f} ms"]
+    for name, stage in sorted(totals.items(), key=lambda item: -item[1]["ms"]):
+        counters = ", ".join(f"{k}={v:.0f}" for k, v in sorted(stage["counters"].items()))
+        lines.append(f"  {name:<24}{stage['ms']:>10.0f} ms  x{stage['count']}" + (f"  {counters}" if counters else ""))
+    return "\n".join(lines)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def report(paths):
+    """Print p50/p95 latency per span name across every session in the given trace files"""
+    durations = defaultdict(list)
+    sessions = set()
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                durations[record["name"]].append(record["duration_ms"])
+                sessions.add(record.get("session"))
+
+    print(f"{len(sessions)} sessions, {sum(len(v) for v in durations.values())} spans")
+    print(f"{'stage':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: -percentile(item[1], 0.5)):
+        print(f"{name:<28}{len(values):>7}{percentile(values, 0.5):>10.1f}"
+              f"{percentile(values, 0.95):>10.1f}{max(values):>10.1f}")
+
+
+DEFAULT_TRACE_FILE = os.getenv("DEVIS_TRACE_FILE", str(DEFAULT_CACHE_ROOT / "traces.jsonl"))
+
+tracer = Tracer(DEFAULT_TRACE_FILE, enabled=os.getenv("DEVIS_TRACE", "1") != "0")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize DEVIS latency traces")
+    parser.add_argument("files", nargs="*", default=[DEFAULT_TRACE_FILE], help="trace JSONL files")
+    args = parser.parse_args()
+    report(args.files)
@@ -0,0 +1,102 @@
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def _overlap_length(left, right, max_overlap):
+    """Length of the longest suffix of left equal to a prefix of right, comparing normalized words"""
+    for k in range(min(max_overlap, len(left), len(right)), 0, -1):
+        if [_normalize(w) for w in left[-k:]] == [_normalize(w) for w in right[:k]]:
+            return k
+    return 0
+
+
+def stitch_transcripts(parts, max_overlap_words=12):
+    """Join transcripts of overlapping audio windows, dropping words heard twice
+
+    Windows overlap in time, so the end of one transcript usually repeats at
+    the start of the next. Words cut at a window edge are tolerated by also
+    trying with the last word of the left side or the first word of the right
+    side dropped.
+    """
+    words = []
+    for part in parts:
+        if not part:
+            continue
+        incoming = part.split()
+        if not words:
+            words = incoming
+            continue
+
+        best = (0, 0, 0)  # (overlap, drop_tail, drop_head)
+        for drop_tail, drop_head, min_match in ((0, 0, 1), (1, 0, 2), (0, 1, 2), (1, 1, 2)):
+            left = words[:len(words) - drop_tail] if drop_tail else words
+            right = incoming[drop_head:]
+            overlap = _overlap_length(left, right, max_overlap_words)
+            if overlap >= min_match and overlap > best[0]:
+                best = (overlap, drop_tail, drop_head)
+
+        overlap, drop_tail, drop_head = best
+        if drop_tail:
+            words = words[:-drop_tail]
+        words = words + incoming[drop_head + overlap:]
+    return " ".join(words)
+
+
+class ChunkedTranscriber:
+    """Transcribe audio in overlapping windows while it is still being recorded
+
+    transcribe(samples) is any callable returning text for a mono float32
+    array, so a local fake can stand in for Whisper. Each window is submitted
+    as soon as it closes; finish() sends the tail and stitches the results.
+    Pass a shared executor to bound transcription work across many streams.
+    """
+
+    def __init__(self, transcribe, sample_rate, window_seconds=6.0, overlap_seconds=1.5, max_workers=3,
+                 executor=None):
+        if overlap_seconds >= window_seconds:
+            raise ValueError("overlap_seconds must be shorter than window_seconds")
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.window = int(window_seconds * sample_rate)
+        self.step = int((window_seconds - overlap_seconds) * sample_rate)
+        self.overlap = self.window - self.step
+        self.owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.blocks = []
+        self.length = 0
+        self.window_start = 0
+        self.futures = []
+
+    def _samples(self, start, end):
+        return np.concatenate(self.blocks)[start:end] if self.blocks else np.zeros(0, dtype=np.float32)
+
+    def add(self, samples):
+        """Append captured samples and submit every window that is now complete"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if len(samples) == 0:
+            return
+        self.blocks.append(samples)
+        self.length += len(samples)
+        while self.length - self.window_start >= self.window:
+            start = self.window_start
+            window = self._samples(start, start + self.window)
+            self.futures.append(self.executor.submit(contextvars.copy_context().run, self.transcribe, window))
+            self.window_start += self.step
+
+    def finish(self):
+        """Transcribe the remaining audio and return the stitched text"""
+        # The tail only holds new audio if it extends past the previous window's overlap
+        if not self.futures or self.length - self.window_start > self.overlap:
+            tail = self._samples(self.window_start, self.length)
+            if len(tail):
+                self.futures.append(self.executor.submit(contextvars.copy_context().run, self.transcribe, tail))
+        parts = [future.result() for future in self.futures]
+        if self.owns_executor:
+            self.executor.shutdown(wait=False)
+        return stitch_transcripts(parts)
@@ -0,0 +1,168 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity float32 sample buffer that keeps the most recent samples"""
+
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.size = 0
+        self.pos = 0
+
+    def extend(self, samples):
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        if self.capacity == 0:
+            return
+        if len(samples) >= self.capacity:
+            self.data[:] = samples[-self.capacity:]
+            self.pos = 0
+            self.size = self.capacity
+            return
+        end = self.pos + len(samples)
+        if end <= self.capacity:
+            self.data[self.pos:end] = samples
+        else:
+            split = self.capacity - self.pos
+            self.data[self.pos:] = samples[:split]
+            self.data[:end - self.capacity] = samples[split:]
+        self.pos = end % self.capacity
+        self.size = min(self.capacity, self.size + len(samples))
+
+    def read(self):
+        """Return the buffered samples oldest first"""
+        if self.size < self.capacity:
+            return self.data[:self.size].copy()
+        return np.concatenate((self.data[self.pos:], self.data[:self.pos]))
+
+    def clear(self):
+        self.size = 0
+        self.pos = 0
+
+
+def frame_energy_db(frame):
+    """Mean signal power of a frame in dBFS"""
+    frame = np.asarray(frame, dtype=np.float32)
+    return 10 * np.log10(np.mean(frame * frame) + 1e-12)
+
+
+class EnergyVAD:
+    """Frame-level voice activity detector with an adaptive noise floor
+
+    A frame counts as speech when its energy exceeds both threshold_db and the
+    running noise floor plus noise_margin_db. Speech starts after onset_ms of
+    consecutive voiced frames and ends after trailing_silence_ms of silence.
+    """
+
+    def __init__(self, sample_rate, frame_ms=30, threshold_db=-45.0, noise_margin_db=10.0,
+                 onset_ms=90, trailing_silence_ms=800):
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.onset_frames = max(1, int(onset_ms / frame_ms))
+        self.trailing_frames = max(1, int(trailing_silence_ms / frame_ms))
+        self.reset()
+
+    def reset(self):
+        self.noise_floor_db = None
+        self.in_speech = False
+        self.voiced_run = 0
+        self.silent_run = 0
+
+    def is_voiced(self, frame):
+        energy = frame_energy_db(frame)
+        if self.noise_floor_db is None:
+            # The first frame may already be speech, so never seed the floor above
+            # the level at which the threshold alone decides
+            self.noise_floor_db = min(energy, self.threshold_db - self.noise_margin_db)
+        voiced = energy > max(self.threshold_db, self.noise_floor_db + self.noise_margin_db)
+        if not voiced and not self.in_speech:
+            # Track background noise slowly, only while nobody is talking
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * energy
+        return voiced
+
+    def process(self, frame):
+        """Feed one frame; return 'silence', 'onset', 'speech' or 'end'"""
+        voiced = self.is_voiced(frame)
+        if not self.in_speech:
+            self.voiced_run = self.voiced_run + 1 if voiced else 0
+            if self.voiced_run >= self.onset_frames:
+                self.in_speech = True
+                self.silent_run = 0
+                return "onset"
+            return "silence"
+
+        self.silent_run = 0 if voiced else self.silent_run + 1
+        if self.silent_run >= self.trailing_frames:
+            self.in_speech = False
+            self.voiced_run = 0
+            return "end"
+        return "speech"
+
+
+class VADRecorder:
+    """Turn a stream of audio blocks into one utterance using an EnergyVAD
+
+    Audio before onset is kept in a pre-roll ring buffer so the first syllable
+    is not clipped. Recording finishes at end of speech, after max_duration,
+    or after no_speech_timeout without any onset.
+    """
+
+    def __init__(self, vad, pre_roll_ms=300, max_duration=30.0, no_speech_timeout=8.0):
+        self.vad = vad
+        self.sample_rate = vad.sample_rate
+        self.pre_roll = RingBuffer(int(self.sample_rate * pre_roll_ms / 1000))
+        self.max_samples = int(self.sample_rate * max_duration)
+        self.no_speech_samples = int(self.sample_rate * no_speech_timeout)
+        self.remainder = np.zeros(0, dtype=np.float32)
+        self.frames = []
+        self.samples_seen = 0
+        self.recorded = 0
+        self.speech_started = False
+        self.done = False
+        self.onset_sample = None
+        self.end_sample = None
+
+    def feed(self, block):
+        """Consume a block of mono samples; return True once the utterance is complete"""
+        if self.done:
+            return True
+        samples = np.concatenate((self.remainder, np.asarray(block, dtype=np.float32).reshape(-1)))
+        frame_size = self.vad.frame_size
+        usable = len(samples) - len(samples) % frame_size
+        self.remainder = samples[usable:]
+
+        for start in range(0, usable, frame_size):
+            frame = samples[start:start + frame_size]
+            self.samples_seen += frame_size
+            state = self.vad.process(frame)
+
+            if not self.speech_started:
+                if state == "onset":
+                    self.speech_started = True
+                    self.onset_sample = self.samples_seen
+                    self.frames.append(self.pre_roll.read())
+                    self.frames.append(frame)
+                    self.recorded += frame_size
+                else:
+                    self.pre_roll.extend(frame)
+                    if self.samples_seen >= self.no_speech_samples:
+                        self.done = True
+                        return True
+                continue
+
+            self.frames.append(frame)
+            self.recorded += frame_size
+            if state == "end" or self.recorded >= self.max_samples:
+                self.end_sample = self.samples_seen
+                self.done = True
+                return True
+        return False
+
+    def audio(self):
+        """Return the captured utterance, or an empty array if no speech was heard"""
+        if not self.frames:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self.frames)
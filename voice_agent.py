@@ -1,87 +1,294 @@
-import io
-import sounddevice as sd
-import soundfile as sf
-from openai import OpenAI
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-from elevenlabs import play
 import os
+import queue
 import re
+import threading
 import time
-import tempfile
-import numpy as np
+from contextlib import contextmanager
+from cache import DEFAULT_CACHE_ROOT, DiskCache, content_hash
+from clients import clients
+from speech_queue import SpeechQueue
+from tracing import tracer
 
 load_dotenv()
 
 class VoiceAgent:
-    def __init__(self):
-        self.client = OpenAI()
-        self.voice_client = ElevenLabs(api_key=os.getenv('ELEVENLABS_API_KEY'))
+    # Fixed prompts spoken by the agent itself, worth synthesizing ahead of time
+    STATIC_PROMPTS = [
+        "Recording...",
+        "I could not understand what you said. Please try again.",
+    ]
+
+    def __init__(self, client=None, voice_client=None, player=None, audio_backend=None):
+        # Clients left as None come from the shared registry on first use
+        self._client = client
+        self._voice_client = voice_client
+        self.player = player
+        # sounddevice, or anything with the same rec/wait/InputStream calls
+        self.audio_backend = audio_backend
         self.voice_id = "JBFqnCBsd6RMkjVDRZzb"  # Rachel voice
+        self.tts_model_id = "eleven_multilingual_v2"
+        self.tts_output_format = "mp3_44100_128"
+        self.tts_cache = DiskCache(DEFAULT_CACHE_ROOT / "tts", max_bytes=100 * 1024 * 1024)
+        self.speech = SpeechQueue(self.synthesize, self._play)
+        # Announcements from background threads wait here while the microphone is open
+        self.listening = False
+        self.held_announcements = []
+        self.announce_lock = threading.Lock()
         self.sample_rate = 44100
+        # Voice activity detection settings for record_utterance
+        self.use_vad = True
+        self.vad_settings = {"threshold_db": -45.0, "trailing_silence_ms": 800}
+        self.max_record_seconds = 30.0
+        self.no_speech_timeout = 8.0
+        # Give up on a stream that stops delivering blocks for this long
+        self.stream_stall_timeout = 2.0
+        # Recordings are downsampled to 16 kHz and encoded in memory before upload
+        self.upload_format = "FLAC"
+        # Transcribe overlapping windows while still recording instead of after
+        self.streaming_transcription = True
+        self.transcription_window = {"window_seconds": 6.0, "overlap_seconds": 1.5}
+        
+    @property
+    def client(self):
+        return self._client or clients.openai()
+        
+    @property
+    def voice_client(self):
+        return self._voice_client or clients.elevenlabs()
+        
+    @property
+    def audio(self):
+        if self.audio_backend is None:
+            import sounddevice
+            self.audio_backend = sounddevice
+        return self.audio_backend
+        
+    def warm_up(self):
+        """Load what recording and transcription need on a daemon thread
+
+        Speaking the first prompt needs none of it, so it loads while that
+        prompt plays instead of delaying it.
+        """
+        def load():
+            try:
+                import audio_codec
+                import transcription
+                import vad
+                self.audio  # imports sounddevice unless a backend was injected
+            except Exception as e:
+                print(f"Audio input unavailable: {e}")
+            if self._client is None:
+                clients.warm("openai").join()
+        
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+        
+    def synthesize(self, text):
+        """Return MP3 bytes for text, from the disk cache when available"""
+        with tracer.span("tts.synthesize") as span:
+            key = content_hash(self.voice_id, self.tts_model_id, self.tts_output_format, text)
+            audio = self.tts_cache.get(key)
+            span.set(cached=audio is not None)
+            if audio is None:
+                audio = b"".join(self.voice_client.text_to_speech.convert(
+                    text=text,
+                    voice_id=self.voice_id,
+                    model_id=self.tts_model_id,
+                    output_format=self.tts_output_format,
+                ))
+                self.tts_cache.put(key, audio)
+                span.add("characters", len(text))
+            span.add("bytes_received", len(audio))
+            return audio
+
+    def _play(self, audio):
+        with tracer.span("tts.play"):
+            if self.player is None:
+                from elevenlabs import play
+                self.player = play
+            self.player(audio)
+
+    def presynthesize(self, texts=(), background=True):
+        """Warm the TTS cache for known prompts, by default on a daemon thread"""
+        def warm():
+            for text in list(self.STATIC_PROMPTS) + list(texts):
+                try:
+                    self.synthesize(text)
+                except Exception as e:
+                    print(f"Pre-synthesis failed for {text!r}: {e}")
         
-    def speak(self, text):
-        """Convert text to speech using ElevenLabs"""
+        if not background:
+            warm()
+            return None
+        thread = threading.Thread(target=warm, daemon=True)
+        thread.start()
+        return thread
+        
+    def speak(self, text, wait=True):
+        """Convert text to speech using ElevenLabs
+
+        Speech is queued in order. With wait=False this returns the Utterance
+        immediately so the caller can do other work while it plays.
+        """
+        utterance = self.speech.say(text)
+        if wait:
+            utterance.wait()
+        return utterance
+
+    def announce(self, text):
+        """Speak text from a background thread without it being recorded
+
+        While listen_for_input has the microphone open the text is held and
+        spoken as soon as recording ends. Never blocks.
+        """
+        with self.announce_lock:
+            if self.listening:
+                self.held_announcements.append(text)
+                return None
+            return self.speak(text, wait=False)
+
+    @contextmanager
+    def holding_announcements(self):
+        """Hold announce() calls for the duration of the block, then speak them"""
+        with self.announce_lock:
+            self.listening = True
         try:
-            audio = self.voice_client.text_to_speech.convert(
-                text=text,
-                voice_id=self.voice_id,
-                model_id="eleven_multilingual_v2",
-                output_format="mp3_44100_128",
-            )
-            play(audio)
-            # Add a small delay to ensure the message is heard
-            time.sleep(len(text.split()) * 0.3)
-        except Exception as e:
-            print(f"Speech synthesis failed: {e}")
-            print(f"Fallback to text: {text}")  # Fallback to printing
+            yield
+        finally:
+            with self.announce_lock:
+                self.listening = False
+                held, self.held_announcements = self.held_announcements, []
+                for text in held:
+                    self.speak(text, wait=False)
+
+    def cleanup(self):
+        """Let queued speech finish and stop the speech workers"""
+        self.speech.close()
             
+    @tracer.traced("voice.record")
     def record_audio(self, duration=5):
         """Record audio from microphone"""
+        import numpy as np
         self.speak("Recording...")
         
         # Record audio
-        recording = sd.rec(
+        recording = self.audio.rec(
             int(duration * self.sample_rate),
             samplerate=self.sample_rate,
             channels=1,
             dtype=np.float32
         )
-        sd.wait()
+        self.audio.wait()
         
-        # Save to temporary file
-        temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        sf.write(temp_file.name, recording, self.sample_rate)
+        return recording[:, 0]
+
+    @tracer.traced("voice.record")
+    def record_utterance(self, on_audio=None):
+        """Record from speech onset until trailing silence using voice activity detection
+
+        on_audio, if given, receives each chunk of the utterance as soon as it
+        is captured. If the input stream stalls, whatever was recorded so far
+        is returned.
+        """
+        import numpy as np
+        from vad import EnergyVAD, VADRecorder
+        self.speak("Recording...")
+        
+        recorder = VADRecorder(
+            EnergyVAD(self.sample_rate, **self.vad_settings),
+            max_duration=self.max_record_seconds,
+            no_speech_timeout=self.no_speech_timeout
+        )
+        blocks = queue.Queue()
         
-        return temp_file.name
+        def callback(indata, frames, time_info, status):
+            blocks.put(indata[:, 0].copy())
         
-    def transcribe_audio(self, audio_file):
-        """Transcribe audio using Whisper API"""
+        delivered = 0
+        with self.audio.InputStream(samplerate=self.sample_rate, channels=1,
+                                    dtype=np.float32, callback=callback):
+            done = False
+            while not done:
+                try:
+                    block = blocks.get(timeout=self.stream_stall_timeout)
+                except queue.Empty:
+                    print(f"No audio from the microphone for {self.stream_stall_timeout:.0f}s, stopping")
+                    break
+                done = recorder.feed(block)
+                if on_audio:
+                    for frame in recorder.frames[delivered:]:
+                        on_audio(frame)
+                    delivered = len(recorder.frames)
+        
+        recording = recorder.audio()
+        if len(recording) == 0:
+            return None
+        return recording
+        
+    def transcribe_audio(self, audio, sample_rate=None):
+        """Transcribe audio using Whisper API
+
+        Accepts a NumPy recording, which is downsampled and encoded in memory,
+        a path to an existing audio file, or a (filename, bytes) upload.
+        sample_rate defaults to the microphone rate.
+        """
         try:
-            with open(audio_file, "rb") as f:
+            if isinstance(audio, (str, os.PathLike)):
+                with open(audio, "rb") as f:
+                    transcript = self.client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=f
+                    )
+                return transcript.text
+            
+            with tracer.span("voice.transcribe") as span:
+                if isinstance(audio, tuple):
+                    upload = audio
+                else:
+                    from audio_codec import encode_audio
+                    sample_rate = sample_rate or self.sample_rate
+                    upload = encode_audio(audio, sample_rate, audio_format=self.upload_format)
+                    span.add("audio_seconds", len(audio) / sample_rate)
+                span.add("bytes_sent", len(upload[1]))
                 transcript = self.client.audio.transcriptions.create(
                     model="whisper-1",
-                    file=f
+                    file=upload
                 )
-            return transcript.text
+                return transcript.text
         except Exception as e:
             print(f"Transcription failed: {e}")
             return None
+
+    def record_and_transcribe(self):
+        """Record an utterance and transcribe it in overlapping windows as it is captured"""
+        from transcription import ChunkedTranscriber
+        def transcribe_window(samples):
+            return self.transcribe_audio(samples) or ""
+        
+        transcriber = ChunkedTranscriber(transcribe_window, self.sample_rate, **self.transcription_window)
+        self.record_utterance(on_audio=transcriber.add)
+        return transcriber.finish() or None
             
+    @tracer.traced("voice.listen")
     def listen_for_input(self, prompt):
         """Listen for voice input with a specific prompt"""
-        self.speak(prompt)
-        
-        time.sleep(3)
-        
-        # Record audio
-        audio_file = self.record_audio()
-        
-        # Transcribe
-        text = self.transcribe_audio(audio_file)
-        
-        # Cleanup
-        os.unlink(audio_file)
+        # Held from before the prompt: anything announced earlier is queued ahead
+        # of it and has finished playing by the time the microphone opens
+        with self.holding_announcements():
+            self.speak(prompt)
+            
+            # Record and transcribe audio
+            if self.use_vad and self.streaming_transcription:
+                text = self.record_and_transcribe()
+            else:
+                if self.use_vad:
+                    recording = self.record_utterance()
+                else:
+                    time.sleep(3)
+                    recording = self.record_audio()
+                text = self.transcribe_audio(recording) if recording is not None else None
         
         if text:
             self.speak(f"I heard: {text}")